@@ -5,48 +5,145 @@ Fixed side/enemy logic, stable under testing.
 Pure Python, educational, correct.
 """
 
+import random
 import sys
-from dataclasses import dataclass
-from typing import List, Optional
+from array import array
+from collections import namedtuple
+from typing import List
 
 sys.stdout.reconfigure(line_buffering=True)
 
 WHITE, BLACK = 0, 1
-EMPTY = '.'
+
+# Piece codes: white pieces are positive, black ones the negated code
+EMPTY = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = 1, 2, 3, 4, 5, 6
+PIECE_CODE = {'P': PAWN, 'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING,
+              'p': -PAWN, 'n': -KNIGHT, 'b': -BISHOP, 'r': -ROOK, 'q': -QUEEN, 'k': -KING}
 
 FILES = 'abcdefgh'
 RANKS = '12345678'
 
-PIECE_VALUE = {
-    'P': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 20000,
-    'p': -100, 'n': -320, 'b': -330, 'r': -500, 'q': -900, 'k': -20000,
-}
+# Indexed by piece code; black codes are negative and wrap around to the
+# mirrored values at the end of the tuple
+_VALUES = (0, 100, 320, 330, 500, 900, 20000)
+PIECE_VALUE = _VALUES + tuple(-v for v in reversed(_VALUES[1:]))
+
+# File and rank (0 is the top row, rank 8) of each square index
+FILE_OF = tuple(i % 8 for i in range(64))
+RANK_OF = tuple(i // 8 for i in range(64))
 
 DIRS = [-8, 8, -1, 1, -9, -7, 7, 9]
 KNIGHT_DIRS = [-17, -15, -10, -6, 6, 10, 15, 17]
 
 
-@dataclass
-class Move:
-    frm: int
-    to: int
-    promo: Optional[str] = None
-    ep: bool = False
-    castle: bool = False
+def step_targets(dirs, max_file_diff):
+    # Destination squares of a one-step piece from every square, without
+    # the ones that wrap around the board edge
+    return tuple(
+        tuple(i + d for d in dirs
+              if 0 <= i + d < 64 and abs(FILE_OF[i] - FILE_OF[i + d]) <= max_file_diff)
+        for i in range(64)
+    )
+
+
+KNIGHT_TARGETS = step_targets(KNIGHT_DIRS, 2)
+KING_TARGETS = step_targets(DIRS, 1)
+# Squares a pawn of each side on a square captures on (index 0 is a8)
+PAWN_CAPTURES = (step_targets((-9, -7), 1), step_targets((7, 9), 1))
+
+
+def ray(i, d):
+    # Squares from i in direction d up to the board edge, nearest first
+    squares = []
+    while 0 <= i + d < 64 and abs(FILE_OF[i] - FILE_OF[i + d]) <= 1:
+        i += d
+        squares.append(i)
+    return tuple(squares)
+
+
+RAYS = {d: tuple(ray(i, d) for i in range(64)) for d in DIRS}
+
+
+# Zobrist keys: one per piece per square, plus side to move, each castling
+# right and each en passant file. Fixed seed so hashes are reproducible
+_rng = random.Random(2024)
+# ZOBRIST_PIECE is indexed by piece code like PIECE_VALUE (slot 0 unused)
+ZOBRIST_PIECE = [[_rng.getrandbits(64) for _ in range(64)] for _ in range(13)]
+ZOBRIST_SIDE = _rng.getrandbits(64)
+_castle_keys = [_rng.getrandbits(64) for _ in range(4)]
+ZOBRIST_CASTLE = [0] * 16
+for _rights in range(16):
+    for _bit in range(4):
+        if _rights >> _bit & 1:
+            ZOBRIST_CASTLE[_rights] ^= _castle_keys[_bit]
+ZOBRIST_EP = [_rng.getrandbits(64) for _ in range(8)]
+
+# Move ordering: the TT move, then captures by MVV-LVA, then killers
+ORDER_TT = 1 << 30
+ORDER_CAPTURE = 1 << 20
+ORDER_KILLER = 1 << 19
+MAX_PLY = 64
+
+# Transposition table size (a power of two, so a slot is hash & mask) and
+# entry bound flags. Slots pair up into two-entry buckets at even indices
+TT_SIZE = 1 << 22
+TT_EXACT, TT_LOWER, TT_UPPER = 0, 1, 2
+
+
+# Castling rights as bits of one int
+CASTLE_WK, CASTLE_WQ, CASTLE_BK, CASTLE_BQ = 1, 2, 4, 8
 
-    def uci(self):
-        s = sq_name(self.frm) + sq_name(self.to)
-        if self.promo:
-            s += self.promo.lower()
-        return s
+# Rights kept when a piece moves from or to a square: moving the king or
+# a rook, or capturing a rook at home, drops the matching rights
+CASTLE_KEEP = [0xF] * 64
+CASTLE_KEEP[60] = 0xF & ~(CASTLE_WK | CASTLE_WQ)
+CASTLE_KEEP[63] = 0xF & ~CASTLE_WK
+CASTLE_KEEP[56] = 0xF & ~CASTLE_WQ
+CASTLE_KEEP[4] = 0xF & ~(CASTLE_BK | CASTLE_BQ)
+CASTLE_KEEP[7] = 0xF & ~CASTLE_BK
+CASTLE_KEEP[0] = 0xF & ~CASTLE_BQ
+
+
+# A move is a plain int: from | to << 6 | promo << 12 | flags
+FROM_MASK = 0x3F
+TO_SHIFT = 6
+PROMO_SHIFT = 12
+FLAG_EP = 1 << 15
+FLAG_CASTLE = 1 << 16
+
+# Promotion codes, indexed into PROMO_CHARS (the piece code is promo + 1);
+# PROMOS is the order promotions are generated in
+PROMO_CHARS = '.nbrq'
+PROMOS = (4, 3, 2, 1)
+
+
+# What make() needs to remember for unmake(): the captured piece (the
+# pawn itself for en passant), the castling rights, ep square and hash before
+UndoInfo = namedtuple('UndoInfo', 'captured castle ep hash')
+
+
+def move_uci(m):
+    s = sq_name(m & FROM_MASK) + sq_name(m >> TO_SHIFT & FROM_MASK)
+    promo = m >> PROMO_SHIFT & 7
+    if promo:
+        s += PROMO_CHARS[promo]
+    return s
 
 
 class Board:
+    # Mailbox only, no bitboards: the generators already walk precomputed
+    # target and ray tables, and keeping piece and occupancy bitboards in
+    # step in make()/unmake() cost more than the bit tests saved
+    __slots__ = ('board', 'side', 'castle', 'ep', 'king_sq', 'hash')
+
     def __init__(self):
-        self.board = [EMPTY] * 64
+        self.board = array('b', [EMPTY] * 64)
         self.side = WHITE
-        self.castle = {'K': True, 'Q': True, 'k': True, 'q': True}
+        self.castle = 0xF
         self.ep = None
+        # King square by side, -1 when a (test) position has no king
+        self.king_sq = [60, 4]
         self.set_fen(self.start_fen())
 
     @staticmethod
@@ -55,196 +152,405 @@ class Board:
 
     def set_fen(self, fen):
         parts = fen.split()
-        self.board = []
+        squares = []
         for r in parts[0].split('/'):
             for c in r:
-                self.board += [EMPTY] * int(c) if c.isdigit() else [c]
+                squares += [EMPTY] * int(c) if c.isdigit() else [PIECE_CODE[c]]
+        self.board = array('b', squares)
+        self.king_sq = [squares.index(KING) if KING in squares else -1,
+                        squares.index(-KING) if -KING in squares else -1]
         self.side = WHITE if parts[1] == 'w' else BLACK
-        self.castle = {k: k in parts[2] for k in 'KQkq'}
+        self.castle = ((CASTLE_WK if 'K' in parts[2] else 0) | (CASTLE_WQ if 'Q' in parts[2] else 0)
+                       | (CASTLE_BK if 'k' in parts[2] else 0) | (CASTLE_BQ if 'q' in parts[2] else 0))
         self.ep = None if parts[3] == '-' else sq_idx(parts[3])
+        self.hash = self.compute_hash()
+
+    def compute_hash(self):
+        h = 0
+        for i, p in enumerate(self.board):
+            if p != EMPTY:
+                h ^= ZOBRIST_PIECE[p][i]
+        if self.side == BLACK:
+            h ^= ZOBRIST_SIDE
+        h ^= ZOBRIST_CASTLE[self.castle]
+        if self.ep is not None:
+            h ^= ZOBRIST_EP[FILE_OF[self.ep]]
+        return h
 
     # ================= move generation =================
 
     def generate_moves(self):
-        return [m for m in self.generate_pseudo(self.side) if self.is_legal(m)]
+        side = self.side
+        moves = self.generate_pseudo(side)
+        ks = self.king_sq[side]
+        if ks < 0:
+            return moves
+        # Checks and pins are found once from the king square; only king
+        # moves and en passant still need make / in_check / unmake
+        pins, checks = self.pins_and_checks(ks, side)
+        if len(checks) > 1:
+            block = ()
+        elif checks:
+            block = checks[0]
+        else:
+            block = None
+        board = self.board
+        legal = []
+        for m in moves:
+            frm = m & FROM_MASK
+            if m & FLAG_EP or board[frm] == KING or board[frm] == -KING:
+                if self.is_legal(m):
+                    legal.append(m)
+                continue
+            to = m >> TO_SHIFT & FROM_MASK
+            if block is not None and to not in block:
+                continue
+            if frm in pins and to not in pins[frm]:
+                continue
+            legal.append(m)
+        return legal
+
+    def pins_and_checks(self, ks, side):
+        # pins maps a pinned piece's square to the squares it may still
+        # move to (the line from the king to the pinner); checks holds,
+        # per checking piece, the squares that capture or block it
+        board = self.board
+        s = -1 if side == WHITE else 1
+        pins = {}
+        checks = []
+        for t in PAWN_CAPTURES[side][ks]:
+            if board[t] == s * PAWN:
+                checks.append((t,))
+        for t in KNIGHT_TARGETS[ks]:
+            if board[t] == s * KNIGHT:
+                checks.append((t,))
+        for t in KING_TARGETS[ks]:
+            if board[t] == s * KING:
+                checks.append((t,))
+        for d in DIRS:
+            if d in (-8, 8, -1, 1):
+                slider = s * ROOK
+            else:
+                slider = s * BISHOP
+            queen = s * QUEEN
+            line = []
+            pinned = -1
+            for t in RAYS[d][ks]:
+                line.append(t)
+                p = board[t]
+                if p == EMPTY:
+                    continue
+                if p == slider or p == queen:
+                    if pinned < 0:
+                        checks.append(frozenset(line))
+                    else:
+                        pins[pinned] = frozenset(line)
+                    break
+                if pinned >= 0 or (p > 0) != (side == WHITE):
+                    break
+                pinned = t
+        return pins, checks
 
     def generate_pseudo(self, side):
         moves = []
         for i, p in enumerate(self.board):
-            if p == EMPTY or p.isupper() != (side == WHITE):
+            if p == EMPTY or (p > 0) != (side == WHITE):
                 continue
-            if p.lower() == 'p':
+            p = abs(p)
+            if p == PAWN:
                 self.pawn_moves(i, side, moves)
-            elif p.lower() == 'n':
+            elif p == KNIGHT:
                 self.knight_moves(i, side, moves)
-            elif p.lower() == 'b':
+            elif p == BISHOP:
                 self.slider_moves(i, side, moves, [-9, -7, 7, 9])
-            elif p.lower() == 'r':
+            elif p == ROOK:
                 self.slider_moves(i, side, moves, [-8, 8, -1, 1])
-            elif p.lower() == 'q':
+            elif p == QUEEN:
                 self.slider_moves(i, side, moves, DIRS)
-            elif p.lower() == 'k':
+            elif p == KING:
                 self.king_moves(i, side, moves)
         return moves
 
     def pawn_moves(self, i, side, moves):
-        p = self.board[i]
         d = -8 if side == WHITE else 8
-        r = i // 8
+        r = RANK_OF[i]
         one = i + d
         if 0 <= one < 64 and self.board[one] == EMPTY:
-            if one // 8 in (0, 7):
-                for pr in 'qrbn':
-                    moves.append(Move(i, one, pr))
+            if RANK_OF[one] in (0, 7):
+                for pr in PROMOS:
+                    moves.append(i | one << TO_SHIFT | pr << PROMO_SHIFT)
             else:
-                moves.append(Move(i, one))
-            if r in (6, 1):
+                moves.append(i | one << TO_SHIFT)
+            # Double push only from the side's own starting rank; a pawn
+            # one step from promotion would otherwise "double push" off
+            # the board, which a packed move cannot encode
+            if r == (6 if side == WHITE else 1):
                 two = i + 2 * d
                 if self.board[two] == EMPTY:
-                    moves.append(Move(i, two))
-        for dc in (-1, 1):
-            cap = i + d + dc
-            # Check file wrap (pawn can't capture across board edge)
-            if abs((i % 8) - (cap % 8)) != 1:
-                continue
-            if 0 <= cap < 64:
-                if self.board[cap] != EMPTY and self.enemy(cap, side):
-                    if cap // 8 in (0, 7):
-                        for pr in 'qrbn':
-                            moves.append(Move(i, cap, pr))
-                    else:
-                        moves.append(Move(i, cap))
-                if self.ep == cap:
-                    moves.append(Move(i, cap, ep=True))
+                    moves.append(i | two << TO_SHIFT)
+        for cap in PAWN_CAPTURES[side][i]:
+            if self.board[cap] != EMPTY and self.enemy(cap, side):
+                if RANK_OF[cap] in (0, 7):
+                    for pr in PROMOS:
+                        moves.append(i | cap << TO_SHIFT | pr << PROMO_SHIFT)
+                else:
+                    moves.append(i | cap << TO_SHIFT)
+            if self.ep == cap:
+                moves.append(i | cap << TO_SHIFT | FLAG_EP)
 
     def knight_moves(self, i, side, moves):
-        f, r = i % 8, i // 8
-        for d in KNIGHT_DIRS:
-            t = i + d
-            tf, tr = t % 8, t // 8
-            # Knight moves at most 2 squares in any direction
-            if 0 <= t < 64 and abs(f - tf) <= 2 and abs(r - tr) <= 2 and not self.friend(t, side):
-                moves.append(Move(i, t))
+        for t in KNIGHT_TARGETS[i]:
+            if not self.friend(t, side):
+                moves.append(i | t << TO_SHIFT)
 
     def slider_moves(self, i, side, moves, dirs):
         for d in dirs:
-            t = i + d
-            prev = i
-            while 0 <= t < 64:
-                # Check for wrap-around (file difference should be at most 1 per step)
-                if abs((prev % 8) - (t % 8)) > 1:
-                    break
+            for t in RAYS[d][i]:
                 if self.board[t] == EMPTY:
-                    moves.append(Move(i, t))
+                    moves.append(i | t << TO_SHIFT)
                 else:
                     if self.enemy(t, side):
-                        moves.append(Move(i, t))
+                        moves.append(i | t << TO_SHIFT)
                     break
-                prev = t
-                t += d
 
     def king_moves(self, i, side, moves):
-        f = i % 8
-        for d in DIRS:
-            t = i + d
-            tf = t % 8
-            # King moves at most 1 square in file direction
-            if 0 <= t < 64 and abs(f - tf) <= 1 and not self.friend(t, side):
-                moves.append(Move(i, t))
-        if side == WHITE:
-            if self.castle['K'] and self.board[61] == self.board[62] == EMPTY:
-                moves.append(Move(60, 62, castle=True))
-            if self.castle['Q'] and self.board[59] == self.board[58] == self.board[57] == EMPTY:
-                moves.append(Move(60, 58, castle=True))
-        else:
-            if self.castle['k'] and self.board[5] == self.board[6] == EMPTY:
-                moves.append(Move(4, 6, castle=True))
-            if self.castle['q'] and self.board[3] == self.board[2] == self.board[1] == EMPTY:
-                moves.append(Move(4, 2, castle=True))
+        for t in KING_TARGETS[i]:
+            if not self.friend(t, side):
+                moves.append(i | t << TO_SHIFT)
+        # A FEN may claim rights without the king and rook at home, so
+        # check the squares too; unmake() relies on it
+        if side == WHITE and i == 60:
+            if self.castle & CASTLE_WK and self.board[61] == self.board[62] == EMPTY and self.board[63] == ROOK:
+                moves.append(60 | 62 << TO_SHIFT | FLAG_CASTLE)
+            if self.castle & CASTLE_WQ and self.board[59] == self.board[58] == self.board[57] == EMPTY and self.board[56] == ROOK:
+                moves.append(60 | 58 << TO_SHIFT | FLAG_CASTLE)
+        elif side == BLACK and i == 4:
+            if self.castle & CASTLE_BK and self.board[5] == self.board[6] == EMPTY and self.board[7] == -ROOK:
+                moves.append(4 | 6 << TO_SHIFT | FLAG_CASTLE)
+            if self.castle & CASTLE_BQ and self.board[3] == self.board[2] == self.board[1] == EMPTY and self.board[0] == -ROOK:
+                moves.append(4 | 2 << TO_SHIFT | FLAG_CASTLE)
 
     # ================= legality =================
 
     def is_legal(self, move):
-        snap = self.snapshot()
-        self.make(move)
+        undo = self.make(move)
         ok = not self.in_check(1 - self.side)
-        self.restore(snap)
+        self.unmake(move, undo)
         return ok
 
     def in_check(self, side):
-        king = 'K' if side == WHITE else 'k'
-        try:
-            ks = self.board.index(king)
-        except ValueError:
+        ks = self.king_sq[side]
+        if ks < 0:
             return False  # No king on board - invalid position, treat as not in check
-        for m in self.generate_pseudo(1 - side):
-            if m.to == ks:
+        return self.is_square_attacked(ks, 1 - side)
+
+    def is_square_attacked(self, sq, by_side):
+        # Look outward from sq along each attack pattern for an attacker
+        # of the matching type; a pawn of by_side attacks sq from the
+        # squares a pawn of the other side on sq would capture on
+        board = self.board
+        s = 1 if by_side == WHITE else -1
+        for t in PAWN_CAPTURES[1 - by_side][sq]:
+            if board[t] == s * PAWN:
+                return True
+        for t in KNIGHT_TARGETS[sq]:
+            if board[t] == s * KNIGHT:
+                return True
+        for t in KING_TARGETS[sq]:
+            if board[t] == s * KING:
                 return True
+        rook, bishop, queen = s * ROOK, s * BISHOP, s * QUEEN
+        for d in (-8, 8, -1, 1):
+            for t in RAYS[d][sq]:
+                p = board[t]
+                if p != EMPTY:
+                    if p == rook or p == queen:
+                        return True
+                    break
+        for d in (-9, -7, 7, 9):
+            for t in RAYS[d][sq]:
+                p = board[t]
+                if p != EMPTY:
+                    if p == bishop or p == queen:
+                        return True
+                    break
         return False
 
     # ================= make / undo =================
 
     def make(self, m):
-        p = self.board[m.frm]
-        self.board[m.frm] = EMPTY
-        if m.ep:
-            self.board[m.to + (8 if p.isupper() else -8)] = EMPTY
-        if m.castle:
-            if m.to == 62: self.board[63], self.board[61] = EMPTY, 'R'
-            if m.to == 58: self.board[56], self.board[59] = EMPTY, 'R'
-            if m.to == 6: self.board[7], self.board[5] = EMPTY, 'r'
-            if m.to == 2: self.board[0], self.board[3] = EMPTY, 'r'
-        self.board[m.to] = p if not m.promo else (m.promo.upper() if p.isupper() else m.promo)
+        frm = m & FROM_MASK
+        to = m >> TO_SHIFT & FROM_MASK
+        promo = m >> PROMO_SHIFT & 7
+        p = self.board[frm]
+        h = self.hash ^ ZOBRIST_PIECE[p][frm] ^ ZOBRIST_SIDE
+        self.board[frm] = EMPTY
+        if m & FLAG_EP:
+            cap = to + (8 if p > 0 else -8)
+            undo = UndoInfo(self.board[cap], self.castle, self.ep, self.hash)
+            self.board[cap] = EMPTY
+        else:
+            cap = to
+            undo = UndoInfo(self.board[to], self.castle, self.ep, self.hash)
+        if undo.captured != EMPTY:
+            h ^= ZOBRIST_PIECE[undo.captured][cap]
+        if m & FLAG_CASTLE:
+            if to == 62: self.board[63], self.board[61] = EMPTY, ROOK; h ^= ZOBRIST_PIECE[ROOK][63] ^ ZOBRIST_PIECE[ROOK][61]
+            if to == 58: self.board[56], self.board[59] = EMPTY, ROOK; h ^= ZOBRIST_PIECE[ROOK][56] ^ ZOBRIST_PIECE[ROOK][59]
+            if to == 6: self.board[7], self.board[5] = EMPTY, -ROOK; h ^= ZOBRIST_PIECE[-ROOK][7] ^ ZOBRIST_PIECE[-ROOK][5]
+            if to == 2: self.board[0], self.board[3] = EMPTY, -ROOK; h ^= ZOBRIST_PIECE[-ROOK][0] ^ ZOBRIST_PIECE[-ROOK][3]
+        if promo:
+            p = promo + 1 if p > 0 else -(promo + 1)
+        self.board[to] = p
+        h ^= ZOBRIST_PIECE[p][to]
+        if p == KING or p == -KING:
+            self.king_sq[p < 0] = to
+        castle = self.castle & CASTLE_KEEP[frm] & CASTLE_KEEP[to]
+        if castle != self.castle:
+            h ^= ZOBRIST_CASTLE[self.castle] ^ ZOBRIST_CASTLE[castle]
+            self.castle = castle
+        if self.ep is not None:
+            h ^= ZOBRIST_EP[FILE_OF[self.ep]]
         self.ep = None
-        if p.lower() == 'p' and abs(m.to - m.frm) == 16:
-            self.ep = (m.to + m.frm) // 2
+        if (p == PAWN or p == -PAWN) and abs(to - frm) == 16:
+            self.ep = (to + frm) // 2
+            h ^= ZOBRIST_EP[FILE_OF[self.ep]]
+        self.side ^= 1
+        self.hash = h
+        return undo
+
+    def unmake(self, m, undo):
+        frm = m & FROM_MASK
+        to = m >> TO_SHIFT & FROM_MASK
+        p = self.board[to]
+        if m >> PROMO_SHIFT & 7:
+            p = PAWN if p > 0 else -PAWN
+        self.board[frm] = p
+        if p == KING or p == -KING:
+            self.king_sq[p < 0] = frm
+        if m & FLAG_EP:
+            self.board[to] = EMPTY
+            self.board[to + (8 if p > 0 else -8)] = undo.captured
+        else:
+            self.board[to] = undo.captured
+        if m & FLAG_CASTLE:
+            if to == 62: self.board[63], self.board[61] = ROOK, EMPTY
+            if to == 58: self.board[56], self.board[59] = ROOK, EMPTY
+            if to == 6: self.board[7], self.board[5] = -ROOK, EMPTY
+            if to == 2: self.board[0], self.board[3] = -ROOK, EMPTY
+        self.castle = undo.castle
+        self.ep = undo.ep
+        self.hash = undo.hash
         self.side ^= 1
-
-    def snapshot(self):
-        return self.board[:], self.side, self.castle.copy(), self.ep
-
-    def restore(self, s):
-        self.board, self.side, self.castle, self.ep = s
 
     def friend(self, i, side):
-        return self.board[i] != EMPTY and self.board[i].isupper() == (side == WHITE)
+        return self.board[i] > 0 if side == WHITE else self.board[i] < 0
 
     def enemy(self, i, side):
-        return self.board[i] != EMPTY and not self.friend(i, side)
+        return self.board[i] < 0 if side == WHITE else self.board[i] > 0
 
 
 # ================= search =================
 
 class Search:
+    __slots__ = ('b', 'tt', 'killers')
+
     def __init__(self, board):
         self.b = board
+        # Entries are (hash, depth, score, flag, best move) tuples
+        self.tt = [None] * TT_SIZE
+        # Two quiet moves per ply that last caused a beta cutoff
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
 
     def eval(self):
-        return sum(PIECE_VALUE.get(p, 0) for p in self.b.board)
-
-    def alphabeta(self, d, a, b):
+        return sum(PIECE_VALUE[p] for p in self.b.board)
+
+    def order(self, moves, tt_move, ply):
+        # Sort in place: TT move, captures (most valuable victim first,
+        # then least valuable attacker), killers, the other quiet moves
+        board = self.b.board
+        k1, k2 = self.killers[ply] if ply < MAX_PLY else (0, 0)
+
+        def score(m):
+            if m == tt_move:
+                return ORDER_TT
+            victim = board[m >> TO_SHIFT & FROM_MASK]
+            if victim != EMPTY or m & FLAG_EP:
+                return (ORDER_CAPTURE + 10 * abs(PIECE_VALUE[victim] or 100)
+                        - abs(PIECE_VALUE[board[m & FROM_MASK]]))
+            if m == k1 or m == k2:
+                return ORDER_KILLER
+            return 0
+
+        moves.sort(key=score, reverse=True)
+
+    def alphabeta(self, d, a, b, ply=1):
         if d == 0:
             return self.eval()
+        h = self.b.hash
+        entry = self.probe(h)
+        tt_move = None
+        if entry is not None:
+            tt_move = entry[4]
+            if entry[1] >= d:
+                score, flag = entry[2], entry[3]
+                if flag == TT_EXACT:
+                    return score
+                if flag == TT_LOWER and score >= b:
+                    return b
+                if flag == TT_UPPER and score <= a:
+                    return a
         moves = self.b.generate_moves()
         if not moves:
             return -99999 if self.b.in_check(self.b.side) else 0
+        self.order(moves, tt_move, ply)
+        a0, best = a, moves[0]
         for m in moves:
-            s = self.b.snapshot()
-            self.b.make(m)
-            v = -self.alphabeta(d - 1, -b, -a)
-            self.b.restore(s)
+            quiet = self.b.board[m >> TO_SHIFT & FROM_MASK] == EMPTY and not m & FLAG_EP
+            undo = self.b.make(m)
+            v = -self.alphabeta(d - 1, -b, -a, ply + 1)
+            self.b.unmake(m, undo)
             if v >= b:
+                if quiet and ply < MAX_PLY and m != self.killers[ply][0]:
+                    self.killers[ply][1] = self.killers[ply][0]
+                    self.killers[ply][0] = m
+                self.store(h, d, b, TT_LOWER, m)
                 return b
-            a = max(a, v)
+            if v > a:
+                a, best = v, m
+        self.store(h, d, a, TT_EXACT if a > a0 else TT_UPPER, best)
         return a
 
+    def probe(self, h):
+        base = h & (TT_SIZE - 1) & ~1
+        entry = self.tt[base]
+        if entry is not None and entry[0] == h:
+            return entry
+        entry = self.tt[base + 1]
+        if entry is not None and entry[0] == h:
+            return entry
+        return None
+
+    def store(self, h, d, score, flag, move):
+        # The first slot of the bucket keeps the deepest search seen, the
+        # second always takes the newest entry, so shallow results near the
+        # leaves cannot push out expensive ones. Buckets are aligned pairs,
+        # so one hash's second slot is never another hash's first
+        base = h & (TT_SIZE - 1) & ~1
+        entry = self.tt[base]
+        if entry is None or entry[0] == h or d >= entry[1]:
+            self.tt[base] = (h, d, score, flag, move)
+        else:
+            self.tt[base + 1] = (h, d, score, flag, move)
+
     def best(self, d):
         best, score = None, -10**9
-        for m in self.b.generate_moves():
-            s = self.b.snapshot()
-            self.b.make(m)
+        moves = self.b.generate_moves()
+        self.order(moves, None, 0)
+        for m in moves:
+            undo = self.b.make(m)
             v = -self.alphabeta(d - 1, -10**9, 10**9)
-            self.b.restore(s)
+            self.b.unmake(m, undo)
             if v > score:
                 best, score = m, v
         return best
@@ -271,7 +577,7 @@ class UCI:
             elif l.startswith('go'):
                 d = int(l.split()[-1]) if 'depth' in l else 3
                 m = self.s.best(d)
-                print('bestmove', m.uci() if m else '0000')
+                print('bestmove', move_uci(m) if m else '0000')
             elif l == 'quit':
                 break
 
@@ -285,11 +591,14 @@ class UCI:
             idx = 8
         if idx < len(p) and p[idx] == 'moves':
             for mv in p[idx + 1:]:
-                self.b.make(Move(
-                    sq_idx(mv[:2]),
-                    sq_idx(mv[2:4]),
-                    mv[4] if len(mv) > 4 else None
-                ))
+                promo = 0
+                if len(mv) > 4:
+                    # GUIs may send the promotion letter in either case
+                    promo = 'nbrq'.find(mv[4].lower()) + 1
+                    if not promo:
+                        break
+                self.b.make(sq_idx(mv[:2]) | sq_idx(mv[2:4]) << TO_SHIFT
+                            | promo << PROMO_SHIFT)
 
 
 def sq_name(i):
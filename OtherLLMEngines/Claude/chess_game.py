@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import pygame
+import random
 import sys
-from copy import deepcopy
+from array import array
 
 # Инициализация Pygame
 pygame.init()
@@ -20,32 +21,135 @@ GRAY = (118, 150, 86)
 YELLOW = (247, 247, 105)
 HIGHLIGHT_COLOR = (186, 202, 68)
 
+# Шрифты создаются один раз: SysFont при каждом вызове заново ищет шрифт в системе
+# Фигуры рисуются шрифтом сразу под размер клетки, без масштабирования картинки
+PIECE_FONT = pygame.font.SysFont('Arial', SQ_SIZE - 20, True, False)
+BANNER_FONT = pygame.font.SysFont('Arial', 32, True, False)
+MENU_TITLE_FONT = pygame.font.SysFont('Arial', 48, True, False)
+MENU_OPT_FONT = pygame.font.SysFont('Arial', 32, True, False)
+TEXT_SURFACES = {}  # текст сообщения -> (красная надпись, тень, позиция)
+BOARD_SURFACES = {}  # фон доски и полупрозрачные подсветки, создаются в load_board_surfaces
+
+# Коды фигур: младшие 3 бита - тип фигуры, бит 8 - черный цвет, 0 - пустая клетка
+EMPTY = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = 1, 2, 3, 4, 5, 6
+BLACK = 8
+WP, WN, WB, WR, WQ, WK = 1, 2, 3, 4, 5, 6
+BP, BN, BB, BR, BQ, BK = 9, 10, 11, 12, 13, 14
+
+# Соответствие кодов и текстовых имен фигур ("--" - пустая клетка)
+PIECE_CODES = {
+    '--': EMPTY,
+    'wp': WP, 'wN': WN, 'wB': WB, 'wR': WR, 'wQ': WQ, 'wK': WK,
+    'bp': BP, 'bN': BN, 'bB': BB, 'bR': BR, 'bQ': BQ, 'bK': BK
+}
+PIECE_NAMES = {v: k for k, v in PIECE_CODES.items()}
+
+# Материал по коду фигуры: белые со знаком плюс, черные со знаком минус
+PIECE_SCORE = (0, 1, 3, 3, 5, 9, 0, 0,
+               0, -1, -3, -3, -5, -9, 0, 0)
+
+# Направления (dr, dc) для проверки атак на клетку
+ORTHOGONAL_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+DIAGONAL_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+KNIGHT_OFFSETS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+KING_OFFSETS = ORTHOGONAL_DIRECTIONS + DIAGONAL_DIRECTIONS
+
+# Клетки, куда конь и король могут пойти с каждой из 64 клеток (индексы r * 8 + c)
+KNIGHT_TARGETS = tuple(
+    tuple((r + dr) * 8 + c + dc for dr, dc in KNIGHT_OFFSETS if 0 <= r + dr < 8 and 0 <= c + dc < 8)
+    for r in range(8) for c in range(8))
+KING_TARGETS = tuple(
+    tuple((r + dr) * 8 + c + dc for dr, dc in sorted(KING_OFFSETS) if 0 <= r + dr < 8 and 0 <= c + dc < 8)
+    for r in range(8) for c in range(8))
+
+def _build_rays(directions):
+    """Для каждой клетки - лучи по направлениям directions (в том же порядке) до края доски"""
+    rays = []
+    for r in range(8):
+        for c in range(8):
+            square_rays = []
+            for dr, dc in directions:
+                ray = []
+                end_row, end_col = r + dr, c + dc
+                while 0 <= end_row < 8 and 0 <= end_col < 8:
+                    ray.append(end_row * 8 + end_col)
+                    end_row += dr
+                    end_col += dc
+                square_rays.append(tuple(ray))
+            rays.append(tuple(square_rays))
+    return tuple(rays)
+
+ROOK_RAYS = _build_rays(ORTHOGONAL_DIRECTIONS)
+BISHOP_RAYS = _build_rays(DIAGONAL_DIRECTIONS)
+# Координаты (r, c) клетки по ее индексу
+SQUARE_COORDS = tuple((sq >> 3, sq & 7) for sq in range(64))
+
+# Ключи Zobrist: фигура на клетке, очередь хода, права на рокировку (4 бита)
+# и вертикаль взятия на проходе. Фиксированное зерно дает одинаковые хеши между запусками
+_zobrist_rng = random.Random(2024)
+ZOBRIST_PIECE = [[_zobrist_rng.getrandbits(64) for _ in range(64)] for _ in range(16)]
+ZOBRIST_SIDE = _zobrist_rng.getrandbits(64)
+ZOBRIST_CASTLE = [_zobrist_rng.getrandbits(64) for _ in range(16)]
+ZOBRIST_EP = [_zobrist_rng.getrandbits(64) for _ in range(8)]
+
+# Флаги записей транспозиционной таблицы
+TT_EXACT, TT_LOWER, TT_UPPER = 0, 1, 2
+TT_MAX_ENTRIES = 1 << 21
+# Предел кэша легальных ходов по хешу позиции (самые старые записи вытесняются первыми)
+MOVE_CACHE_MAX_ENTRIES = 200000
+
 # Загрузка изображений фигур
 def load_images():
     pieces = ['wp', 'wR', 'wN', 'wB', 'wQ', 'wK', 'bp', 'bR', 'bN', 'bB', 'bQ', 'bK']
     for piece in pieces:
         # Создаем простые изображения фигур с помощью текста
-        font = pygame.font.SysFont('Arial', 50, True, False)
         piece_symbols = {
             'wp': '♙', 'wR': '♖', 'wN': '♘', 'wB': '♗', 'wQ': '♕', 'wK': '♔',
             'bp': '♟', 'bR': '♜', 'bN': '♞', 'bB': '♝', 'bQ': '♛', 'bK': '♚'
         }
-        text = font.render(piece_symbols[piece], True, (0, 0, 0) if piece[0] == 'w' else (255, 255, 255))
-        IMAGES[piece] = pygame.transform.scale(text, (SQ_SIZE - 10, SQ_SIZE - 10))
+        text = PIECE_FONT.render(piece_symbols[piece], True, (0, 0, 0) if piece[0] == 'w' else (255, 255, 255))
+        # convert_alpha приводит картинку к формату экрана, поэтому load_images вызывается после set_mode
+        IMAGES[PIECE_CODES[piece]] = text.convert_alpha()
 
+def load_board_surfaces():
+    """Рисует клетчатый фон доски и подсветки клеток один раз (нужен уже открытый экран)"""
+    board_bg = pygame.Surface((WIDTH, HEIGHT)).convert()
+    colors = [WHITE, GRAY]
+    for r in range(DIMENSION):
+        for c in range(DIMENSION):
+            color = colors[((r + c) % 2)]
+            pygame.draw.rect(board_bg, color, pygame.Rect(c * SQ_SIZE, r * SQ_SIZE, SQ_SIZE, SQ_SIZE))
+    BOARD_SURFACES['board'] = board_bg
+    for name, color in (('selected', YELLOW), ('move', HIGHLIGHT_COLOR)):
+        s = pygame.Surface((SQ_SIZE, SQ_SIZE)).convert()
+        s.set_alpha(100)
+        s.fill(color)
+        BOARD_SURFACES[name] = s
+
+# Поиск работает с одним GameState: каждый make_move отменяется своим undo_move,
+# копировать состояние (deepcopy и т.п.) нельзя. Если понадобится снимок позиции
+# (например, для параллельного поиска), хранить hash, очередь хода, права на рокировку,
+# поле взятия на проходе и длину move_log и восстанавливать их повтором ходов, а не копией доски.
 class GameState:
+    __slots__ = ('board', 'white_to_move', 'move_log', 'white_king_location', 'black_king_location',
+                 'checkmate', 'stalemate', 'enpassant_possible', 'current_castling_right',
+                 'undo_stack', 'white_piece_squares', 'black_piece_squares', 'hash',
+                 'move_cache', 'material_score')
+    
     def __init__(self):
-        # Доска 8x8, "--" означает пустую клетку
-        self.board = [
-            ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],
-            ["bp", "bp", "bp", "bp", "bp", "bp", "bp", "bp"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["wp", "wp", "wp", "wp", "wp", "wp", "wp", "wp"],
-            ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]
-        ]
+        # Доска из 64 байт, клетка (r, c) лежит по индексу r * 8 + c,
+        # EMPTY означает пустую клетку
+        self.board = bytearray([
+            BR, BN, BB, BQ, BK, BB, BN, BR,
+            BP, BP, BP, BP, BP, BP, BP, BP,
+            EMPTY, EMPTY, EMPTY, EMPTY, EMPTY, EMPTY, EMPTY, EMPTY,
+            EMPTY, EMPTY, EMPTY, EMPTY, EMPTY, EMPTY, EMPTY, EMPTY,
+            EMPTY, EMPTY, EMPTY, EMPTY, EMPTY, EMPTY, EMPTY, EMPTY,
+            EMPTY, EMPTY, EMPTY, EMPTY, EMPTY, EMPTY, EMPTY, EMPTY,
+            WP, WP, WP, WP, WP, WP, WP, WP,
+            WR, WN, WB, WQ, WK, WB, WN, WR
+        ])
         self.white_to_move = True
         self.move_log = []
         self.white_king_location = (7, 4)
@@ -53,101 +157,182 @@ class GameState:
         self.checkmate = False
         self.stalemate = False
         self.enpassant_possible = ()  # координаты клетки, где возможно взятие на проходе
-        self.enpassant_possible_log = [self.enpassant_possible]
         self.current_castling_right = CastleRights(True, True, True, True)
-        self.castle_rights_log = [CastleRights(self.current_castling_right.wks, self.current_castling_right.bks,
-                                                self.current_castling_right.wqs, self.current_castling_right.bqs)]
+        # Стек отмены: на каждый ход два числа - права на рокировку и поле взятия
+        # на проходе до хода (castle_index | (r * 8 + c + 1) << 4, 0 - нет поля) и хеш до хода
+        self.undo_stack = array('Q')
+        # Клетки, занятые фигурами каждой стороны, чтобы генератор не обходил всю доску
+        self.white_piece_squares = {sq for sq, piece in enumerate(self.board) if piece != EMPTY and not piece & BLACK}
+        self.black_piece_squares = {sq for sq, piece in enumerate(self.board) if piece & BLACK}
+        self.hash = self.compute_hash()
+        # Материальный баланс (плюс - в пользу белых), меняется только при взятиях и превращениях
+        self.material_score = sum(PIECE_SCORE[piece] for piece in self.board)
+        self.move_cache = {}  # hash -> (ходы, checkmate, stalemate)
+    
+    def compute_hash(self):
+        """Считает Zobrist-хеш позиции с нуля"""
+        h = 0
+        for sq, piece in enumerate(self.board):
+            if piece != EMPTY:
+                h ^= ZOBRIST_PIECE[piece][sq]
+        if not self.white_to_move:
+            h ^= ZOBRIST_SIDE
+        h ^= ZOBRIST_CASTLE[self.castle_index()]
+        if self.enpassant_possible:
+            h ^= ZOBRIST_EP[self.enpassant_possible[1]]
+        return h
+    
+    def castle_index(self):
+        """Права на рокировку в виде 4-битного числа для таблицы ZOBRIST_CASTLE"""
+        cr = self.current_castling_right
+        return cr.wks | cr.wqs << 1 | cr.bks << 2 | cr.bqs << 3
         
     def make_move(self, move):
-        self.board[move.start_row][move.start_col] = "--"
-        self.board[move.end_row][move.end_col] = move.piece_moved
+        board = self.board
+        start_sq = move.start_row * 8 + move.start_col
+        end_sq = move.end_row * 8 + move.end_col
+        castle_index = self.castle_index()
+        ep = self.enpassant_possible
+        self.undo_stack.append(castle_index | (ep[0] * 8 + ep[1] + 1 if ep else 0) << 4)
+        self.undo_stack.append(self.hash)
+        h = self.hash ^ ZOBRIST_SIDE ^ ZOBRIST_CASTLE[castle_index]
+        h ^= ZOBRIST_PIECE[move.piece_moved][start_sq] ^ ZOBRIST_PIECE[move.piece_moved][end_sq]
+        if self.enpassant_possible:
+            h ^= ZOBRIST_EP[self.enpassant_possible[1]]
+        if move.piece_captured != EMPTY:
+            self.material_score -= PIECE_SCORE[move.piece_captured]
+            if not move.is_enpassant_move:
+                h ^= ZOBRIST_PIECE[move.piece_captured][end_sq]
+        
+        if move.piece_moved & BLACK:
+            own_squares, enemy_squares = self.black_piece_squares, self.white_piece_squares
+        else:
+            own_squares, enemy_squares = self.white_piece_squares, self.black_piece_squares
+        own_squares.discard(start_sq)
+        own_squares.add(end_sq)
+        enemy_squares.discard(end_sq)
+        
+        board[start_sq] = EMPTY
+        board[end_sq] = move.piece_moved
         self.move_log.append(move)
         self.white_to_move = not self.white_to_move
         
         # Обновление позиции короля
-        if move.piece_moved == 'wK':
+        if move.piece_moved == WK:
             self.white_king_location = (move.end_row, move.end_col)
-        elif move.piece_moved == 'bK':
+        elif move.piece_moved == BK:
             self.black_king_location = (move.end_row, move.end_col)
             
         # Превращение пешки
         if move.pawn_promotion:
-            self.board[move.end_row][move.end_col] = move.piece_moved[0] + 'Q'
+            queen = (move.piece_moved & BLACK) | QUEEN
+            board[end_sq] = queen
+            self.material_score += PIECE_SCORE[queen] - PIECE_SCORE[move.piece_moved]
+            h ^= ZOBRIST_PIECE[move.piece_moved][end_sq] ^ ZOBRIST_PIECE[queen][end_sq]
         
         # Взятие на проходе
         if move.is_enpassant_move:
-            self.board[move.start_row][move.end_col] = '--'  # убираем пешку
+            captured_sq = move.start_row * 8 + move.end_col
+            board[captured_sq] = EMPTY  # убираем пешку
+            enemy_squares.discard(captured_sq)
+            h ^= ZOBRIST_PIECE[move.piece_captured][captured_sq]
         
         # Обновление переменной enpassant_possible
-        if move.piece_moved[1] == 'p' and abs(move.start_row - move.end_row) == 2:
+        if move.piece_moved & 7 == PAWN and abs(move.start_row - move.end_row) == 2:
             self.enpassant_possible = ((move.start_row + move.end_row) // 2, move.start_col)
+            h ^= ZOBRIST_EP[move.start_col]
         else:
             self.enpassant_possible = ()
         
         # Рокировка
         if move.is_castle_move:
             if move.end_col - move.start_col == 2:  # Короткая рокировка
-                self.board[move.end_row][move.end_col - 1] = self.board[move.end_row][move.end_col + 1]
-                self.board[move.end_row][move.end_col + 1] = '--'
+                rook_from, rook_to = end_sq + 1, end_sq - 1
             else:  # Длинная рокировка
-                self.board[move.end_row][move.end_col + 1] = self.board[move.end_row][move.end_col - 2]
-                self.board[move.end_row][move.end_col - 2] = '--'
+                rook_from, rook_to = end_sq - 2, end_sq + 1
+            rook = board[rook_from]
+            board[rook_to] = rook
+            board[rook_from] = EMPTY
+            own_squares.discard(rook_from)
+            own_squares.add(rook_to)
+            h ^= ZOBRIST_PIECE[rook][rook_from] ^ ZOBRIST_PIECE[rook][rook_to]
         
-        self.enpassant_possible_log.append(self.enpassant_possible)
-        
-        # Обновление прав на рокировку
+        # Обновление прав на рокировку: меняем новую копию, а не текущий объект -
+        # он может быть общим из CASTLE_RIGHTS, который восстанавливает undo_move
+        self.current_castling_right = CastleRights(self.current_castling_right.wks, self.current_castling_right.wqs,
+                                                   self.current_castling_right.bks, self.current_castling_right.bqs)
         self.update_castle_rights(move)
-        self.castle_rights_log.append(CastleRights(self.current_castling_right.wks, self.current_castling_right.wqs,
-                                                     self.current_castling_right.bks, self.current_castling_right.bqs))
+        self.hash = h ^ ZOBRIST_CASTLE[self.castle_index()]
     
     def undo_move(self):
         if len(self.move_log) != 0:
             move = self.move_log.pop()
-            self.board[move.start_row][move.start_col] = move.piece_moved
-            self.board[move.end_row][move.end_col] = move.piece_captured
+            board = self.board
+            start_sq = move.start_row * 8 + move.start_col
+            end_sq = move.end_row * 8 + move.end_col
+            board[start_sq] = move.piece_moved
+            board[end_sq] = move.piece_captured
             self.white_to_move = not self.white_to_move
             
-            if move.piece_moved == 'wK':
+            if move.piece_moved & BLACK:
+                own_squares, enemy_squares = self.black_piece_squares, self.white_piece_squares
+            else:
+                own_squares, enemy_squares = self.white_piece_squares, self.black_piece_squares
+            own_squares.discard(end_sq)
+            own_squares.add(start_sq)
+            if move.piece_captured != EMPTY:
+                self.material_score += PIECE_SCORE[move.piece_captured]
+                if not move.is_enpassant_move:
+                    enemy_squares.add(end_sq)
+            if move.pawn_promotion:
+                self.material_score -= PIECE_SCORE[(move.piece_moved & BLACK) | QUEEN] - PIECE_SCORE[move.piece_moved]
+            
+            if move.piece_moved == WK:
                 self.white_king_location = (move.start_row, move.start_col)
-            elif move.piece_moved == 'bK':
+            elif move.piece_moved == BK:
                 self.black_king_location = (move.start_row, move.start_col)
             
             # Отмена взятия на проходе
             if move.is_enpassant_move:
-                self.board[move.end_row][move.end_col] = '--'
-                self.board[move.start_row][move.end_col] = move.piece_captured
+                board[end_sq] = EMPTY
+                board[move.start_row * 8 + move.end_col] = move.piece_captured
+                enemy_squares.add(move.start_row * 8 + move.end_col)
             
-            self.enpassant_possible_log.pop()
-            self.enpassant_possible = self.enpassant_possible_log[-1]
+            self.hash = self.undo_stack.pop()
+            state = self.undo_stack.pop()
+            ep_code = state >> 4
+            self.enpassant_possible = SQUARE_COORDS[ep_code - 1] if ep_code else ()
             
             # Отмена рокировки
             if move.is_castle_move:
                 if move.end_col - move.start_col == 2:  # Короткая рокировка
-                    self.board[move.end_row][move.end_col + 1] = self.board[move.end_row][move.end_col - 1]
-                    self.board[move.end_row][move.end_col - 1] = '--'
+                    rook_from, rook_to = end_sq + 1, end_sq - 1
                 else:  # Длинная рокировка
-                    self.board[move.end_row][move.end_col - 2] = self.board[move.end_row][move.end_col + 1]
-                    self.board[move.end_row][move.end_col + 1] = '--'
+                    rook_from, rook_to = end_sq - 2, end_sq + 1
+                board[rook_from] = board[rook_to]
+                board[rook_to] = EMPTY
+                own_squares.discard(rook_to)
+                own_squares.add(rook_from)
             
-            # Отмена изменений прав на рокировку
-            self.castle_rights_log.pop()
-            self.current_castling_right = self.castle_rights_log[-1]
+            # Отмена изменений прав на рокировку (объекты CASTLE_RIGHTS общие и не изменяются:
+            # make_move всегда меняет собственную копию)
+            self.current_castling_right = CASTLE_RIGHTS[state & 15]
     
     def update_castle_rights(self, move):
         """Обновляет права на рокировку после хода"""
-        if move.piece_moved == 'wK':
+        if move.piece_moved == WK:
             self.current_castling_right.wks = False
             self.current_castling_right.wqs = False
-        elif move.piece_moved == 'bK':
+        elif move.piece_moved == BK:
             self.current_castling_right.bks = False
             self.current_castling_right.bqs = False
-        elif move.piece_moved == 'wR':
+        elif move.piece_moved == WR:
             if move.start_row == 7:
                 if move.start_col == 0:
                     self.current_castling_right.wqs = False
                 elif move.start_col == 7:
                     self.current_castling_right.wks = False
-        elif move.piece_moved == 'bR':
+        elif move.piece_moved == BR:
             if move.start_row == 0:
                 if move.start_col == 0:
                     self.current_castling_right.bqs = False
@@ -155,49 +340,127 @@ class GameState:
                     self.current_castling_right.bks = False
         
         # Если ладья была взята
-        if move.piece_captured == 'wR':
+        if move.piece_captured == WR:
             if move.end_row == 7:
                 if move.end_col == 0:
                     self.current_castling_right.wqs = False
                 elif move.end_col == 7:
                     self.current_castling_right.wks = False
-        elif move.piece_captured == 'bR':
+        elif move.piece_captured == BR:
             if move.end_row == 0:
                 if move.end_col == 0:
                     self.current_castling_right.bqs = False
                 elif move.end_col == 7:
                     self.current_castling_right.bks = False
     
-    def get_valid_moves(self):
-        # Получение всех возможных ходов с учетом шахов
-        temp_castle_rights = CastleRights(self.current_castling_right.wks, self.current_castling_right.wqs,
-                                          self.current_castling_right.bks, self.current_castling_right.bqs)
+    def get_valid_moves(self, use_cache=False):
+        """Возвращает (ходы, мат, пат) для стороны, которая ходит.
+
+        Флаги self.checkmate и self.stalemate не меняются: их выставляет вызывающий код
+        для позиции на доске, а поиск берет признаки конца игры из возвращаемого кортежа.
+        С use_cache список берется из кэша по хешу позиции, если она уже встречалась.
+        """
+        if use_cache:
+            cached = self.move_cache.get(self.hash)
+            if cached is not None:
+                moves, is_checkmate, is_stalemate = cached
+                return list(moves), is_checkmate, is_stalemate
+        
         moves = self.get_all_possible_moves()
-        if self.white_to_move:
-            self.get_castle_moves(self.white_king_location[0], self.white_king_location[1], moves)
-        else:
-            self.get_castle_moves(self.black_king_location[0], self.black_king_location[1], moves)
         
         # Фильтрация ходов, которые оставляют короля под шахом
+        board = self.board
+        king_r, king_c = self.white_king_location if self.white_to_move else self.black_king_location
+        king_sq = king_r * 8 + king_c
+        pins, checks = self.check_for_pins_and_checks()
         for i in range(len(moves) - 1, -1, -1):
-            self.make_move(moves[i])
-            self.white_to_move = not self.white_to_move
-            if self.in_check():
-                moves.remove(moves[i])
-            self.white_to_move = not self.white_to_move
-            self.undo_move()
-        
-        if len(moves) == 0:
-            if self.in_check():
-                self.checkmate = True
+            move = moves[i]
+            if move.piece_moved & 7 == KING:
+                # Король убирается с доски, чтобы дальнобойная фигура била сквозь его старое поле
+                king = board[king_sq]
+                board[king_sq] = EMPTY
+                legal = not self.square_under_attack(move.end_row, move.end_col)
+                board[king_sq] = king
+            elif move.is_enpassant_move:
+                # Взятие на проходе снимает с линии сразу две пешки, проверяем его ходом по доске
+                self.make_move(move)
+                legal = not self.square_under_attack(king_r, king_c, self.white_to_move)
+                self.undo_move()
+            elif len(checks) > 1:
+                legal = False  # от двойного шаха уходит только король
             else:
-                self.stalemate = True
+                legal = not checks or move.end_row * 8 + move.end_col in checks[0]
+                pin = pins.get(move.start_row * 8 + move.start_col)
+                if legal and pin is not None:
+                    # Связанная фигура может ходить только вдоль линии связки
+                    legal = (move.end_row - king_r) * pin[1] == (move.end_col - king_c) * pin[0]
+            if not legal:
+                # Порядок ходов не важен: ставим на место хода последний и укорачиваем список
+                moves[i] = moves[-1]
+                moves.pop()
+        
+        # Рокировка под шахом запрещена, поэтому ее ходы ищем только без шаха
+        if not checks:
+            self.get_castle_moves(king_r, king_c, moves)
+        
+        is_checkmate = len(moves) == 0 and len(checks) > 0
+        is_stalemate = len(moves) == 0 and len(checks) == 0
+        if use_cache:
+            cache = self.move_cache
+            if len(cache) >= MOVE_CACHE_MAX_ENTRIES:
+                del cache[next(iter(cache))]
+            cache[self.hash] = (tuple(moves), is_checkmate, is_stalemate)
+        return moves, is_checkmate, is_stalemate
+    
+    def check_for_pins_and_checks(self):
+        """Находит связанные фигуры и шахи королю стороны, которая ходит.
+
+        Возвращает словарь {клетка связанной фигуры: направление (dr, dc) от короля}
+        и список шахов: для каждого шахующей фигуры - множество клеток, где шах
+        можно закрыть или взять шахующую фигуру.
+        """
+        board = self.board
+        if self.white_to_move:
+            king_r, king_c = self.white_king_location
+            ally, enemy = 0, BLACK
         else:
-            self.checkmate = False
-            self.stalemate = False
+            king_r, king_c = self.black_king_location
+            ally, enemy = BLACK, 0
+        pins = {}
+        checks = []
         
-        self.current_castling_right = temp_castle_rights
-        return moves
+        king_sq = king_r * 8 + king_c
+        for directions, rays, slider in ((ORTHOGONAL_DIRECTIONS, ROOK_RAYS[king_sq], ROOK),
+                                         (DIAGONAL_DIRECTIONS, BISHOP_RAYS[king_sq], BISHOP)):
+            for direction, ray in zip(directions, rays):
+                possible_pin = None
+                for i, sq in enumerate(ray):
+                    piece = board[sq]
+                    if piece != EMPTY:
+                        if piece & BLACK == ally:
+                            if possible_pin is not None:
+                                break  # две свои фигуры на луче - связки нет
+                            possible_pin = sq
+                        else:
+                            if piece & 7 == slider or piece & 7 == QUEEN:
+                                if possible_pin is None:
+                                    checks.append(set(ray[:i + 1]))
+                                else:
+                                    pins[possible_pin] = direction
+                            break
+        
+        knight = enemy | KNIGHT
+        for end_sq in KNIGHT_TARGETS[king_sq]:
+            if board[end_sq] == knight:
+                checks.append({end_sq})
+        
+        # Черные пешки бьют белого короля с ряда выше, белые пешки черного - с ряда ниже
+        pawn_row = king_r - 1 if self.white_to_move else king_r + 1
+        if 0 <= pawn_row < 8:
+            for pawn_col in (king_c - 1, king_c + 1):
+                if 0 <= pawn_col < 8 and board[pawn_row * 8 + pawn_col] == enemy | PAWN:
+                    checks.append({pawn_row * 8 + pawn_col})
+        return pins, checks
     
     def in_check(self):
         if self.white_to_move:
@@ -205,186 +468,214 @@ class GameState:
         else:
             return self.square_under_attack(self.black_king_location[0], self.black_king_location[1])
     
-    def square_under_attack(self, r, c):
-        self.white_to_move = not self.white_to_move
-        opp_moves = self.get_all_possible_moves()
-        self.white_to_move = not self.white_to_move
-        for move in opp_moves:
-            if move.end_row == r and move.end_col == c:
+    def square_under_attack(self, r, c, by_white=None):
+        """Атакована ли клетка (r, c) фигурами стороны by_white.
+
+        По умолчанию атакующей считается сторона, которая сейчас не ходит.
+        Лучи и прыжки строятся от самой клетки, поэтому ходы соперника не генерируются.
+        """
+        if by_white is None:
+            by_white = not self.white_to_move
+        board = self.board
+        enemy = 0 if by_white else BLACK
+
+        # Ладьи и ферзи по вертикалям и горизонталям, слоны и ферзи по диагоналям
+        sq = r * 8 + c
+        for rays, slider in ((ROOK_RAYS[sq], ROOK), (BISHOP_RAYS[sq], BISHOP)):
+            for ray in rays:
+                for end_sq in ray:
+                    piece = board[end_sq]
+                    if piece != EMPTY:
+                        if piece & BLACK == enemy and (piece & 7 == slider or piece & 7 == QUEEN):
+                            return True
+                        break
+
+        # Кони и король
+        knight = enemy | KNIGHT
+        for end_sq in KNIGHT_TARGETS[sq]:
+            if board[end_sq] == knight:
+                return True
+        king = enemy | KING
+        for end_sq in KING_TARGETS[sq]:
+            if board[end_sq] == king:
+                return True
+
+        # Белые пешки бьют вверх, поэтому стоят на ряд ниже клетки, черные - на ряд выше
+        pawn_row = r + 1 if by_white else r - 1
+        if 0 <= pawn_row < 8:
+            pawn = enemy | PAWN
+            if c > 0 and board[pawn_row * 8 + c - 1] == pawn:
+                return True
+            if c < 7 and board[pawn_row * 8 + c + 1] == pawn:
                 return True
         return False
     
     def get_all_possible_moves(self):
         moves = []
-        for r in range(len(self.board)):
-            for c in range(len(self.board[r])):
-                turn = self.board[r][c][0]
-                if (turn == 'w' and self.white_to_move) or (turn == 'b' and not self.white_to_move):
-                    piece = self.board[r][c][1]
-                    if piece == 'p':
-                        self.get_pawn_moves(r, c, moves)
-                    elif piece == 'R':
-                        self.get_rook_moves(r, c, moves)
-                    elif piece == 'N':
-                        self.get_knight_moves(r, c, moves)
-                    elif piece == 'B':
-                        self.get_bishop_moves(r, c, moves)
-                    elif piece == 'Q':
-                        self.get_queen_moves(r, c, moves)
-                    elif piece == 'K':
-                        self.get_king_moves(r, c, moves)
+        board = self.board
+        for sq in (self.white_piece_squares if self.white_to_move else self.black_piece_squares):
+            piece = board[sq] & 7
+            if piece == PAWN:
+                self.get_pawn_moves(sq >> 3, sq & 7, moves)
+            elif piece == ROOK:
+                self.get_rook_moves(sq, moves)
+            elif piece == KNIGHT:
+                self.get_knight_moves(sq, moves)
+            elif piece == BISHOP:
+                self.get_bishop_moves(sq, moves)
+            elif piece == QUEEN:
+                self.get_queen_moves(sq, moves)
+            elif piece == KING:
+                self.get_king_moves(sq, moves)
         return moves
     
     def get_pawn_moves(self, r, c, moves):
+        board = self.board
+        sq = r * 8 + c
         if self.white_to_move:
-            if self.board[r-1][c] == "--":
-                moves.append(Move((r, c), (r-1, c), self.board))
-                if r == 6 and self.board[r-2][c] == "--":
-                    moves.append(Move((r, c), (r-2, c), self.board))
+            if board[sq - 8] == EMPTY:
+                moves.append(Move((r, c), (r-1, c), board))
+                if r == 6 and board[sq - 16] == EMPTY:
+                    moves.append(Move((r, c), (r-2, c), board))
             if c - 1 >= 0:
-                if self.board[r-1][c-1][0] == 'b':
-                    moves.append(Move((r, c), (r-1, c-1), self.board))
+                if board[sq - 9] & BLACK:
+                    moves.append(Move((r, c), (r-1, c-1), board))
                 elif (r-1, c-1) == self.enpassant_possible:
-                    moves.append(Move((r, c), (r-1, c-1), self.board, is_enpassant_move=True))
+                    moves.append(Move((r, c), (r-1, c-1), board, is_enpassant_move=True))
             if c + 1 <= 7:
-                if self.board[r-1][c+1][0] == 'b':
-                    moves.append(Move((r, c), (r-1, c+1), self.board))
+                if board[sq - 7] & BLACK:
+                    moves.append(Move((r, c), (r-1, c+1), board))
                 elif (r-1, c+1) == self.enpassant_possible:
-                    moves.append(Move((r, c), (r-1, c+1), self.board, is_enpassant_move=True))
+                    moves.append(Move((r, c), (r-1, c+1), board, is_enpassant_move=True))
         else:
-            if self.board[r+1][c] == "--":
-                moves.append(Move((r, c), (r+1, c), self.board))
-                if r == 1 and self.board[r+2][c] == "--":
-                    moves.append(Move((r, c), (r+2, c), self.board))
+            if board[sq + 8] == EMPTY:
+                moves.append(Move((r, c), (r+1, c), board))
+                if r == 1 and board[sq + 16] == EMPTY:
+                    moves.append(Move((r, c), (r+2, c), board))
             if c - 1 >= 0:
-                if self.board[r+1][c-1][0] == 'w':
-                    moves.append(Move((r, c), (r+1, c-1), self.board))
+                target = board[sq + 7]
+                if target != EMPTY and not target & BLACK:
+                    moves.append(Move((r, c), (r+1, c-1), board))
                 elif (r+1, c-1) == self.enpassant_possible:
-                    moves.append(Move((r, c), (r+1, c-1), self.board, is_enpassant_move=True))
+                    moves.append(Move((r, c), (r+1, c-1), board, is_enpassant_move=True))
             if c + 1 <= 7:
-                if self.board[r+1][c+1][0] == 'w':
-                    moves.append(Move((r, c), (r+1, c+1), self.board))
+                target = board[sq + 9]
+                if target != EMPTY and not target & BLACK:
+                    moves.append(Move((r, c), (r+1, c+1), board))
                 elif (r+1, c+1) == self.enpassant_possible:
-                    moves.append(Move((r, c), (r+1, c+1), self.board, is_enpassant_move=True))
-    
-    def get_rook_moves(self, r, c, moves):
-        directions = ((-1, 0), (0, -1), (1, 0), (0, 1))
-        enemy_color = "b" if self.white_to_move else "w"
-        for d in directions:
-            for i in range(1, 8):
-                end_row = r + d[0] * i
-                end_col = c + d[1] * i
-                if 0 <= end_row < 8 and 0 <= end_col < 8:
-                    end_piece = self.board[end_row][end_col]
-                    if end_piece == "--":
-                        moves.append(Move((r, c), (end_row, end_col), self.board))
-                    elif end_piece[0] == enemy_color:
-                        moves.append(Move((r, c), (end_row, end_col), self.board))
-                        break
-                    else:
-                        break
+                    moves.append(Move((r, c), (r+1, c+1), board, is_enpassant_move=True))
+    
+    def get_rook_moves(self, sq, moves):
+        self.get_ray_moves(sq, ROOK_RAYS[sq], moves)
+    
+    def get_ray_moves(self, sq, rays, moves):
+        """Ходы дальнобойной фигуры с клетки sq вдоль заранее построенных лучей"""
+        enemy_color = BLACK if self.white_to_move else 0
+        board = self.board
+        start = (sq >> 3, sq & 7)
+        for ray in rays:
+            for end_sq in ray:
+                end_piece = board[end_sq]
+                if end_piece == EMPTY:
+                    moves.append(Move(start, (end_sq >> 3, end_sq & 7), board))
                 else:
+                    if end_piece & BLACK == enemy_color:
+                        moves.append(Move(start, (end_sq >> 3, end_sq & 7), board))
                     break
     
-    def get_knight_moves(self, r, c, moves):
-        knight_moves = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
-        ally_color = "w" if self.white_to_move else "b"
-        for m in knight_moves:
-            end_row = r + m[0]
-            end_col = c + m[1]
-            if 0 <= end_row < 8 and 0 <= end_col < 8:
-                end_piece = self.board[end_row][end_col]
-                if end_piece[0] != ally_color:
-                    moves.append(Move((r, c), (end_row, end_col), self.board))
-    
-    def get_bishop_moves(self, r, c, moves):
-        directions = ((-1, -1), (-1, 1), (1, -1), (1, 1))
-        enemy_color = "b" if self.white_to_move else "w"
-        for d in directions:
-            for i in range(1, 8):
-                end_row = r + d[0] * i
-                end_col = c + d[1] * i
-                if 0 <= end_row < 8 and 0 <= end_col < 8:
-                    end_piece = self.board[end_row][end_col]
-                    if end_piece == "--":
-                        moves.append(Move((r, c), (end_row, end_col), self.board))
-                    elif end_piece[0] == enemy_color:
-                        moves.append(Move((r, c), (end_row, end_col), self.board))
-                        break
-                    else:
-                        break
-                else:
-                    break
-    
-    def get_queen_moves(self, r, c, moves):
-        self.get_rook_moves(r, c, moves)
-        self.get_bishop_moves(r, c, moves)
-    
-    def get_king_moves(self, r, c, moves):
-        king_moves = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
-        ally_color = "w" if self.white_to_move else "b"
-        for i in range(8):
-            end_row = r + king_moves[i][0]
-            end_col = c + king_moves[i][1]
-            if 0 <= end_row < 8 and 0 <= end_col < 8:
-                end_piece = self.board[end_row][end_col]
-                if end_piece[0] != ally_color:
-                    moves.append(Move((r, c), (end_row, end_col), self.board))
+    def get_knight_moves(self, sq, moves):
+        ally_color = 0 if self.white_to_move else BLACK
+        board = self.board
+        start = (sq >> 3, sq & 7)
+        for end_sq in KNIGHT_TARGETS[sq]:
+            end_piece = board[end_sq]
+            if end_piece == EMPTY or end_piece & BLACK != ally_color:
+                moves.append(Move(start, (end_sq >> 3, end_sq & 7), board))
+    
+    def get_bishop_moves(self, sq, moves):
+        self.get_ray_moves(sq, BISHOP_RAYS[sq], moves)
+    
+    def get_queen_moves(self, sq, moves):
+        self.get_rook_moves(sq, moves)
+        self.get_bishop_moves(sq, moves)
+    
+    def get_king_moves(self, sq, moves):
+        ally_color = 0 if self.white_to_move else BLACK
+        board = self.board
+        start = (sq >> 3, sq & 7)
+        for end_sq in KING_TARGETS[sq]:
+            end_piece = board[end_sq]
+            if end_piece == EMPTY or end_piece & BLACK != ally_color:
+                moves.append(Move(start, (end_sq >> 3, end_sq & 7), board))
     
     def get_castle_moves(self, r, c, moves):
-        """Генерирует все возможные рокировки для короля на позиции (r, c)"""
-        if self.square_under_attack(r, c):
-            return  # Нельзя рокироваться под шахом
+        """Генерирует все возможные рокировки для короля на позиции (r, c).
+
+        Вызывается только когда король не под шахом (это проверяет get_valid_moves).
+        """
         if (self.white_to_move and self.current_castling_right.wks) or (not self.white_to_move and self.current_castling_right.bks):
             self.get_kingside_castle_moves(r, c, moves)
         if (self.white_to_move and self.current_castling_right.wqs) or (not self.white_to_move and self.current_castling_right.bqs):
             self.get_queenside_castle_moves(r, c, moves)
     
     def get_kingside_castle_moves(self, r, c, moves):
-        if self.board[r][c+1] == '--' and self.board[r][c+2] == '--':
+        sq = r * 8 + c
+        if self.board[sq + 1] == EMPTY and self.board[sq + 2] == EMPTY:
             if not self.square_under_attack(r, c+1) and not self.square_under_attack(r, c+2):
                 moves.append(Move((r, c), (r, c+2), self.board, is_castle_move=True))
     
     def get_queenside_castle_moves(self, r, c, moves):
-        if self.board[r][c-1] == '--' and self.board[r][c-2] == '--' and self.board[r][c-3] == '--':
+        sq = r * 8 + c
+        if self.board[sq - 1] == EMPTY and self.board[sq - 2] == EMPTY and self.board[sq - 3] == EMPTY:
             if not self.square_under_attack(r, c-1) and not self.square_under_attack(r, c-2):
                 moves.append(Move((r, c), (r, c-2), self.board, is_castle_move=True))
 
 class CastleRights:
+    __slots__ = ('wks', 'wqs', 'bks', 'bqs')
+    
     def __init__(self, wks, wqs, bks, bqs):
         self.wks = wks  # white kingside
         self.wqs = wqs  # white queenside
         self.bks = bks  # black kingside
         self.bqs = bqs  # black queenside
 
+# Права на рокировку по 4-битному индексу GameState.castle_index()
+CASTLE_RIGHTS = tuple(CastleRights(bool(i & 1), bool(i & 2), bool(i & 4), bool(i & 8)) for i in range(16))
+
 class Move:
     ranks_to_rows = {"1": 7, "2": 6, "3": 5, "4": 4, "5": 3, "6": 2, "7": 1, "8": 0}
     rows_to_ranks = {v: k for k, v in ranks_to_rows.items()}
     files_to_cols = {"a": 0, "b": 1, "c": 2, "d": 3, "e": 4, "f": 5, "g": 6, "h": 7}
     cols_to_files = {v: k for k, v in files_to_cols.items()}
+    __slots__ = ('start_row', 'start_col', 'end_row', 'end_col', 'piece_moved', 'piece_captured',
+                 'pawn_promotion', 'is_enpassant_move', 'is_castle_move', 'is_capture', 'move_id')
     
     def __init__(self, start_sq, end_sq, board, is_enpassant_move=False, is_castle_move=False):
         self.start_row = start_sq[0]
         self.start_col = start_sq[1]
         self.end_row = end_sq[0]
         self.end_col = end_sq[1]
-        self.piece_moved = board[self.start_row][self.start_col]
-        self.piece_captured = board[self.end_row][self.end_col]
+        self.piece_moved = board[self.start_row * 8 + self.start_col]
+        self.piece_captured = board[self.end_row * 8 + self.end_col]
         self.pawn_promotion = False
-        if (self.piece_moved == 'wp' and self.end_row == 0) or (self.piece_moved == 'bp' and self.end_row == 7):
+        if (self.piece_moved == WP and self.end_row == 0) or (self.piece_moved == BP and self.end_row == 7):
             self.pawn_promotion = True
         self.is_enpassant_move = is_enpassant_move
         if self.is_enpassant_move:
-            self.piece_captured = 'wp' if self.piece_moved == 'bp' else 'bp'
+            self.piece_captured = WP if self.piece_moved == BP else BP
         self.is_castle_move = is_castle_move
-        self.is_capture = self.piece_captured != '--'
-        self.move_id = self.start_row * 1000 + self.start_col * 100 + self.end_row * 10 + self.end_col
+        self.is_capture = self.piece_captured != EMPTY
+        # 12-битный ключ: по 3 бита на строку и столбец начальной и конечной клетки
+        self.move_id = (self.start_row << 9) | (self.start_col << 6) | (self.end_row << 3) | self.end_col
     
     def __eq__(self, other):
         if isinstance(other, Move):
             return self.move_id == other.move_id
         return False
     
+    def __hash__(self):
+        return self.move_id
+    
     def get_chess_notation(self):
         return self.get_rank_file(self.start_row, self.start_col) + self.get_rank_file(self.end_row, self.end_col)
     
@@ -392,9 +683,12 @@ class Move:
         return self.cols_to_files[c] + self.rows_to_ranks[r]
 
 class ChessAI:
-    piece_score = {"K": 0, "Q": 9, "R": 5, "B": 3, "N": 3, "p": 1}
+    # Ценность фигуры по типу (код & 7) для сортировки взятий MVV-LVA
+    order_value = (0, 1, 3, 3, 5, 9, 10, 0)
     CHECKMATE = 1000
     STALEMATE = 0
+    # Транспозиционная таблица: hash -> (depth, score, flag, best_move)
+    transposition_table = {}
     
     @staticmethod
     def find_best_move(gs, valid_moves, depth):
@@ -410,41 +704,88 @@ class ChessAI:
         if depth == 0:
             return turn_multiplier * ChessAI.score_board(gs)
         
+        is_root = depth == ChessAI.get_initial_depth(gs)
+        tt = ChessAI.transposition_table
+        entry = tt.get(gs.hash)
+        alpha_orig = alpha
+        tt_move = None
+        if entry is not None:
+            tt_depth, tt_score, tt_flag, tt_move = entry
+            # На корне отсечение по таблице не делаем: там нужно выбрать next_move
+            if tt_depth >= depth and not is_root:
+                if tt_flag == TT_EXACT:
+                    return tt_score
+                if tt_flag == TT_LOWER and tt_score >= beta:
+                    return tt_score
+                if tt_flag == TT_UPPER and tt_score <= alpha:
+                    return tt_score
+        
+        valid_moves = sorted(valid_moves, key=ChessAI.move_order_key, reverse=True)
+        # Лучший ход из таблицы пробуем первым
+        if tt_move is not None and tt_move in valid_moves:
+            valid_moves = [tt_move] + [m for m in valid_moves if m != tt_move]
+        
         max_score = -ChessAI.CHECKMATE
+        best_move = None
         for move in valid_moves:
             gs.make_move(move)
-            next_moves = gs.get_valid_moves()
-            score = -ChessAI.find_move_negamax_alpha_beta(gs, next_moves, depth - 1, -beta, -alpha, -turn_multiplier)
+            if depth == 1:
+                # Лист: ходы соперника нужны только под шахом, чтобы увидеть мат,
+                # в остальных случаях оцениваем только материал
+                if gs.in_check():
+                    _, is_checkmate, is_stalemate = gs.get_valid_moves()
+                    score = turn_multiplier * ChessAI.score_board(gs, is_checkmate, is_stalemate)
+                else:
+                    score = turn_multiplier * ChessAI.score_board(gs)
+            else:
+                # Кэшируем ходы только там, где под узлом еще есть поддерево: у листьев
+                # список ходов почти не переиспользуется
+                next_moves, is_checkmate, is_stalemate = gs.get_valid_moves(use_cache=depth > 2)
+                if is_checkmate or is_stalemate:
+                    score = turn_multiplier * ChessAI.score_board(gs, is_checkmate, is_stalemate)
+                else:
+                    score = -ChessAI.find_move_negamax_alpha_beta(gs, next_moves, depth - 1, -beta, -alpha, -turn_multiplier)
             if score > max_score:
                 max_score = score
-                if depth == ChessAI.get_initial_depth(gs):
+                best_move = move
+                if is_root:
                     next_move = move
             gs.undo_move()
             if max_score > alpha:
                 alpha = max_score
             if alpha >= beta:
                 break
+        
+        if max_score <= alpha_orig:
+            flag = TT_UPPER
+        elif max_score >= beta:
+            flag = TT_LOWER
+        else:
+            flag = TT_EXACT
+        if len(tt) >= TT_MAX_ENTRIES:
+            tt.clear()
+        tt[gs.hash] = (depth, max_score, flag, best_move)
         return max_score
     
     @staticmethod
-    def score_board(gs):
-        """Оценивает позицию на доске"""
-        if gs.checkmate:
+    def move_order_key(move):
+        """MVV-LVA: сначала взятия самой ценной фигуры самой дешевой, затем тихие ходы"""
+        if move.is_capture:
+            return ChessAI.order_value[move.piece_captured & 7] * 16 - ChessAI.order_value[move.piece_moved & 7]
+        return -1
+    
+    @staticmethod
+    def score_board(gs, is_checkmate=False, is_stalemate=False):
+        """Оценивает позицию на доске (признаки мата и пата передает вызывающий код)"""
+        if is_checkmate:
             if gs.white_to_move:
                 return -ChessAI.CHECKMATE
             else:
                 return ChessAI.CHECKMATE
-        elif gs.stalemate:
+        elif is_stalemate:
             return ChessAI.STALEMATE
         
-        score = 0
-        for row in gs.board:
-            for square in row:
-                if square[0] == 'w':
-                    score += ChessAI.piece_score[square[1]]
-                elif square[0] == 'b':
-                    score -= ChessAI.piece_score[square[1]]
-        return score
+        return gs.material_score
     
     @staticmethod
     def get_initial_depth(gs):
@@ -457,23 +798,17 @@ def draw_game_state(screen, gs, valid_moves, sq_selected):
     draw_pieces(screen, gs.board)
 
 def draw_board(screen):
-    colors = [WHITE, GRAY]
-    for r in range(DIMENSION):
-        for c in range(DIMENSION):
-            color = colors[((r + c) % 2)]
-            pygame.draw.rect(screen, color, pygame.Rect(c * SQ_SIZE, r * SQ_SIZE, SQ_SIZE, SQ_SIZE))
+    screen.blit(BOARD_SURFACES['board'], (0, 0))
 
 def highlight_squares(screen, gs, valid_moves, sq_selected):
     if sq_selected != ():
         r, c = sq_selected
-        if gs.board[r][c][0] == ('w' if gs.white_to_move else 'b'):
+        square = gs.board[r * 8 + c]
+        if square != EMPTY and square & BLACK == (0 if gs.white_to_move else BLACK):
             # Подсветка выбранной клетки
-            s = pygame.Surface((SQ_SIZE, SQ_SIZE))
-            s.set_alpha(100)
-            s.fill(YELLOW)
-            screen.blit(s, (c * SQ_SIZE, r * SQ_SIZE))
+            screen.blit(BOARD_SURFACES['selected'], (c * SQ_SIZE, r * SQ_SIZE))
             # Подсветка возможных ходов
-            s.fill(HIGHLIGHT_COLOR)
+            s = BOARD_SURFACES['move']
             for move in valid_moves:
                 if move.start_row == r and move.start_col == c:
                     screen.blit(s, (move.end_col * SQ_SIZE, move.end_row * SQ_SIZE))
@@ -481,23 +816,25 @@ def highlight_squares(screen, gs, valid_moves, sq_selected):
 def draw_pieces(screen, board):
     for r in range(DIMENSION):
         for c in range(DIMENSION):
-            piece = board[r][c]
-            if piece != "--":
+            piece = board[r * 8 + c]
+            if piece != EMPTY:
                 screen.blit(IMAGES[piece], pygame.Rect(c * SQ_SIZE + 5, r * SQ_SIZE + 5, SQ_SIZE, SQ_SIZE))
 
 def draw_text(screen, text):
-    font = pygame.font.SysFont("Arial", 32, True, False)
-    text_object = font.render(text, 0, pygame.Color('Red'))
-    text_location = pygame.Rect(0, 0, WIDTH, HEIGHT).move(WIDTH/2 - text_object.get_width()/2, HEIGHT/2 - text_object.get_height()/2)
+    # Надписи о конце игры рендерятся при первом показе и дальше берутся из кэша
+    if text not in TEXT_SURFACES:
+        text_object = BANNER_FONT.render(text, 0, pygame.Color('Red'))
+        text_location = pygame.Rect(0, 0, WIDTH, HEIGHT).move(WIDTH/2 - text_object.get_width()/2, HEIGHT/2 - text_object.get_height()/2)
+        TEXT_SURFACES[text] = (text_object, BANNER_FONT.render(text, 0, pygame.Color('Black')), text_location)
+    text_object, shadow_object, text_location = TEXT_SURFACES[text]
     screen.blit(text_object, text_location)
-    text_object = font.render(text, 0, pygame.Color('Black'))
-    screen.blit(text_object, text_location.move(2, 2))
+    screen.blit(shadow_object, text_location.move(2, 2))
 
 def draw_menu(screen):
     """Рисует меню выбора сложности"""
     screen.fill((50, 50, 50))
-    font_title = pygame.font.SysFont("Arial", 48, True, False)
-    font_option = pygame.font.SysFont("Arial", 32, True, False)
+    font_title = MENU_TITLE_FONT
+    font_option = MENU_OPT_FONT
     
     title = font_title.render("ШАХМАТЫ", True, (255, 255, 255))
     screen.blit(title, (WIDTH//2 - title.get_width()//2, 100))
@@ -527,6 +864,7 @@ def main():
     screen.fill(pygame.Color("white"))
     pygame.display.set_caption('Шахматы')
     load_images()
+    load_board_surfaces()
     
     # Меню выбора сложности
     difficulty = None
@@ -558,7 +896,8 @@ def main():
     ChessAI._current_depth = difficulty
     
     gs = GameState()
-    valid_moves = gs.get_valid_moves()
+    valid_moves, gs.checkmate, gs.stalemate = gs.get_valid_moves()
+    valid_moves_by_id = {m.move_id: m for m in valid_moves}
     move_made = False
     running = True
     sq_selected = ()
@@ -587,12 +926,12 @@ def main():
                         player_clicks.append(sq_selected)
                     if len(player_clicks) == 2:
                         move = Move(player_clicks[0], player_clicks[1], gs.board)
-                        for i in range(len(valid_moves)):
-                            if move == valid_moves[i]:
-                                gs.make_move(valid_moves[i])
-                                move_made = True
-                                sq_selected = ()
-                                player_clicks = []
+                        valid_move = valid_moves_by_id.get(move.move_id)
+                        if valid_move is not None:
+                            gs.make_move(valid_move)
+                            move_made = True
+                            sq_selected = ()
+                            player_clicks = []
                         if not move_made:
                             player_clicks = [sq_selected]
             elif e.type == pygame.KEYDOWN:
@@ -603,7 +942,8 @@ def main():
                     ai_thinking = False
                 if e.key == pygame.K_r:
                     gs = GameState()
-                    valid_moves = gs.get_valid_moves()
+                    valid_moves, gs.checkmate, gs.stalemate = gs.get_valid_moves()
+                    valid_moves_by_id = {m.move_id: m for m in valid_moves}
                     sq_selected = ()
                     player_clicks = []
                     move_made = False
@@ -622,7 +962,8 @@ def main():
             ai_thinking = False
         
         if move_made:
-            valid_moves = gs.get_valid_moves()
+            valid_moves, gs.checkmate, gs.stalemate = gs.get_valid_moves()
+            valid_moves_by_id = {m.move_id: m for m in valid_moves}
             move_made = False
         
         draw_game_state(screen, gs, valid_moves, sq_selected)
@@ -2,107 +2,115 @@
 Тестовый скрипт для демонстрации UCI интерфейса
 """
 
+import os
 import subprocess
-import time
+import sys
 
-def test_uci():
-    print("=== Тест UCI интерфейса ===\n")
-    
-    # Запускаем UCI интерфейс как подпроцесс
-    process = subprocess.Popen(
-        ['python', 'uci_interface.py'],
+# Строка, которой движок завершает ответ на команду.
+# Команды без собственного ответа досылаются вместе с isready.
+SENTINELS = {
+    'uci': 'uciok',
+    'isready': 'readyok',
+    'go': 'bestmove',
+}
+
+
+def start_engine():
+    """Запускает UCI интерфейс как подпроцесс с небуферизованным выводом"""
+    return subprocess.Popen(
+        [sys.executable, '-u', 'uci_interface.py'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
         stdin=subprocess.PIPE,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         text=True,
         bufsize=1
     )
+
+
+def sentinel_for(cmd):
+    """Возвращает строку-признак конца ответа на команду"""
+    return SENTINELS.get(cmd.split()[0].lower() if cmd.split() else '')
+
+
+def wait_for(process, sentinel_prefix, echo="<< "):
+    """Читает вывод движка до строки, начинающейся с sentinel_prefix"""
+    output = []
+    while True:
+        line = process.stdout.readline()
+        if not line:
+            break
+        line = line.strip()
+        output.append(line)
+        print(f"{echo}{line}")
+        if line.startswith(sentinel_prefix):
+            break
+    return output
+
+
+def test_uci():
+    print("=== Тест UCI интерфейса ===\n")
+    
+    # Запускаем UCI интерфейс как подпроцесс
+    process = start_engine()
     
     def send_command(cmd):
         print(f">> {cmd}")
         process.stdin.write(cmd + '\n')
         process.stdin.flush()
-        time.sleep(0.1)
         
-    def read_output():
-        # Читаем доступный вывод
-        output = []
-        while True:
-            try:
-                # Используем небольшой таймаут для неблокирующего чтения
-                line = process.stdout.readline()
-                if line:
-                    output.append(line.strip())
-                    print(f"<< {line.strip()}")
-                else:
-                    break
-            except:
-                break
-        return output
+    def run_command(cmd):
+        # Отправляем команду и ждем окончания ответа движка
+        send_command(cmd)
+        sentinel = sentinel_for(cmd)
+        if sentinel is None:
+            send_command("isready")
+            sentinel = 'readyok'
+        return wait_for(process, sentinel)
     
     try:
         # Тест 1: Инициализация UCI
         print("\n--- Тест 1: Инициализация ---")
-        send_command("uci")
-        time.sleep(0.2)
-        read_output()
+        run_command("uci")
         
         # Тест 2: Проверка готовности
         print("\n--- Тест 2: Проверка готовности ---")
-        send_command("isready")
-        time.sleep(0.1)
-        read_output()
+        run_command("isready")
         
         # Тест 3: Новая игра
         print("\n--- Тест 3: Новая игра ---")
-        send_command("ucinewgame")
-        send_command("isready")
-        time.sleep(0.1)
-        read_output()
+        run_command("ucinewgame")
         
         # Тест 4: Стартовая позиция
         print("\n--- Тест 4: Установка стартовой позиции ---")
         send_command("position startpos")
-        send_command("display")
-        time.sleep(0.1)
-        read_output()
+        run_command("display")
         
         # Тест 5: Поиск лучшего хода (глубина 2)
         print("\n--- Тест 5: Поиск лучшего хода (depth 2) ---")
-        send_command("go depth 2")
-        time.sleep(2)  # Даем время на расчет
-        read_output()
+        run_command("go depth 2")
         
         # Тест 6: Позиция с ходами
         print("\n--- Тест 6: Позиция после e2e4 e7e5 ---")
         send_command("position startpos moves e2e4 e7e5")
-        send_command("display")
-        time.sleep(0.1)
-        read_output()
+        run_command("display")
         
         # Тест 7: Еще один поиск
         print("\n--- Тест 7: Поиск лучшего хода из новой позиции ---")
-        send_command("go depth 2")
-        time.sleep(2)
-        read_output()
+        run_command("go depth 2")
         
         # Тест 8: Настройка глубины
         print("\n--- Тест 8: Настройка глубины через setoption ---")
-        send_command("setoption name Depth value 1")
-        send_command("isready")
-        time.sleep(0.1)
-        read_output()
+        run_command("setoption name Depth value 1")
         
         # Тест 9: Быстрый поиск с depth 1
         print("\n--- Тест 9: Быстрый поиск (depth 1) ---")
-        send_command("go depth 1")
-        time.sleep(1)
-        read_output()
+        run_command("go depth 1")
         
         # Завершение
         print("\n--- Завершение теста ---")
         send_command("quit")
-        time.sleep(0.1)
+        process.wait(timeout=5)
         
         print("\n✓ Все тесты завершены успешно!")
         
@@ -120,14 +128,7 @@ def test_manual_game():
     print("\n=== Интерактивный режим UCI ===")
     print("Введите UCI команды (или 'help' для справки, 'exit' для выхода):\n")
     
-    process = subprocess.Popen(
-        ['python', 'uci_interface.py'],
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1
-    )
+    process = start_engine()
     
     def show_help():
         print("""
@@ -156,24 +157,19 @@ def test_manual_game():
                 continue
             
             process.stdin.write(cmd + '\n')
-            process.stdin.flush()
             
             if cmd.lower() == 'quit':
+                process.stdin.flush()
                 break
             
-            # Читаем вывод
-            time.sleep(0.2 if cmd.startswith('go') else 0.05)
-            while True:
-                try:
-                    line = process.stdout.readline()
-                    if line:
-                        print(line.strip())
-                        if line.strip().startswith('bestmove') or line.strip() == 'readyok' or line.strip() == 'uciok':
-                            break
-                    else:
-                        break
-                except:
-                    break
+            # Читаем вывод до признака конца ответа; для команд без
+            # собственного ответа досылаем isready и ждем readyok
+            sentinel = sentinel_for(cmd)
+            if sentinel is None:
+                process.stdin.write('isready\n')
+                sentinel = 'readyok'
+            process.stdin.flush()
+            wait_for(process, sentinel, echo="")
                     
     except KeyboardInterrupt:
         print("\n\nПрервано пользователем")
@@ -185,8 +181,6 @@ def test_manual_game():
             process.kill()
 
 if __name__ == "__main__":
-    import sys
-    
     if len(sys.argv) > 1 and sys.argv[1] == 'interactive':
         test_manual_game()
     else:
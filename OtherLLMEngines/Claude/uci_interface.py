@@ -4,12 +4,27 @@ UCI (Universal Chess Interface) протокол для шахматного д
 """
 
 import sys
-from chess_game import GameState, Move, ChessAI
+from chess_game import GameState, Move, ChessAI, PIECE_NAMES
+
+# Байт символа UCI -> колонка / строка доски (-1 для недопустимых символов)
+FILE_TO_COL = [-1] * 256
+RANK_TO_ROW = [-1] * 256
+for _i in range(8):
+    FILE_TO_COL[ord('a') + _i] = _i
+    RANK_TO_ROW[ord('1') + _i] = 7 - _i
+
+# Индекс клетки row * 8 + col -> имя поля в UCI нотации
+SQUARE_NAMES = [file + rank for rank in "87654321" for file in "abcdefgh"]
 
 class UCIInterface:
     def __init__(self):
         self.gs = GameState()
         self.depth = 3  # По умолчанию средняя сложность
+        # Хеш позиции -> {move_id: ход}. GUI присылает всю партию в каждой
+        # команде position, так что позиции повторяются от хода к ходу
+        self.valid_moves_by_hash = {}
+        # (хеш позиции, текст) последнего вывода команды display
+        self._display_cache = (None, None)
         
     def uci_command(self):
         """Ответ на команду 'uci'"""
@@ -37,26 +52,22 @@ class UCIInterface:
     def ucinewgame_command(self):
         """Новая игра"""
         self.gs = GameState()
+        self.valid_moves_by_hash = {}
         
-    def position_command(self, tokens):
+    def position_command(self, line):
         """Обработка команды 'position'"""
+        # Отделяем описание позиции от списка ходов, не разбивая всю строку
+        head, sep, tail = line.partition(" moves ")
+        tokens = head.split()
         if len(tokens) < 2:
             return
             
         if tokens[1] == "startpos":
             self.gs = GameState()
-            moves_index = -1
             
-            # Ищем ключевое слово "moves"
-            for i, token in enumerate(tokens):
-                if token == "moves":
-                    moves_index = i
-                    break
-                    
             # Применяем ходы если они есть
-            if moves_index != -1 and moves_index + 1 < len(tokens):
-                for i in range(moves_index + 1, len(tokens)):
-                    move_str = tokens[i]
+            if sep:
+                for move_str in tail.split():
                     self.apply_uci_move(move_str)
                     
     def apply_uci_move(self, move_str):
@@ -65,18 +76,22 @@ class UCIInterface:
             return
             
         # Преобразуем UCI нотацию в координаты доски
-        start_col = ord(move_str[0]) - ord('a')
-        start_row = 8 - int(move_str[1])
-        end_col = ord(move_str[2]) - ord('a')
-        end_row = 8 - int(move_str[3])
+        b = move_str.encode('ascii', 'replace')
+        start_col = FILE_TO_COL[b[0]]
+        start_row = RANK_TO_ROW[b[1]]
+        end_col = FILE_TO_COL[b[2]]
+        end_row = RANK_TO_ROW[b[3]]
+        if min(start_col, start_row, end_col, end_row) < 0:
+            return
         
         # Находим соответствующий ход среди возможных
-        valid_moves = self.gs.get_valid_moves()
-        for move in valid_moves:
-            if (move.start_row == start_row and move.start_col == start_col and
-                move.end_row == end_row and move.end_col == end_col):
-                self.gs.make_move(move)
-                return
+        valid_moves_by_id = self.valid_moves_by_hash.get(self.gs.hash)
+        if valid_moves_by_id is None:
+            valid_moves_by_id = {m.move_id: m for m in self.gs.get_valid_moves()[0]}
+            self.valid_moves_by_hash[self.gs.hash] = valid_moves_by_id
+        move = valid_moves_by_id.get((start_row << 9) | (start_col << 6) | (end_row << 3) | end_col)
+        if move is not None:
+            self.gs.make_move(move)
                 
     def go_command(self, tokens):
         """Обработка команды 'go' - найти лучший ход"""
@@ -90,15 +105,20 @@ class UCIInterface:
                 except ValueError:
                     pass
                     
-        valid_moves = self.gs.get_valid_moves()
+        valid_moves = self.gs.get_valid_moves()[0]
         
         if not valid_moves:
             print("bestmove 0000")  # Нет доступных ходов
             return
             
-        # Сохраняем глубину для AI
-        ChessAI._current_depth = depth
-        best_move = ChessAI.find_best_move(self.gs, valid_moves, depth)
+        # Итеративное углубление: каждая итерация оставляет в транспозиционной
+        # таблице лучшие ходы, и следующая, более глубокая, начинает с них
+        best_move = None
+        for current_depth in range(1, depth + 1):
+            # Сохраняем глубину для AI
+            ChessAI._current_depth = current_depth
+            best_move = ChessAI.find_best_move(self.gs, valid_moves, current_depth) or best_move
+            self.print_search_info(current_depth)
         
         if best_move:
             uci_move = self.move_to_uci(best_move)
@@ -108,14 +128,35 @@ class UCIInterface:
             uci_move = self.move_to_uci(valid_moves[0])
             print(f"bestmove {uci_move}")
             
+    def print_search_info(self, depth):
+        """Выводит строку 'info' с оценкой и главным вариантом из транспозиционной таблицы"""
+        entry = ChessAI.transposition_table.get(self.gs.hash)
+        if entry is None:
+            return
+        score = entry[1]
+        
+        # Главный вариант: идем по лучшим ходам из таблицы, пока они есть
+        pv = []
+        while len(pv) < depth and entry is not None and entry[3] is not None:
+            move = entry[3]
+            pv.append(self.move_to_uci(move))
+            self.gs.make_move(move)
+            entry = ChessAI.transposition_table.get(self.gs.hash)
+        for _ in pv:
+            self.gs.undo_move()
+        
+        # Оценка движка в пешках, со стороны ходящего; UCI ждет сантипешки,
+        # а мат - числом ходов до него (по длине главного варианта)
+        if abs(score) == ChessAI.CHECKMATE:
+            score_str = f"mate {(len(pv) + 1) // 2}" if score > 0 else f"mate -{max(1, len(pv) // 2)}"
+        else:
+            score_str = f"cp {score * 100}"
+        print(f"info depth {depth} score {score_str} pv {' '.join(pv)}")
+        
     def move_to_uci(self, move):
         """Преобразует Move объект в UCI нотацию"""
-        start_file = chr(ord('a') + move.start_col)
-        start_rank = str(8 - move.start_row)
-        end_file = chr(ord('a') + move.end_col)
-        end_rank = str(8 - move.end_row)
-        
-        uci_str = start_file + start_rank + end_file + end_rank
+        uci_str = (SQUARE_NAMES[move.start_row * 8 + move.start_col] +
+                   SQUARE_NAMES[move.end_row * 8 + move.end_col])
         
         # Добавляем промоцию если есть
         if move.pawn_promotion:
@@ -129,35 +170,46 @@ class UCIInterface:
         
     def display_command(self):
         """Показать текущую позицию (не стандартная UCI команда, но полезна для отладки)"""
-        print("\n  a b c d e f g h")
-        for i, row in enumerate(self.gs.board):
-            print(f"{8-i} {' '.join(row)} {8-i}")
-        print("  a b c d e f g h\n")
-        print(f"Turn: {'White' if self.gs.white_to_move else 'Black'}")
+        # Хеш учитывает и расстановку, и очередь хода - повторный вывод той же
+        # позиции берется из кеша
+        key, text = self._display_cache
+        if key != self.gs.hash:
+            lines = ["\n  a b c d e f g h"]
+            for i in range(8):
+                row = [PIECE_NAMES[self.gs.board[i * 8 + c]] for c in range(8)]
+                lines.append(f"{8-i} {' '.join(row)} {8-i}")
+            lines.append("  a b c d e f g h\n")
+            lines.append(f"Turn: {'White' if self.gs.white_to_move else 'Black'}")
+            text = "\n".join(lines)
+            self._display_cache = (self.gs.hash, text)
+        print(text)
         
     def run(self):
         """Главный цикл UCI интерфейса"""
+        # Через pipe stdout буферизуется блоками, и GUI не видит ответов
+        # (uciok, readyok, bestmove), пока буфер не заполнится
+        if hasattr(sys.stdout, 'reconfigure'):
+            sys.stdout.reconfigure(line_buffering=True)
         while True:
             try:
                 line = input().strip()
                 if not line:
                     continue
                     
-                tokens = line.split()
-                command = tokens[0].lower()
+                command = line.partition(" ")[0].lower()
                 
                 if command == "uci":
                     self.uci_command()
                 elif command == "isready":
                     self.isready_command()
                 elif command == "setoption":
-                    self.setoption_command(tokens)
+                    self.setoption_command(line.split())
                 elif command == "ucinewgame":
                     self.ucinewgame_command()
                 elif command == "position":
-                    self.position_command(tokens)
+                    self.position_command(line)
                 elif command == "go":
-                    self.go_command(tokens)
+                    self.go_command(line.split())
                 elif command == "quit":
                     self.quit_command()
                 elif command == "display" or command == "d":
@@ -2,15 +2,63 @@
 Модуль представления шахматной доски и базовых операций.
 """
 
-from typing import List, Tuple, Optional, Set
-from copy import deepcopy
+import random
+from typing import Tuple, Optional
+
+
+# Ключи Zobrist-хеширования. Генератор с фиксированным зерном дает
+# одинаковые ключи при каждом запуске.
+_zobrist_random = random.Random(0xC0FFEE)
+ZOBRIST_PIECES = 'PNBRQKpnbrqk'
+ZOBRIST = [[_zobrist_random.getrandbits(64) for _ in range(64)] for _ in range(12)]
+Z_SIDE = _zobrist_random.getrandbits(64)  # Ход черных
+Z_CASTLE = [_zobrist_random.getrandbits(64) for _ in range(16)]  # Индекс - castling_rights
+Z_EP = [_zobrist_random.getrandbits(64) for _ in range(8)]  # Вертикаль поля en passant
+
+# Строка ключей Zobrist по символу фигуры
+_ZOBRIST_BY_PIECE = {piece: ZOBRIST[i] for i, piece in enumerate(ZOBRIST_PIECES)}
+
+# Серии пустых клеток и их обозначение в FEN, от длинных к коротким
+_FEN_EMPTY_RUNS = [(b'.' * count, str(count).encode('ascii')) for count in range(8, 0, -1)]
+
+# Биты прав на рокировку (ChessBoard.castling_rights)
+CASTLE_WHITE_KINGSIDE = 1   # K
+CASTLE_WHITE_QUEENSIDE = 2  # Q
+CASTLE_BLACK_KINGSIDE = 4   # k
+CASTLE_BLACK_QUEENSIDE = 8  # q
+CASTLE_ALL = 15
+
+# Маска прав на рокировку, которые сохраняются, если ход начинается или
+# заканчивается на данном поле (индекс row * 8 + col): ход короля или ладьи
+# с начального поля, либо взятие ладьи в углу
+CASTLE_MASK = bytearray([CASTLE_ALL] * 64)
+CASTLE_MASK[0] = CASTLE_ALL & ~CASTLE_BLACK_QUEENSIDE    # a8
+CASTLE_MASK[4] = CASTLE_ALL & ~(CASTLE_BLACK_KINGSIDE | CASTLE_BLACK_QUEENSIDE)  # e8
+CASTLE_MASK[7] = CASTLE_ALL & ~CASTLE_BLACK_KINGSIDE     # h8
+CASTLE_MASK[56] = CASTLE_ALL & ~CASTLE_WHITE_QUEENSIDE   # a1
+CASTLE_MASK[60] = CASTLE_ALL & ~(CASTLE_WHITE_KINGSIDE | CASTLE_WHITE_QUEENSIDE)  # e1
+CASTLE_MASK[63] = CASTLE_ALL & ~CASTLE_WHITE_KINGSIDE    # h1
+
+# Цвет фигуры по байту доски: 0 - пусто, 1 - белая, 2 - черная.
+# Для строковых фигур быстрее множества WHITE_PIECES/BLACK_PIECES,
+# таблица нужна там, где код читает байты ChessBoard.board напрямую.
+PIECE_COLOR = bytearray(128)
+for _piece in 'PNBRQK':
+    PIECE_COLOR[ord(_piece)] = 1
+for _piece in 'pnbrqk':
+    PIECE_COLOR[ord(_piece)] = 2
 
 
 class ChessBoard:
     """Класс для представления шахматной доски и позиции."""
     
+    __slots__ = ('board', 'white_to_move', 'castling_rights', 'en_passant_square',
+                 'halfmove_clock', 'fullmove_number', 'position_history',
+                 'record_history', 'zobrist')
+    
     # Константы для фигур
     EMPTY = '.'
+    EMPTY_BYTE = 0x2E  # ord('.') - пустая клетка в байтовом массиве доски
     
     # Белые фигуры
     WHITE_PAWN = 'P'
@@ -37,30 +85,31 @@ class ChessBoard:
         """Инициализация доски в начальной позиции."""
         self.board = self._create_initial_board()
         self.white_to_move = True
-        self.castling_rights = {
-            'K': True,  # Белые короткая рокировка
-            'Q': True,  # Белые длинная рокировка
-            'k': True,  # Черные короткая рокировка
-            'q': True   # Черные длинная рокировка
-        }
-        self.en_passant_square = None  # Поле для взятия на проходе (алгебраическая нотация)
+        self.castling_rights = CASTLE_ALL  # Битовая маска KQkq (CASTLE_*)
+        self.en_passant_square = None  # Поле для взятия на проходе (индекс row * 8 + col)
         self.halfmove_clock = 0  # Счетчик полуходов для правила 50 ходов
         self.fullmove_number = 1  # Номер хода
-        self.position_history = []  # История позиций для проверки троекратного повторения
-        
-    def _create_initial_board(self) -> List[List[str]]:
-        """Создает начальную расстановку фигур."""
-        board = [
-            ['r', 'n', 'b', 'q', 'k', 'b', 'n', 'r'],  # 8-я горизонталь (черные)
-            ['p', 'p', 'p', 'p', 'p', 'p', 'p', 'p'],  # 7-я горизонталь
-            ['.', '.', '.', '.', '.', '.', '.', '.'],  # 6-я
-            ['.', '.', '.', '.', '.', '.', '.', '.'],  # 5-я
-            ['.', '.', '.', '.', '.', '.', '.', '.'],  # 4-я
-            ['.', '.', '.', '.', '.', '.', '.', '.'],  # 3-я
-            ['P', 'P', 'P', 'P', 'P', 'P', 'P', 'P'],  # 2-я горизонталь (белые)
-            ['R', 'N', 'B', 'Q', 'K', 'B', 'N', 'R']   # 1-я горизонталь
-        ]
-        return board
+        self.position_history = []  # Хеши позиций для проверки троекратного повторения
+        self.record_history = True  # Поиск отключает запись истории на время перебора
+        self.zobrist = self.compute_zobrist()  # Хеш позиции, обновляется в make_move
+        
+    def _create_initial_board(self) -> bytearray:
+        """
+        Создает начальную расстановку фигур.
+        
+        Доска хранится одним массивом из 64 байт (коды символов фигур),
+        клетка (row, col) находится по индексу row * 8 + col.
+        """
+        return bytearray(
+            b'rnbqkbnr'    # 8-я горизонталь (черные)
+            b'pppppppp'    # 7-я горизонталь
+            b'........'    # 6-я
+            b'........'    # 5-я
+            b'........'    # 4-я
+            b'........'    # 3-я
+            b'PPPPPPPP'    # 2-я горизонталь (белые)
+            b'RNBQKBNR'    # 1-я горизонталь
+        )
     
     def load_fen(self, fen: str) -> None:
         """
@@ -73,36 +122,58 @@ class ChessBoard:
         
         # Разбор позиции фигур
         rows = parts[0].split('/')
-        self.board = []
+        board = bytearray()
         for row in rows:
-            board_row = []
             for char in row:
                 if char.isdigit():
-                    board_row.extend([self.EMPTY] * int(char))
+                    board.extend(b'.' * int(char))
                 else:
-                    board_row.append(char)
-            self.board.append(board_row)
+                    board.append(ord(char))
+        self.board = board
         
         # Чья очередь ходить
         self.white_to_move = (parts[1] == 'w')
         
         # Права на рокировку
         castling = parts[2]
-        self.castling_rights = {
-            'K': 'K' in castling,
-            'Q': 'Q' in castling,
-            'k': 'k' in castling,
-            'q': 'q' in castling
-        }
+        self.castling_rights = (
+            (CASTLE_WHITE_KINGSIDE if 'K' in castling else 0) |
+            (CASTLE_WHITE_QUEENSIDE if 'Q' in castling else 0) |
+            (CASTLE_BLACK_KINGSIDE if 'k' in castling else 0) |
+            (CASTLE_BLACK_QUEENSIDE if 'q' in castling else 0)
+        )
         
         # En passant
-        self.en_passant_square = None if parts[3] == '-' else parts[3]
+        if parts[3] == '-':
+            self.en_passant_square = None
+        else:
+            ep_row, ep_col = self.algebraic_to_coords(parts[3])
+            self.en_passant_square = ep_row * 8 + ep_col
         
         # Счетчики ходов
         self.halfmove_clock = int(parts[4]) if len(parts) > 4 else 0
         self.fullmove_number = int(parts[5]) if len(parts) > 5 else 1
         
         self.position_history = []
+        self.zobrist = self.compute_zobrist()
+    
+    def compute_zobrist(self) -> int:
+        """
+        Вычисляет Zobrist-хеш позиции с нуля.
+        
+        Returns:
+            64-битный хеш
+        """
+        h = 0
+        for index, code in enumerate(self.board):
+            if code != self.EMPTY_BYTE:
+                h ^= _ZOBRIST_BY_PIECE[chr(code)][index]
+        if not self.white_to_move:
+            h ^= Z_SIDE
+        h ^= Z_CASTLE[self.castling_rights]
+        if self.en_passant_square is not None:
+            h ^= Z_EP[self.en_passant_square & 7]
+        return h
     
     def to_fen(self) -> str:
         """
@@ -111,56 +182,49 @@ class ChessBoard:
         Returns:
             Строка FEN
         """
-        # Позиция фигур
-        fen_rows = []
-        for row in self.board:
-            empty_count = 0
-            fen_row = ""
-            for square in row:
-                if square == self.EMPTY:
-                    empty_count += 1
-                else:
-                    if empty_count > 0:
-                        fen_row += str(empty_count)
-                        empty_count = 0
-                    fen_row += square
-            if empty_count > 0:
-                fen_row += str(empty_count)
-            fen_rows.append(fen_row)
-        
-        position = '/'.join(fen_rows)
+        # Позиция фигур: горизонтали через '/', серии пустых клеток
+        # заменяются их длиной, начиная с самых длинных
+        board = self.board
+        position = b'/'.join([board[start:start + 8] for start in range(0, 64, 8)])
+        for run, digit in _FEN_EMPTY_RUNS:
+            position = position.replace(run, digit)
+        position = position.decode('ascii')
         
         # Очередь хода
         turn = 'w' if self.white_to_move else 'b'
         
         # Рокировка
+        rights = self.castling_rights
         castling = ''
-        if self.castling_rights['K']:
+        if rights & CASTLE_WHITE_KINGSIDE:
             castling += 'K'
-        if self.castling_rights['Q']:
+        if rights & CASTLE_WHITE_QUEENSIDE:
             castling += 'Q'
-        if self.castling_rights['k']:
+        if rights & CASTLE_BLACK_KINGSIDE:
             castling += 'k'
-        if self.castling_rights['q']:
+        if rights & CASTLE_BLACK_QUEENSIDE:
             castling += 'q'
         if not castling:
             castling = '-'
         
         # En passant
-        en_passant = self.en_passant_square if self.en_passant_square else '-'
+        if self.en_passant_square is None:
+            en_passant = '-'
+        else:
+            en_passant = self.coords_to_algebraic(self.en_passant_square >> 3, self.en_passant_square & 7)
         
         return f"{position} {turn} {castling} {en_passant} {self.halfmove_clock} {self.fullmove_number}"
     
     def get_piece(self, row: int, col: int) -> str:
         """Получить фигуру на указанной позиции."""
         if 0 <= row < 8 and 0 <= col < 8:
-            return self.board[row][col]
+            return chr(self.board[row * 8 + col])
         return None
     
     def set_piece(self, row: int, col: int, piece: str) -> None:
         """Установить фигуру на указанную позицию."""
         if 0 <= row < 8 and 0 <= col < 8:
-            self.board[row][col] = piece
+            self.board[row * 8 + col] = ord(piece)
     
     def is_white_piece(self, piece: str) -> bool:
         """Проверяет, является ли фигура белой."""
@@ -221,26 +285,46 @@ class ChessBoard:
         Returns:
             (row, col) координаты короля или None
         """
-        king = self.WHITE_KING if is_white else self.BLACK_KING
-        for row in range(8):
-            for col in range(8):
-                if self.board[row][col] == king:
-                    return (row, col)
-        return None
+        king = ord(self.WHITE_KING if is_white else self.BLACK_KING)
+        index = self.board.find(king)
+        if index < 0:
+            return None
+        return (index >> 3, index & 7)
     
-    def make_move(self, move: 'Move') -> None:
+    def make_move(self, move: 'Move') -> tuple:
         """
         Выполняет ход на доске.
         
         Args:
             move: Объект хода
+            
+        Returns:
+            Данные для отмены хода через unmake_move: (фигура, взятая фигура,
+            права на рокировку, en passant, счетчик полуходов, номер хода, хеш)
         """
         # Сохраняем позицию для истории
-        self.position_history.append(self.to_fen())
+        if self.record_history:
+            self.position_history.append(self.zobrist)
         
         from_row, from_col = move.from_pos
         to_row, to_col = move.to_pos
         piece = self.get_piece(from_row, from_col)
+        if move.is_en_passant:
+            captured = self.get_piece(from_row, to_col)
+        else:
+            captured = self.get_piece(to_row, to_col)
+        undo = (piece, captured, self.castling_rights, self.en_passant_square,
+                self.halfmove_clock, self.fullmove_number, self.zobrist)
+        
+        # Убираем из хеша фигуру с исходного поля, взятую фигуру,
+        # старые права на рокировку и старое поле en passant
+        h = self.zobrist ^ _ZOBRIST_BY_PIECE[piece][from_row * 8 + from_col]
+        h ^= Z_CASTLE[self.castling_rights]
+        if captured != self.EMPTY:
+            captured_row = from_row if move.is_en_passant else to_row
+            h ^= _ZOBRIST_BY_PIECE[captured][captured_row * 8 + to_col]
+        if self.en_passant_square is not None:
+            h ^= Z_EP[self.en_passant_square & 7]
         
         # Обновление счетчика полуходов
         if piece.lower() == 'p' or move.is_capture:
@@ -256,6 +340,11 @@ class ChessBoard:
         if move.is_castling:
             # Рокировка
             self._execute_castling(move)
+            rook_keys = _ZOBRIST_BY_PIECE[self.get_piece(from_row, 5 if to_col > from_col else 3)]
+            if to_col > from_col:
+                h ^= rook_keys[from_row * 8 + 7] ^ rook_keys[from_row * 8 + 5]
+            else:
+                h ^= rook_keys[from_row * 8] ^ rook_keys[from_row * 8 + 3]
         elif move.is_en_passant:
             # Взятие на проходе
             self._execute_en_passant(move)
@@ -270,11 +359,17 @@ class ChessBoard:
             
             # Проверка на двойной ход пешки (для en passant)
             if piece.lower() == 'p' and abs(to_row - from_row) == 2:
-                en_passant_row = (from_row + to_row) // 2
-                self.en_passant_square = self.coords_to_algebraic(en_passant_row, to_col)
+                self.en_passant_square = (from_row + to_row) // 2 * 8 + to_col
+        
+        # Обновление прав на рокировку: ход с поля или на поле короля/ладьи
+        self.castling_rights &= CASTLE_MASK[from_row * 8 + from_col] & CASTLE_MASK[to_row * 8 + to_col]
         
-        # Обновление прав на рокировку
-        self._update_castling_rights(piece, from_row, from_col, to_row, to_col)
+        # Добавляем в хеш фигуру на новом поле и новое состояние
+        h ^= _ZOBRIST_BY_PIECE[self.get_piece(to_row, to_col)][to_row * 8 + to_col]
+        h ^= Z_CASTLE[self.castling_rights] ^ Z_SIDE
+        if self.en_passant_square is not None:
+            h ^= Z_EP[to_col]
+        self.zobrist = h
         
         # Смена хода
         self.white_to_move = not self.white_to_move
@@ -282,6 +377,50 @@ class ChessBoard:
         # Обновление номера хода
         if not self.white_to_move:
             self.fullmove_number += 1
+        
+        return undo
+    
+    def unmake_move(self, move: 'Move', undo: tuple) -> None:
+        """
+        Отменяет ход, выполненный make_move.
+        
+        Позволяет поиску работать на одной доске без копирования
+        на каждом узле.
+        
+        Args:
+            move: Отменяемый ход
+            undo: Данные, возвращенные make_move
+        """
+        piece, captured, castling_rights, en_passant, halfmove, fullmove, zobrist = undo
+        from_row, from_col = move.from_pos
+        to_row, to_col = move.to_pos
+        board = self.board
+        from_index = from_row * 8 + from_col
+        to_index = to_row * 8 + to_col
+        
+        board[from_index] = ord(piece)
+        if move.is_en_passant:
+            board[to_index] = self.EMPTY_BYTE
+            board[from_row * 8 + to_col] = ord(captured)
+        else:
+            board[to_index] = ord(captured)
+            if move.is_castling:
+                # Возвращаем ладью на место
+                if to_col > from_col:
+                    board[from_row * 8 + 7] = board[from_row * 8 + 5]
+                    board[from_row * 8 + 5] = self.EMPTY_BYTE
+                else:
+                    board[from_row * 8] = board[from_row * 8 + 3]
+                    board[from_row * 8 + 3] = self.EMPTY_BYTE
+        
+        self.castling_rights = castling_rights
+        self.en_passant_square = en_passant
+        self.halfmove_clock = halfmove
+        self.fullmove_number = fullmove
+        self.zobrist = zobrist
+        self.white_to_move = not self.white_to_move
+        if self.record_history:
+            self.position_history.pop()
     
     def _execute_castling(self, move: 'Move') -> None:
         """Выполняет рокировку."""
@@ -317,55 +456,31 @@ class ChessBoard:
         captured_pawn_row = from_row
         self.set_piece(captured_pawn_row, to_col, self.EMPTY)
     
-    def _update_castling_rights(self, piece: str, from_row: int, from_col: int, 
-                                to_row: int, to_col: int) -> None:
-        """Обновляет права на рокировку после хода."""
-        # Если король сходил
-        if piece == self.WHITE_KING:
-            self.castling_rights['K'] = False
-            self.castling_rights['Q'] = False
-        elif piece == self.BLACK_KING:
-            self.castling_rights['k'] = False
-            self.castling_rights['q'] = False
-        
-        # Если ладья сходила
-        if piece == self.WHITE_ROOK:
-            if from_row == 7 and from_col == 7:
-                self.castling_rights['K'] = False
-            elif from_row == 7 and from_col == 0:
-                self.castling_rights['Q'] = False
-        elif piece == self.BLACK_ROOK:
-            if from_row == 0 and from_col == 7:
-                self.castling_rights['k'] = False
-            elif from_row == 0 and from_col == 0:
-                self.castling_rights['q'] = False
-        
-        # Если ладья была взята
-        if to_row == 7 and to_col == 7:
-            self.castling_rights['K'] = False
-        elif to_row == 7 and to_col == 0:
-            self.castling_rights['Q'] = False
-        elif to_row == 0 and to_col == 7:
-            self.castling_rights['k'] = False
-        elif to_row == 0 and to_col == 0:
-            self.castling_rights['q'] = False
-    
     def copy(self) -> 'ChessBoard':
-        """Создает копию доски."""
-        new_board = ChessBoard()
-        new_board.board = deepcopy(self.board)
+        """
+        Создает копию доски.
+        
+        Конструктор не вызывается: он заново строит начальную позицию,
+        которая тут же была бы перезаписана. Все поля, кроме доски
+        и истории, неизменяемые, поэтому достаточно поверхностных копий.
+        """
+        new_board = ChessBoard.__new__(ChessBoard)
+        new_board.board = self.board[:]
         new_board.white_to_move = self.white_to_move
-        new_board.castling_rights = self.castling_rights.copy()
+        new_board.castling_rights = self.castling_rights
         new_board.en_passant_square = self.en_passant_square
         new_board.halfmove_clock = self.halfmove_clock
         new_board.fullmove_number = self.fullmove_number
         new_board.position_history = self.position_history.copy()
+        new_board.record_history = self.record_history
+        new_board.zobrist = self.zobrist
         return new_board
     
     def __str__(self) -> str:
         """Строковое представление доски."""
         result = []
-        for i, row in enumerate(self.board):
+        for i in range(8):
+            row = self.board[i * 8:i * 8 + 8].decode('ascii')
             result.append(f"{8-i} {' '.join(row)}")
         result.append("  a b c d e f g h")
         return '\n'.join(result)
@@ -374,32 +489,68 @@ class ChessBoard:
 class Move:
     """Класс для представления хода."""
     
+    __slots__ = ('from_pos', 'to_pos', 'piece', 'captured_piece', 'is_capture',
+                 'promotion_piece', 'is_promotion', 'is_castling', 'is_en_passant', 'key')
+    
+    # Код фигуры превращения в младших битах Move.key
+    PROMOTION_CODES = {None: 0, 'N': 1, 'B': 2, 'R': 3, 'Q': 4, 'n': 5, 'b': 6, 'r': 7, 'q': 8}
+    
     def __init__(self, from_pos: Tuple[int, int], to_pos: Tuple[int, int],
-                 board: ChessBoard, promotion_piece: str = None):
+                 board: ChessBoard, promotion_piece: str = None,
+                 is_promotion: bool = False, is_castling: bool = False,
+                 is_en_passant: bool = False):
         """
         Инициализация хода.
         
+        Тип хода не определяется по доске: генератор ходов передает флаги сам.
+        Для хода, собранного вне генератора, нужно вызвать classify().
+        
         Args:
             from_pos: Начальная позиция (row, col)
             to_pos: Конечная позиция (row, col)
             board: Доска для анализа хода
             promotion_piece: Фигура для превращения пешки
+            is_promotion: Ход является превращением пешки
+            is_castling: Ход является рокировкой
+            is_en_passant: Ход является взятием на проходе
         """
         self.from_pos = from_pos
         self.to_pos = to_pos
         self.piece = board.get_piece(*from_pos)
         self.captured_piece = board.get_piece(*to_pos)
-        self.is_capture = self.captured_piece != ChessBoard.EMPTY
+        self.is_capture = is_en_passant or self.captured_piece != ChessBoard.EMPTY
         self.promotion_piece = promotion_piece
-        self.is_promotion = False
-        self.is_castling = False
-        self.is_en_passant = False
+        self.is_promotion = is_promotion
+        self.is_castling = is_castling
+        self.is_en_passant = is_en_passant
         
-        # Определение специальных ходов
-        self._determine_special_moves(board)
+        # Ход, упакованный в одно число: для сравнения и хеширования
+        self.key = self.pack_key(from_pos, to_pos, promotion_piece)
     
-    def _determine_special_moves(self, board: ChessBoard) -> None:
-        """Определяет специальные типы ходов."""
+    @staticmethod
+    def pack_key(from_pos: Tuple[int, int], to_pos: Tuple[int, int],
+                 promotion_piece: str = None) -> int:
+        """
+        Упаковывает поля хода и фигуру превращения в целое число.
+        
+        Returns:
+            Ключ хода (from_row, from_col, to_row, to_col по 3 бита, код превращения)
+        """
+        return ((from_pos[0] << 15) | (from_pos[1] << 12) | (to_pos[0] << 9) |
+                (to_pos[1] << 6) | Move.PROMOTION_CODES[promotion_piece])
+    
+    def classify(self, board: ChessBoard) -> 'Move':
+        """
+        Определяет специальные типы хода по доске.
+        
+        Нужно только для ходов, созданных без флагов вне генератора ходов.
+        
+        Args:
+            board: Доска, на которой делается ход
+            
+        Returns:
+            Этот же ход
+        """
         from_row, from_col = self.from_pos
         to_row, to_col = self.to_pos
         
@@ -417,11 +568,13 @@ class Move:
             self.is_castling = True
         
         # Взятие на проходе
-        if self.piece.lower() == 'p' and board.en_passant_square:
-            en_passant_coords = board.algebraic_to_coords(board.en_passant_square)
-            if to_row == en_passant_coords[0] and to_col == en_passant_coords[1]:
+        if self.piece.lower() == 'p' and board.en_passant_square is not None:
+            if to_row * 8 + to_col == board.en_passant_square:
                 self.is_en_passant = True
                 self.is_capture = True
+        
+        self.key = self.pack_key(self.from_pos, self.to_pos, self.promotion_piece)
+        return self
     
     def to_uci(self, board: ChessBoard) -> str:
         """
@@ -447,12 +600,8 @@ class Move:
     
     def __eq__(self, other) -> bool:
         """Сравнение ходов."""
-        if not isinstance(other, Move):
-            return False
-        return (self.from_pos == other.from_pos and 
-                self.to_pos == other.to_pos and
-                self.promotion_piece == other.promotion_piece)
+        return isinstance(other, Move) and self.key == other.key
     
     def __hash__(self) -> int:
         """Хеш для использования в множествах и словарях."""
-        return hash((self.from_pos, self.to_pos, self.promotion_piece))
+        return self.key
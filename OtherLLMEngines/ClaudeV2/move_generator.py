@@ -3,7 +3,63 @@
 """
 
 from typing import List, Tuple, Optional
-from chess_board import ChessBoard, Move
+from chess_board import (ChessBoard, Move, PIECE_COLOR, CASTLE_WHITE_KINGSIDE,
+                         CASTLE_WHITE_QUEENSIDE, CASTLE_BLACK_KINGSIDE, CASTLE_BLACK_QUEENSIDE)
+
+
+# Направления движения фигур (row, col)
+KNIGHT_OFFSETS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+KING_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+DIAGONAL_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+STRAIGHT_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+# Координаты (row, col) клетки по индексу row * 8 + col
+SQUARE_COORDS = tuple((index >> 3, index & 7) for index in range(64))
+
+
+def _build_targets(offsets):
+    """Для каждой клетки - индексы клеток, достижимых одним шагом из offsets."""
+    return tuple(
+        tuple((row + drow) * 8 + col + dcol for drow, dcol in offsets
+              if 0 <= row + drow < 8 and 0 <= col + dcol < 8)
+        for row, col in SQUARE_COORDS
+    )
+
+
+def _build_rays(directions):
+    """Для каждой клетки - лучи (индексы клеток по порядку) в каждом из направлений."""
+    rays = []
+    for row, col in SQUARE_COORDS:
+        square_rays = []
+        for drow, dcol in directions:
+            ray = []
+            new_row, new_col = row + drow, col + dcol
+            while 0 <= new_row < 8 and 0 <= new_col < 8:
+                ray.append(new_row * 8 + new_col)
+                new_row += drow
+                new_col += dcol
+            if ray:
+                square_rays.append(tuple(ray))
+        rays.append(tuple(square_rays))
+    return tuple(rays)
+
+
+# Таблицы ходов по индексу клетки: вся геометрия считается один раз при
+# импорте, генерация и проверка атак работают только с целыми числами
+KNIGHT_TARGETS = _build_targets(KNIGHT_OFFSETS)
+KING_TARGETS = _build_targets(KING_OFFSETS)
+BISHOP_RAYS = _build_rays(DIAGONAL_DIRECTIONS)
+ROOK_RAYS = _build_rays(STRAIGHT_DIRECTIONS)
+QUEEN_RAYS = _build_rays(KING_OFFSETS)
+
+# Поля, с которых пешка атакующей стороны бьет клетку (по цвету атакующего):
+# белая пешка бьет вверх, значит стоит строкой ниже (row + 1), черная - выше
+WHITE_PAWN_SOURCES = _build_targets(((1, -1), (1, 1)))
+BLACK_PAWN_SOURCES = _build_targets(((-1, -1), (-1, 1)))
+
+# Байты фигур: пешка, конь, слон, ладья, ферзь, король
+WHITE_CODES = tuple(ord(piece) for piece in 'PNBRQK')
+BLACK_CODES = tuple(ord(piece) for piece in 'pnbrqk')
 
 
 class MoveGenerator:
@@ -42,22 +98,16 @@ class MoveGenerator:
             Список псевдо-легальных ходов
         """
         moves = []
-        is_white = self.board.white_to_move
+        own_color = 1 if self.board.white_to_move else 2
         
-        for row in range(8):
-            for col in range(8):
-                piece = self.board.get_piece(row, col)
-                if piece == ChessBoard.EMPTY:
-                    continue
-                
-                # Проверяем, что это наша фигура
-                if (is_white and not self.board.is_white_piece(piece)) or \
-                   (not is_white and not self.board.is_black_piece(piece)):
-                    continue
-                
-                # Генерируем ходы для фигуры
-                piece_moves = self._generate_piece_moves(row, col, piece)
-                moves.extend(piece_moves)
+        for index, code in enumerate(self.board.board):
+            # Пропускаем пустые клетки и чужие фигуры
+            if PIECE_COLOR[code] != own_color:
+                continue
+            
+            # Генерируем ходы для фигуры
+            piece_moves = self._generate_piece_moves(index >> 3, index & 7, chr(code))
+            moves.extend(piece_moves)
         
         return moves
     
@@ -93,76 +143,71 @@ class MoveGenerator:
     def _generate_pawn_moves(self, row: int, col: int, piece: str) -> List[Move]:
         """Генерирует ходы пешки."""
         moves = []
+        squares = self.board.board
         is_white = self.board.is_white_piece(piece)
+        enemy_color = 2 if is_white else 1
         direction = -1 if is_white else 1
         start_row = 6 if is_white else 1
         
         # Ход вперед
         new_row = row + direction
-        if 0 <= new_row < 8 and self.board.get_piece(new_row, col) == ChessBoard.EMPTY:
+        if 0 <= new_row < 8 and squares[new_row * 8 + col] == ChessBoard.EMPTY_BYTE:
             if (is_white and new_row == 0) or (not is_white and new_row == 7):
                 # Превращение пешки
                 for promotion in ['q', 'r', 'b', 'n']:
                     promotion_piece = promotion.upper() if is_white else promotion
-                    moves.append(Move((row, col), (new_row, col), self.board, promotion_piece))
+                    moves.append(Move((row, col), (new_row, col), self.board, promotion_piece,
+                                      is_promotion=True))
             else:
                 moves.append(Move((row, col), (new_row, col), self.board))
             
             # Двойной ход с начальной позиции
             if row == start_row:
                 double_row = row + 2 * direction
-                if self.board.get_piece(double_row, col) == ChessBoard.EMPTY:
+                if squares[double_row * 8 + col] == ChessBoard.EMPTY_BYTE:
                     moves.append(Move((row, col), (double_row, col), self.board))
         
         # Взятие
         for dcol in [-1, 1]:
             new_col = col + dcol
-            if 0 <= new_col < 8:
-                target_piece = self.board.get_piece(new_row, new_col)
-                if target_piece != ChessBoard.EMPTY and \
-                   self.board.is_enemy_piece(target_piece, is_white):
+            if 0 <= new_col < 8 and 0 <= new_row < 8:
+                if PIECE_COLOR[squares[new_row * 8 + new_col]] == enemy_color:
                     if (is_white and new_row == 0) or (not is_white and new_row == 7):
                         # Превращение при взятии
                         for promotion in ['q', 'r', 'b', 'n']:
                             promotion_piece = promotion.upper() if is_white else promotion
-                            moves.append(Move((row, col), (new_row, new_col), self.board, promotion_piece))
+                            moves.append(Move((row, col), (new_row, new_col), self.board,
+                                              promotion_piece, is_promotion=True))
                     else:
                         moves.append(Move((row, col), (new_row, new_col), self.board))
         
         # Взятие на проходе
-        if self.board.en_passant_square:
-            en_passant_coords = self.board.algebraic_to_coords(self.board.en_passant_square)
-            if en_passant_coords[0] == new_row:
-                for dcol in [-1, 1]:
-                    new_col = col + dcol
-                    if new_col == en_passant_coords[1]:
-                        moves.append(Move((row, col), en_passant_coords, self.board))
+        en_passant_square = self.board.en_passant_square
+        if en_passant_square is not None and en_passant_square >> 3 == new_row:
+            en_passant_col = en_passant_square & 7
+            if en_passant_col == col - 1 or en_passant_col == col + 1:
+                moves.append(Move((row, col), (new_row, en_passant_col), self.board,
+                                  is_en_passant=True))
         
         return moves
     
     def _generate_knight_moves(self, row: int, col: int, piece: str) -> List[Move]:
         """Генерирует ходы коня."""
         moves = []
-        is_white = self.board.is_white_piece(piece)
-        
-        # Все возможные ходы коня
-        knight_moves = [
-            (-2, -1), (-2, 1), (-1, -2), (-1, 2),
-            (1, -2), (1, 2), (2, -1), (2, 1)
-        ]
+        board = self.board
+        squares = board.board
+        own_color = 1 if board.is_white_piece(piece) else 2
+        from_pos = (row, col)
         
-        for drow, dcol in knight_moves:
-            new_row, new_col = row + drow, col + dcol
-            if 0 <= new_row < 8 and 0 <= new_col < 8:
-                target_piece = self.board.get_piece(new_row, new_col)
-                if target_piece == ChessBoard.EMPTY or \
-                   self.board.is_enemy_piece(target_piece, is_white):
-                    moves.append(Move((row, col), (new_row, new_col), self.board))
+        for target in KNIGHT_TARGETS[row * 8 + col]:
+            # Пустая клетка или вражеская фигура
+            if PIECE_COLOR[squares[target]] != own_color:
+                moves.append(Move(from_pos, SQUARE_COORDS[target], board))
         
         return moves
     
     def _generate_sliding_moves(self, row: int, col: int, piece: str, 
-                                 directions: List[Tuple[int, int]]) -> List[Move]:
+                                 rays: Tuple[Tuple[int, ...], ...]) -> List[Move]:
         """
         Генерирует ходы для скользящих фигур (слон, ладья, ферзь).
         
@@ -170,71 +215,57 @@ class MoveGenerator:
             row: Строка
             col: Колонка
             piece: Фигура
-            directions: Направления движения
+            rays: Лучи из клетки фигуры (BISHOP_RAYS/ROOK_RAYS/QUEEN_RAYS)
             
         Returns:
             Список ходов
         """
         moves = []
-        is_white = self.board.is_white_piece(piece)
-        
-        for drow, dcol in directions:
-            new_row, new_col = row + drow, col + dcol
-            
-            while 0 <= new_row < 8 and 0 <= new_col < 8:
-                target_piece = self.board.get_piece(new_row, new_col)
+        board = self.board
+        squares = board.board
+        enemy_color = 2 if board.is_white_piece(piece) else 1
+        from_pos = (row, col)
+        
+        for ray in rays:
+            for target in ray:
+                target_color = PIECE_COLOR[squares[target]]
                 
-                if target_piece == ChessBoard.EMPTY:
-                    moves.append(Move((row, col), (new_row, new_col), self.board))
-                elif self.board.is_enemy_piece(target_piece, is_white):
-                    moves.append(Move((row, col), (new_row, new_col), self.board))
+                if target_color == 0:
+                    moves.append(Move(from_pos, SQUARE_COORDS[target], board))
+                elif target_color == enemy_color:
+                    moves.append(Move(from_pos, SQUARE_COORDS[target], board))
                     break
                 else:
                     break
-                
-                new_row += drow
-                new_col += dcol
         
         return moves
     
     def _generate_bishop_moves(self, row: int, col: int, piece: str) -> List[Move]:
         """Генерирует ходы слона."""
-        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-        return self._generate_sliding_moves(row, col, piece, directions)
+        return self._generate_sliding_moves(row, col, piece, BISHOP_RAYS[row * 8 + col])
     
     def _generate_rook_moves(self, row: int, col: int, piece: str) -> List[Move]:
         """Генерирует ходы ладьи."""
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        return self._generate_sliding_moves(row, col, piece, directions)
+        return self._generate_sliding_moves(row, col, piece, ROOK_RAYS[row * 8 + col])
     
     def _generate_queen_moves(self, row: int, col: int, piece: str) -> List[Move]:
         """Генерирует ходы ферзя."""
-        directions = [
-            (-1, -1), (-1, 0), (-1, 1),
-            (0, -1),           (0, 1),
-            (1, -1),  (1, 0),  (1, 1)
-        ]
-        return self._generate_sliding_moves(row, col, piece, directions)
+        return self._generate_sliding_moves(row, col, piece, QUEEN_RAYS[row * 8 + col])
     
     def _generate_king_moves(self, row: int, col: int, piece: str) -> List[Move]:
         """Генерирует ходы короля."""
         moves = []
-        is_white = self.board.is_white_piece(piece)
+        board = self.board
+        squares = board.board
+        is_white = board.is_white_piece(piece)
+        own_color = 1 if is_white else 2
+        from_pos = (row, col)
         
         # Обычные ходы короля
-        king_moves = [
-            (-1, -1), (-1, 0), (-1, 1),
-            (0, -1),           (0, 1),
-            (1, -1),  (1, 0),  (1, 1)
-        ]
-        
-        for drow, dcol in king_moves:
-            new_row, new_col = row + drow, col + dcol
-            if 0 <= new_row < 8 and 0 <= new_col < 8:
-                target_piece = self.board.get_piece(new_row, new_col)
-                if target_piece == ChessBoard.EMPTY or \
-                   self.board.is_enemy_piece(target_piece, is_white):
-                    moves.append(Move((row, col), (new_row, new_col), self.board))
+        for target in KING_TARGETS[row * 8 + col]:
+            # Пустая клетка или вражеская фигура
+            if PIECE_COLOR[squares[target]] != own_color:
+                moves.append(Move(from_pos, SQUARE_COORDS[target], board))
         
         # Рокировка
         castling_moves = self._generate_castling_moves(row, col, is_white)
@@ -252,38 +283,38 @@ class MoveGenerator:
         
         if is_white:
             # Короткая рокировка белых
-            if self.board.castling_rights['K']:
+            if self.board.castling_rights & CASTLE_WHITE_KINGSIDE:
                 if self.board.get_piece(7, 5) == ChessBoard.EMPTY and \
                    self.board.get_piece(7, 6) == ChessBoard.EMPTY and \
                    not self.is_square_attacked(7, 5, False) and \
                    not self.is_square_attacked(7, 6, False):
-                    moves.append(Move((7, 4), (7, 6), self.board))
+                    moves.append(Move((7, 4), (7, 6), self.board, is_castling=True))
             
             # Длинная рокировка белых
-            if self.board.castling_rights['Q']:
+            if self.board.castling_rights & CASTLE_WHITE_QUEENSIDE:
                 if self.board.get_piece(7, 3) == ChessBoard.EMPTY and \
                    self.board.get_piece(7, 2) == ChessBoard.EMPTY and \
                    self.board.get_piece(7, 1) == ChessBoard.EMPTY and \
                    not self.is_square_attacked(7, 3, False) and \
                    not self.is_square_attacked(7, 2, False):
-                    moves.append(Move((7, 4), (7, 2), self.board))
+                    moves.append(Move((7, 4), (7, 2), self.board, is_castling=True))
         else:
             # Короткая рокировка черных
-            if self.board.castling_rights['k']:
+            if self.board.castling_rights & CASTLE_BLACK_KINGSIDE:
                 if self.board.get_piece(0, 5) == ChessBoard.EMPTY and \
                    self.board.get_piece(0, 6) == ChessBoard.EMPTY and \
                    not self.is_square_attacked(0, 5, True) and \
                    not self.is_square_attacked(0, 6, True):
-                    moves.append(Move((0, 4), (0, 6), self.board))
+                    moves.append(Move((0, 4), (0, 6), self.board, is_castling=True))
             
             # Длинная рокировка черных
-            if self.board.castling_rights['q']:
+            if self.board.castling_rights & CASTLE_BLACK_QUEENSIDE:
                 if self.board.get_piece(0, 3) == ChessBoard.EMPTY and \
                    self.board.get_piece(0, 2) == ChessBoard.EMPTY and \
                    self.board.get_piece(0, 1) == ChessBoard.EMPTY and \
                    not self.is_square_attacked(0, 3, True) and \
                    not self.is_square_attacked(0, 2, True):
-                    moves.append(Move((0, 4), (0, 2), self.board))
+                    moves.append(Move((0, 4), (0, 2), self.board, is_castling=True))
         
         return moves
     
@@ -297,18 +328,21 @@ class MoveGenerator:
         Returns:
             True если ход легальный
         """
-        # Делаем ход на копии доски
-        test_board = self.board.copy()
-        test_board.make_move(move)
+        # Делаем ход на доске и затем отменяем его
+        board = self.board
+        undo = board.make_move(move)
         
         # Находим короля (после хода очередь сменилась, поэтому инвертируем)
-        king_pos = test_board.find_king(not test_board.white_to_move)
+        king_pos = board.find_king(not board.white_to_move)
         
         if not king_pos:
-            return False
+            legal = False
+        else:
+            # Проверяем, атакован ли король
+            legal = not self.is_square_attacked_on_board(board, *king_pos, board.white_to_move)
         
-        # Проверяем, атакован ли король
-        return not self.is_square_attacked_on_board(test_board, *king_pos, test_board.white_to_move)
+        board.unmake_move(move, undo)
+        return legal
     
     def is_square_attacked(self, row: int, col: int, by_white: bool) -> bool:
         """
@@ -338,72 +372,48 @@ class MoveGenerator:
         Returns:
             True если клетка атакована
         """
-        # Проверка атаки пешками
-        pawn_direction = 1 if by_white else -1
-        pawn_row = row - pawn_direction
-        pawn = ChessBoard.WHITE_PAWN if by_white else ChessBoard.BLACK_PAWN
+        squares = board.board
+        index = row * 8 + col
+        if by_white:
+            pawn, knight, bishop, rook, queen, king = WHITE_CODES
+            pawn_sources = WHITE_PAWN_SOURCES
+        else:
+            pawn, knight, bishop, rook, queen, king = BLACK_CODES
+            pawn_sources = BLACK_PAWN_SOURCES
         
-        if 0 <= pawn_row < 8:
-            for dcol in [-1, 1]:
-                pawn_col = col + dcol
-                if 0 <= pawn_col < 8 and board.get_piece(pawn_row, pawn_col) == pawn:
-                    return True
+        # Проверка атаки пешками
+        for source in pawn_sources[index]:
+            if squares[source] == pawn:
+                return True
         
         # Проверка атаки конями
-        knight = ChessBoard.WHITE_KNIGHT if by_white else ChessBoard.BLACK_KNIGHT
-        knight_moves = [
-            (-2, -1), (-2, 1), (-1, -2), (-1, 2),
-            (1, -2), (1, 2), (2, -1), (2, 1)
-        ]
-        for drow, dcol in knight_moves:
-            new_row, new_col = row + drow, col + dcol
-            if 0 <= new_row < 8 and 0 <= new_col < 8:
-                if board.get_piece(new_row, new_col) == knight:
-                    return True
+        for source in KNIGHT_TARGETS[index]:
+            if squares[source] == knight:
+                return True
         
         # Проверка атаки слонами и ферзями (диагонали)
-        bishop = ChessBoard.WHITE_BISHOP if by_white else ChessBoard.BLACK_BISHOP
-        queen = ChessBoard.WHITE_QUEEN if by_white else ChessBoard.BLACK_QUEEN
-        diagonal_directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-        
-        for drow, dcol in diagonal_directions:
-            new_row, new_col = row + drow, col + dcol
-            while 0 <= new_row < 8 and 0 <= new_col < 8:
-                piece = board.get_piece(new_row, new_col)
-                if piece != ChessBoard.EMPTY:
+        empty = ChessBoard.EMPTY_BYTE
+        for ray in BISHOP_RAYS[index]:
+            for source in ray:
+                piece = squares[source]
+                if piece != empty:
                     if piece == bishop or piece == queen:
                         return True
                     break
-                new_row += drow
-                new_col += dcol
         
         # Проверка атаки ладьями и ферзями (прямые)
-        rook = ChessBoard.WHITE_ROOK if by_white else ChessBoard.BLACK_ROOK
-        straight_directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        
-        for drow, dcol in straight_directions:
-            new_row, new_col = row + drow, col + dcol
-            while 0 <= new_row < 8 and 0 <= new_col < 8:
-                piece = board.get_piece(new_row, new_col)
-                if piece != ChessBoard.EMPTY:
+        for ray in ROOK_RAYS[index]:
+            for source in ray:
+                piece = squares[source]
+                if piece != empty:
                     if piece == rook or piece == queen:
                         return True
                     break
-                new_row += drow
-                new_col += dcol
         
         # Проверка атаки королем
-        king = ChessBoard.WHITE_KING if by_white else ChessBoard.BLACK_KING
-        king_moves = [
-            (-1, -1), (-1, 0), (-1, 1),
-            (0, -1),           (0, 1),
-            (1, -1),  (1, 0),  (1, 1)
-        ]
-        for drow, dcol in king_moves:
-            new_row, new_col = row + drow, col + dcol
-            if 0 <= new_row < 8 and 0 <= new_col < 8:
-                if board.get_piece(new_row, new_col) == king:
-                    return True
+        for source in KING_TARGETS[index]:
+            if squares[source] == king:
+                return True
         
         return False
     
@@ -502,16 +512,7 @@ class MoveGenerator:
         Returns:
             True если позиция повторилась трижды
         """
-        current_position = self.board.to_fen().split()[0]  # Только расстановка фигур
-        count = 0
-        
-        for position in self.board.position_history:
-            if position.split()[0] == current_position:
-                count += 1
-                if count >= 3:
-                    return True
-        
-        return False
+        return self.board.position_history.count(self.board.zobrist) >= 3
     
     def is_game_over(self) -> Tuple[bool, str]:
         """
@@ -128,22 +128,27 @@ class SearchEngine:
         alpha = float('-inf')
         beta = float('inf')
         
-        for move in legal_moves:
-            if self._should_stop():
-                break
-            
-            # Делаем ход
-            test_board = board.copy()
-            test_board.make_move(move)
-            
-            # Оцениваем позицию
-            value = -self._minimax(test_board, depth - 1, -beta, -alpha, False)
-            
-            if value > best_value:
-                best_value = value
-                best_move = move
-            
-            alpha = max(alpha, value)
+        # История позиций нужна только для ходов партии,
+        # внутри перебора ее запись отключается
+        record_history = board.record_history
+        board.record_history = False
+        try:
+            for move in legal_moves:
+                if self._should_stop():
+                    break
+                
+                # Делаем ход, оцениваем позицию и отменяем ход
+                undo = board.make_move(move)
+                value = -self._minimax(board, depth - 1, -beta, -alpha, False)
+                board.unmake_move(move, undo)
+                
+                if value > best_value:
+                    best_value = value
+                    best_move = move
+                
+                alpha = max(alpha, value)
+        finally:
+            board.record_history = record_history
         
         return best_move
     
@@ -192,9 +197,9 @@ class SearchEngine:
                 if self._should_stop():
                     break
                 
-                test_board = board.copy()
-                test_board.make_move(move)
-                eval_score = self._minimax(test_board, depth - 1, alpha, beta, False)
+                undo = board.make_move(move)
+                eval_score = self._minimax(board, depth - 1, alpha, beta, False)
+                board.unmake_move(move, undo)
                 max_eval = max(max_eval, eval_score)
                 alpha = max(alpha, eval_score)
                 
@@ -208,9 +213,9 @@ class SearchEngine:
                 if self._should_stop():
                     break
                 
-                test_board = board.copy()
-                test_board.make_move(move)
-                eval_score = self._minimax(test_board, depth - 1, alpha, beta, True)
+                undo = board.make_move(move)
+                eval_score = self._minimax(board, depth - 1, alpha, beta, True)
+                board.unmake_move(move, undo)
                 min_eval = min(min_eval, eval_score)
                 beta = min(beta, eval_score)
                 
@@ -238,7 +243,12 @@ class SearchEngine:
         if self._should_stop() or depth == 0:
             return self.evaluate(board)
         
-        stand_pat = self.evaluate(board)
+        # Список ходов нужен и оценке (мат/пат, мобильность), и перебору
+        # взятий - генерируем его один раз
+        move_gen = MoveGenerator(board)
+        legal_moves = move_gen.generate_legal_moves()
+        
+        stand_pat = self.evaluate(board, legal_moves)
         
         if stand_pat >= beta:
             return beta
@@ -246,9 +256,6 @@ class SearchEngine:
         if alpha < stand_pat:
             alpha = stand_pat
         
-        move_gen = MoveGenerator(board)
-        legal_moves = move_gen.generate_legal_moves()
-        
         # Рассматриваем только взятия
         capture_moves = [move for move in legal_moves if move.is_capture]
         capture_moves = self._order_moves(board, capture_moves)
@@ -257,10 +264,9 @@ class SearchEngine:
             if self._should_stop():
                 break
             
-            test_board = board.copy()
-            test_board.make_move(move)
-            
-            score = -self._quiescence_search(test_board, -beta, -alpha, depth - 1)
+            undo = board.make_move(move)
+            score = -self._quiescence_search(board, -beta, -alpha, depth - 1)
+            board.unmake_move(move, undo)
             
             if score >= beta:
                 return beta
@@ -304,12 +310,13 @@ class SearchEngine:
         
         return sorted(moves, key=move_priority, reverse=True)
     
-    def evaluate(self, board: ChessBoard) -> float:
+    def evaluate(self, board: ChessBoard, legal_moves: Optional[List[Move]] = None) -> float:
         """
         Оценивает позицию на доске.
         
         Args:
             board: Шахматная доска
+            legal_moves: Уже сгенерированные легальные ходы позиции (если есть)
             
         Returns:
             Оценка позиции (положительная для белых, отрицательная для черных)
@@ -317,7 +324,8 @@ class SearchEngine:
         move_gen = MoveGenerator(board)
         
         # Проверка на мат и пат
-        legal_moves = move_gen.generate_legal_moves()
+        if legal_moves is None:
+            legal_moves = move_gen.generate_legal_moves()
         if not legal_moves:
             if move_gen.is_in_check():
                 # Мат
@@ -152,8 +152,13 @@ class UCIInterface:
         from_square = move_str[:2]
         to_square = move_str[2:4]
         
-        from_pos = self.board.algebraic_to_coords(from_square)
-        to_pos = self.board.algebraic_to_coords(to_square)
+        try:
+            from_pos = self.board.algebraic_to_coords(from_square)
+            to_pos = self.board.algebraic_to_coords(to_square)
+        except ValueError:
+            return None
+        if not all(0 <= coord < 8 for coord in from_pos + to_pos):
+            return None
         
         # Проверка на превращение
         promotion_piece = None
@@ -161,17 +166,23 @@ class UCIInterface:
             promotion_char = move_str[4].lower()
             is_white = self.board.is_white_piece(self.board.get_piece(*from_pos))
             promotion_piece = promotion_char.upper() if is_white else promotion_char
+            if promotion_piece not in Move.PROMOTION_CODES:
+                return None
         
         # Находим соответствующий легальный ход
         move_gen = MoveGenerator(self.board)
         legal_moves = move_gen.generate_legal_moves()
         
-        for move in legal_moves:
-            if move.from_pos == from_pos and move.to_pos == to_pos:
-                if promotion_piece:
-                    if move.is_promotion and move.promotion_piece == promotion_piece:
-                        return move
-                else:
+        key = Move.pack_key(from_pos, to_pos, promotion_piece)
+        if promotion_piece:
+            for move in legal_moves:
+                if move.key == key:
+                    return move
+        else:
+            # Без указанной фигуры подходит любой ход между этими полями
+            squares_key = key >> 6
+            for move in legal_moves:
+                if move.key >> 6 == squares_key:
                     return move
         
         return None
@@ -8,7 +8,6 @@ and position history tracking.
 
 from typing import Optional, List, Tuple
 from dataclasses import dataclass
-from copy import deepcopy
 
 # Piece type constants (lower 3 bits)
 EMPTY = 0
@@ -52,10 +51,29 @@ FEN_TO_PIECE = {
 
 PIECE_TO_FEN = {v: k for k, v in FEN_TO_PIECE.items()}
 
+# Piece values in centipawns
+PIECE_VALUES = {
+    PAWN: 100,
+    KNIGHT: 320,
+    BISHOP: 330,
+    ROOK: 500,
+    QUEEN: 900,
+    KING: 20000
+}
+
+# Promotion piece suffix for UCI notation
+PROMOTION_TO_CHAR = {QUEEN: 'q', ROOK: 'r', BISHOP: 'b', KNIGHT: 'n'}
+
 # Square names for UCI notation
 FILE_NAMES = 'abcdefgh'
 RANK_NAMES = '12345678'
 
+# File, rank and square colour (0 dark, 1 light) of each square, so hot
+# paths index a tuple instead of doing integer division
+FILE_OF = tuple(sq % 8 for sq in range(64))
+RANK_OF = tuple(sq // 8 for sq in range(64))
+SQ_COLOR = tuple((FILE_OF[sq] + RANK_OF[sq]) & 1 for sq in range(64))
+
 
 def square_name(sq: int) -> str:
     """Convert square index (0-63) to algebraic notation (e.g., 'e4')."""
@@ -89,49 +107,79 @@ def is_black(piece: int) -> bool:
     return (piece & COLOR_MASK) == BLACK
 
 
-@dataclass
-class Move:
-    """
-    Represents a chess move.
-    
-    Attributes:
-        from_sq: Source square (0-63)
-        to_sq: Destination square (0-63)
-        promotion: Piece type for pawn promotion (QUEEN, ROOK, BISHOP, KNIGHT) or 0
-        is_castling: True if this is a castling move
-        is_en_passant: True if this is an en passant capture
-    """
-    from_sq: int
-    to_sq: int
-    promotion: int = 0
-    is_castling: bool = False
-    is_en_passant: bool = False
-    
-    def to_uci(self) -> str:
-        """Convert move to UCI notation (e.g., 'e2e4', 'e7e8q')."""
-        uci = square_name(self.from_sq) + square_name(self.to_sq)
-        if self.promotion:
-            promo_chars = {QUEEN: 'q', ROOK: 'r', BISHOP: 'b', KNIGHT: 'n'}
-            uci += promo_chars.get(self.promotion, '')
-        return uci
-    
-    def __eq__(self, other):
-        if not isinstance(other, Move):
-            return False
-        return (self.from_sq == other.from_sq and 
-                self.to_sq == other.to_sq and 
-                self.promotion == other.promotion)
-    
-    def __hash__(self):
-        return hash((self.from_sq, self.to_sq, self.promotion))
-    
-    def __repr__(self):
-        return f"Move({self.to_uci()})"
+# Moves are packed into a single int:
+#   bits 0-5    source square (0-63)
+#   bits 6-11   destination square (0-63)
+#   bits 12-14  promotion piece type (QUEEN, ROOK, BISHOP, KNIGHT) or 0
+#   bit 15      castling
+#   bit 16      en passant capture
+# Source and destination always differ, so every real move is non-zero and
+# NO_MOVE (0) can stand for "no move".
+Move = int
+
+NO_MOVE = 0
+MOVE_SQUARE_MASK = 63
+MOVE_TO_SHIFT = 6
+MOVE_PROMOTION_SHIFT = 12
+MOVE_CASTLING = 1 << 15
+MOVE_EN_PASSANT = 1 << 16
+
+# Rook from/to squares of each castling move as a bitboard, by king destination
+CASTLING_ROOK_BITS = {6: 1 << 7 | 1 << 5, 2: 1 << 0 | 1 << 3,
+                      62: 1 << 63 | 1 << 61, 58: 1 << 56 | 1 << 59}
+
+
+def encode_move(from_sq: int, to_sq: int, promotion: int = 0,
+                is_castling: bool = False, is_en_passant: bool = False) -> Move:
+    """Pack move fields into a move int."""
+    move = from_sq | (to_sq << MOVE_TO_SHIFT) | (promotion << MOVE_PROMOTION_SHIFT)
+    if is_castling:
+        move |= MOVE_CASTLING
+    if is_en_passant:
+        move |= MOVE_EN_PASSANT
+    return move
+
+
+def move_from_sq(move: Move) -> int:
+    """Source square of a move."""
+    return move & MOVE_SQUARE_MASK
+
+
+def move_to_sq(move: Move) -> int:
+    """Destination square of a move."""
+    return (move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK
+
+
+def move_promotion(move: Move) -> int:
+    """Promotion piece type of a move, or 0."""
+    return (move >> MOVE_PROMOTION_SHIFT) & PIECE_MASK
+
+
+def move_is_castling(move: Move) -> bool:
+    """Check if a move is castling."""
+    return bool(move & MOVE_CASTLING)
+
+
+def move_is_en_passant(move: Move) -> bool:
+    """Check if a move is an en passant capture."""
+    return bool(move & MOVE_EN_PASSANT)
+
+
+def move_to_uci(move: Move) -> str:
+    """Convert move to UCI notation (e.g., 'e2e4', 'e7e8q')."""
+    uci = square_name(move & MOVE_SQUARE_MASK) + square_name((move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK)
+    promotion = (move >> MOVE_PROMOTION_SHIFT) & PIECE_MASK
+    if promotion:
+        uci += PROMOTION_TO_CHAR.get(promotion, '')
+    return uci
 
 
 @dataclass
 class UndoInfo:
     """Information needed to undo a move."""
+    __slots__ = ('captured_piece', 'castling_rights', 'en_passant_square',
+                 'halfmove_clock', 'moved_piece')
+    
     captured_piece: int
     castling_rights: int
     en_passant_square: int
@@ -147,13 +195,15 @@ class Board:
     where 0 = a1, 1 = b1, ..., 63 = h8.
     
     Attributes:
-        squares: 64-element list representing the board
+        squares: 64-byte bytearray of piece codes (EMPTY == 0)
         white_to_move: True if it's white's turn
         castling_rights: Bitmask for castling (1=K, 2=Q, 4=k, 8=q)
         en_passant_square: Target square for en passant (-1 if none)
         halfmove_clock: Moves since last pawn move or capture (for 50-move rule)
         fullmove_number: Full move counter
-        position_history: List of position hashes for repetition detection
+        position_history: Zobrist keys of the positions reached so far, for
+                          repetition detection. make_move does not touch it;
+                          the caller that owns the hash pushes and pops keys.
     """
     
     # Castling rights bitmasks
@@ -164,9 +214,14 @@ class Board:
     
     STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
     
+    __slots__ = ('squares', 'white_to_move', 'castling_rights', 'en_passant_square',
+                 'halfmove_clock', 'fullmove_number', 'position_history',
+                 '_endgame', '_endgame_dirty', 'big_pieces', 'king_squares',
+                 'bitboards', '_undo_stack', '_undo_ply')
+    
     def __init__(self, fen: Optional[str] = None):
         """Initialize board from FEN string or starting position."""
-        self.squares = [EMPTY] * 64
+        self.squares = bytearray(64)  # one byte per square, EMPTY == 0
         self.white_to_move = True
         self.castling_rights = 0
         self.en_passant_square = -1
@@ -174,6 +229,28 @@ class Board:
         self.fullmove_number = 1
         self.position_history: List[int] = []
         
+        # Cached is_endgame() result; only material changes
+        # (captures and promotions) mark it stale
+        self._endgame = False
+        self._endgame_dirty = True
+        
+        # Number of knights, bishops, rooks and queens per color,
+        # kept up to date by make_move/unmake_move
+        self.big_pieces = {WHITE: 0, BLACK: 0}
+        
+        # King square per color (-1 if absent), kept up to date the same way
+        self.king_squares = {WHITE: -1, BLACK: -1}
+        
+        # Bitboards (bit n set = piece on square n), indexed by piece code.
+        # Piece codes never use the bare color values, so bitboards[WHITE]
+        # and bitboards[BLACK] hold the occupancy of each side.
+        self.bitboards: List[int] = [0] * 24
+        
+        # UndoInfo records reused by make_move, one per level of nesting;
+        # _undo_ply is the number of moves made and not yet unmade
+        self._undo_stack: List[UndoInfo] = []
+        self._undo_ply = 0
+        
         if fen is None:
             fen = self.STARTING_FEN
         self._parse_fen(fen)
@@ -196,6 +273,19 @@ class Board:
                 self.squares[sq] = FEN_TO_PIECE.get(char, EMPTY)
                 file += 1
         
+        self.big_pieces = {WHITE: 0, BLACK: 0}
+        for piece in self.squares:
+            if KNIGHT <= (piece & PIECE_MASK) <= QUEEN:
+                self.big_pieces[piece & COLOR_MASK] += 1
+        self.king_squares = {WHITE: self.squares.find(WHITE_KING),
+                             BLACK: self.squares.find(BLACK_KING)}
+        
+        self.bitboards = [0] * 24
+        for sq, piece in enumerate(self.squares):
+            if piece != EMPTY:
+                self.bitboards[piece] |= 1 << sq
+                self.bitboards[piece & COLOR_MASK] |= 1 << sq
+        
         # Parse active color
         self.white_to_move = parts[1] == 'w' if len(parts) > 1 else True
         
@@ -218,8 +308,8 @@ class Board:
         # Parse fullmove number
         self.fullmove_number = int(parts[5]) if len(parts) > 5 else 1
         
-        # Initialize position history
-        self.position_history = [self._compute_hash()]
+        # Position history is filled in by whoever tracks Zobrist keys
+        self.position_history = []
     
     def to_fen(self) -> str:
         """Generate FEN string from current board state."""
@@ -267,42 +357,60 @@ class Board:
         
         return ' '.join(fen_parts)
     
-    def _compute_hash(self) -> int:
-        """Compute a hash of the current position for repetition detection."""
-        # Simple hash based on board state and game state
-        h = hash(tuple(self.squares))
-        h ^= hash((self.white_to_move, self.castling_rights, self.en_passant_square))
-        return h
-    
     def make_move(self, move: Move) -> UndoInfo:
         """
         Execute a move on the board.
         
-        Returns UndoInfo for undoing the move later.
+        Returns UndoInfo for undoing the move later. The record is owned
+        by the board and reused once the move has been unmade, so callers
+        must not keep it past the matching unmake_move.
         """
-        from_sq = move.from_sq
-        to_sq = move.to_sq
+        from_sq = move & MOVE_SQUARE_MASK
+        to_sq = (move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK
+        promotion = (move >> MOVE_PROMOTION_SHIFT) & PIECE_MASK
+        is_en_passant = move & MOVE_EN_PASSANT
         piece = self.squares[from_sq]
         captured = self.squares[to_sq]
         
-        # Save undo information
-        undo = UndoInfo(
-            captured_piece=captured if not move.is_en_passant else (BLACK_PAWN if self.white_to_move else WHITE_PAWN),
-            castling_rights=self.castling_rights,
-            en_passant_square=self.en_passant_square,
-            halfmove_clock=self.halfmove_clock,
-            moved_piece=piece
-        )
+        # Save undo information into the record for this ply
+        ply = self._undo_ply
+        stack = self._undo_stack
+        if ply < len(stack):
+            undo = stack[ply]
+            undo.captured_piece = captured if not is_en_passant else (BLACK_PAWN if self.white_to_move else WHITE_PAWN)
+            undo.castling_rights = self.castling_rights
+            undo.en_passant_square = self.en_passant_square
+            undo.halfmove_clock = self.halfmove_clock
+            undo.moved_piece = piece
+        else:
+            undo = UndoInfo(
+                captured_piece=captured if not is_en_passant else (BLACK_PAWN if self.white_to_move else WHITE_PAWN),
+                castling_rights=self.castling_rights,
+                en_passant_square=self.en_passant_square,
+                halfmove_clock=self.halfmove_clock,
+                moved_piece=piece
+            )
+            stack.append(undo)
+        self._undo_ply = ply + 1
+        
+        if captured != EMPTY or promotion or is_en_passant:
+            self._endgame_dirty = True
+            if KNIGHT <= (captured & PIECE_MASK) <= QUEEN:
+                self.big_pieces[captured & COLOR_MASK] -= 1
+            elif captured & PIECE_MASK == KING:
+                self.king_squares[captured & COLOR_MASK] = -1
+            if promotion:
+                self.big_pieces[piece & COLOR_MASK] += 1
         
         # Update halfmove clock
-        piece_type = get_piece_type(piece)
+        piece_type = piece & PIECE_MASK
         if piece_type == PAWN or captured != EMPTY:
             self.halfmove_clock = 0
         else:
             self.halfmove_clock += 1
         
         # Handle en passant capture
-        if move.is_en_passant:
+        if is_en_passant:
             # Remove the captured pawn
             if self.white_to_move:
                 self.squares[to_sq - 8] = EMPTY
@@ -310,7 +418,7 @@ class Board:
                 self.squares[to_sq + 8] = EMPTY
         
         # Handle castling
-        if move.is_castling:
+        if move & MOVE_CASTLING:
             # Move the rook
             if to_sq == 6:  # White kingside (g1)
                 self.squares[7] = EMPTY  # h1
@@ -330,12 +438,15 @@ class Board:
         self.squares[from_sq] = EMPTY
         
         # Handle promotion
-        if move.promotion:
-            self.squares[to_sq] = (WHITE if self.white_to_move else BLACK) | move.promotion
+        if promotion:
+            self.squares[to_sq] = (WHITE if self.white_to_move else BLACK) | promotion
+        
+        self._update_bitboards(move, piece, undo.captured_piece)
         
         # Update castling rights
         # If king moves, remove both castling rights for that side
         if piece_type == KING:
+            self.king_squares[piece & COLOR_MASK] = to_sq
             if self.white_to_move:
                 self.castling_rights &= ~(self.CASTLE_WK | self.CASTLE_WQ)
             else:
@@ -365,24 +476,36 @@ class Board:
         # Switch side to move
         self.white_to_move = not self.white_to_move
         
-        # Update position history
-        self.position_history.append(self._compute_hash())
-        
         return undo
     
     def unmake_move(self, move: Move, undo: UndoInfo) -> None:
         """Undo a move using saved UndoInfo."""
         # Switch side back
         self.white_to_move = not self.white_to_move
-        
-        from_sq = move.from_sq
-        to_sq = move.to_sq
+        if self._undo_ply:
+            self._undo_ply -= 1
+        
+        from_sq = move & MOVE_SQUARE_MASK
+        to_sq = (move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK
+        promotion = (move >> MOVE_PROMOTION_SHIFT) & PIECE_MASK
+        
+        captured = undo.captured_piece
+        if captured != EMPTY or promotion:
+            self._endgame_dirty = True
+            if KNIGHT <= (captured & PIECE_MASK) <= QUEEN:
+                self.big_pieces[captured & COLOR_MASK] += 1
+            elif captured & PIECE_MASK == KING:
+                self.king_squares[captured & COLOR_MASK] = to_sq
+            if promotion:
+                self.big_pieces[undo.moved_piece & COLOR_MASK] -= 1
         
         # Restore the moved piece
         self.squares[from_sq] = undo.moved_piece
+        if undo.moved_piece & PIECE_MASK == KING:
+            self.king_squares[undo.moved_piece & COLOR_MASK] = from_sq
         
         # Restore captured piece (or empty square)
-        if move.is_en_passant:
+        if move & MOVE_EN_PASSANT:
             self.squares[to_sq] = EMPTY
             # Restore the captured pawn
             if self.white_to_move:
@@ -393,7 +516,7 @@ class Board:
             self.squares[to_sq] = undo.captured_piece
         
         # Handle castling - move rook back
-        if move.is_castling:
+        if move & MOVE_CASTLING:
             if to_sq == 6:  # White kingside
                 self.squares[5] = EMPTY
                 self.squares[7] = WHITE_ROOK
@@ -407,6 +530,8 @@ class Board:
                 self.squares[59] = EMPTY
                 self.squares[56] = BLACK_ROOK
         
+        self._update_bitboards(move, undo.moved_piece, captured)
+        
         # Restore game state
         self.castling_rights = undo.castling_rights
         self.en_passant_square = undo.en_passant_square
@@ -415,18 +540,40 @@ class Board:
         # Update fullmove number
         if not self.white_to_move:
             self.fullmove_number -= 1
-        
-        # Remove last position from history
-        if self.position_history:
-            self.position_history.pop()
+    
+    def _update_bitboards(self, move: Move, piece: int, captured: int) -> None:
+        """
+        Apply the bitboard side of a move. Every change is an XOR, so the
+        same call made again with the same arguments takes it back.
+        """
+        bitboards = self.bitboards
+        from_sq = move & MOVE_SQUARE_MASK
+        to_sq = (move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK
+        from_bit = 1 << from_sq
+        to_bit = 1 << to_sq
+        color = piece & COLOR_MASK
+        
+        bitboards[color] ^= from_bit | to_bit
+        promotion = (move >> MOVE_PROMOTION_SHIFT) & PIECE_MASK
+        if promotion:
+            bitboards[piece] ^= from_bit
+            bitboards[color | promotion] ^= to_bit
+        else:
+            bitboards[piece] ^= from_bit | to_bit
+        
+        if captured != EMPTY:
+            if move & MOVE_EN_PASSANT:
+                to_bit = 1 << (to_sq - 8 if color == WHITE else to_sq + 8)
+            bitboards[captured] ^= to_bit
+            bitboards[captured & COLOR_MASK] ^= to_bit
+        elif move & MOVE_CASTLING:
+            rook_bits = CASTLING_ROOK_BITS[to_sq]
+            bitboards[color | ROOK] ^= rook_bits
+            bitboards[color] ^= rook_bits
     
     def find_king(self, white: bool) -> int:
-        """Find the king's square for the specified color."""
-        king = WHITE_KING if white else BLACK_KING
-        for sq in range(64):
-            if self.squares[sq] == king:
-                return sq
-        return -1  # Should never happen in valid position
+        """Find the king's square for the specified color (-1 if absent)."""
+        return self.king_squares[WHITE if white else BLACK]
     
     def is_repetition(self) -> bool:
         """Check if current position has occurred 3 times (draw by repetition)."""
@@ -439,54 +586,66 @@ class Board:
         Count how many times the current position has occurred.
         Useful for detecting approaching draws (2 repetitions = danger).
         """
-        if len(self.position_history) < 1:
+        history = self.position_history
+        if len(history) < 1:
             return 1
-        current_hash = self.position_history[-1]
-        return sum(1 for h in self.position_history if h == current_hash)
+        # Nothing before the last capture or pawn move can repeat, so only
+        # the last halfmove_clock + 1 positions need to be looked at
+        return history[-(self.halfmove_clock + 1):].count(history[-1])
     
     def is_fifty_moves(self) -> bool:
         """Check if 50-move rule applies (draw)."""
         return self.halfmove_clock >= 100  # 100 half-moves = 50 full moves
     
+    def is_endgame(self) -> bool:
+        """
+        Determine if the position is an endgame: both sides have at most
+        1300 centipawns of material besides the king.
+        
+        The result is cached and recomputed only after a capture or
+        promotion has changed the material balance.
+        """
+        if self._endgame_dirty:
+            bitboards = self.bitboards
+            white_material = 0
+            black_material = 0
+            for piece_type in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN):
+                value = PIECE_VALUES[piece_type]
+                white_material += value * bin(bitboards[WHITE | piece_type]).count('1')
+                black_material += value * bin(bitboards[BLACK | piece_type]).count('1')
+            self._endgame = white_material <= 1300 and black_material <= 1300
+            self._endgame_dirty = False
+        return self._endgame
+    
     def has_insufficient_material(self) -> bool:
         """
         Check for insufficient material to checkmate.
         
         Draws: K vs K, K+B vs K, K+N vs K, K+B vs K+B (same color bishops)
         """
-        pieces = []
-        for sq in range(64):
-            piece = self.squares[sq]
-            if piece != EMPTY:
-                pieces.append((get_piece_type(piece), get_piece_color(piece), sq))
-        
-        # Count pieces by type
-        piece_counts = {}
-        for ptype, color, sq in pieces:
-            key = (ptype, color)
-            piece_counts[key] = piece_counts.get(key, 0) + 1
+        # Popcounts and tests on the piece bitboards; almost every call
+        # returns at the first test
+        bitboards = self.bitboards
+        num_pieces = bin(bitboards[WHITE] | bitboards[BLACK]).count('1')
         
         # Only kings left
-        if len(pieces) == 2:
+        if num_pieces == 2:
             return True
+        if num_pieces > 4:
+            return False
+        
+        white_bishops = bitboards[WHITE_BISHOP]
+        black_bishops = bitboards[BLACK_BISHOP]
         
         # King and minor piece vs King
-        if len(pieces) == 3:
-            for ptype, color, sq in pieces:
-                if ptype in (KNIGHT, BISHOP):
-                    return True
+        if num_pieces == 3:
+            return bool(bitboards[WHITE_KNIGHT] | bitboards[BLACK_KNIGHT] |
+                        white_bishops | black_bishops)
         
         # King + Bishop vs King + Bishop (same color squares)
-        if len(pieces) == 4:
-            bishops = [(sq, color) for ptype, color, sq in pieces if ptype == BISHOP]
-            if len(bishops) == 2:
-                # Check if bishops are on same color squares
-                sq1, c1 = bishops[0]
-                sq2, c2 = bishops[1]
-                sq1_color = (sq1 // 8 + sq1 % 8) % 2
-                sq2_color = (sq2 // 8 + sq2 % 8) % 2
-                if sq1_color == sq2_color and c1 != c2:
-                    return True
+        if white_bishops and black_bishops:
+            return (SQ_COLOR[white_bishops.bit_length() - 1] ==
+                    SQ_COLOR[black_bishops.bit_length() - 1])
         
         return False
     
@@ -500,6 +659,13 @@ class Board:
         new_board.halfmove_clock = self.halfmove_clock
         new_board.fullmove_number = self.fullmove_number
         new_board.position_history = self.position_history.copy()
+        new_board._endgame = self._endgame
+        new_board._endgame_dirty = self._endgame_dirty
+        new_board.big_pieces = self.big_pieces.copy()
+        new_board.king_squares = self.king_squares.copy()
+        new_board.bitboards = self.bitboards.copy()
+        new_board._undo_stack = []
+        new_board._undo_ply = 0
         return new_board
     
     def __str__(self) -> str:
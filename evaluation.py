@@ -15,23 +15,22 @@ The evaluation considers:
 
 from board import (
     Board, EMPTY, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING,
-    WHITE, BLACK, get_piece_type, get_piece_color,
+    WHITE, BLACK, PIECE_MASK, COLOR_MASK,
     WHITE_PAWN, BLACK_PAWN, WHITE_ROOK, BLACK_ROOK,
-    WHITE_BISHOP, BLACK_BISHOP, WHITE_QUEEN, BLACK_QUEEN
+    WHITE_BISHOP, BLACK_BISHOP, WHITE_QUEEN, BLACK_QUEEN,
+    MOVE_SQUARE_MASK, MOVE_TO_SHIFT, MOVE_PROMOTION_SHIFT, MOVE_CASTLING, MOVE_EN_PASSANT,
+    PIECE_VALUES
 )
 
-# ============================================================================
-# PIECE VALUES
-# ============================================================================
-
-PIECE_VALUES = {
-    PAWN: 100,
-    KNIGHT: 320,
-    BISHOP: 330,
-    ROOK: 500,
-    QUEEN: 900,
-    KING: 20000
-}
+# MVV-LVA capture scores indexed by (victim_type << 3) | attacker_type.
+# Each entry already includes the 10000 capture bonus used by evaluate_move.
+MVV_LVA = [0] * 64
+for _victim in range(1, 7):
+    for _attacker in range(1, 7):
+        MVV_LVA[(_victim << 3) | _attacker] = (
+            10000 + PIECE_VALUES[_victim] - PIECE_VALUES[_attacker] // 100
+        )
+del _victim, _attacker
 
 # ============================================================================
 # PIECE-SQUARE TABLES
@@ -159,6 +158,19 @@ BISHOP_MOBILITY_BONUS = 5
 ROOK_MOBILITY_BONUS = 3
 QUEEN_MOBILITY_BONUS = 2
 
+MOBILITY_BONUS = {
+    KNIGHT: KNIGHT_MOBILITY_BONUS,
+    BISHOP: BISHOP_MOBILITY_BONUS,
+    ROOK: ROOK_MOBILITY_BONUS,
+    QUEEN: QUEEN_MOBILITY_BONUS,
+}
+
+# Move offsets used by count_mobility
+KNIGHT_OFFSETS = (17, 15, 10, 6, -6, -10, -15, -17)
+BISHOP_DIRECTIONS = (7, 9, -7, -9)
+ROOK_DIRECTIONS = (8, -8, 1, -1)
+QUEEN_DIRECTIONS = (8, -8, 1, -1, 7, 9, -7, -9)
+
 # Center control
 CENTER_SQUARES = [27, 28, 35, 36]  # d4, e4, d5, e5
 EXTENDED_CENTER = [18, 19, 20, 21, 26, 29, 34, 37, 42, 43, 44, 45]
@@ -191,6 +203,17 @@ def get_pst_value(piece_type: int, sq: int, is_white: bool, is_endgame: bool = F
     return pst[index]
 
 
+# Middlegame PST value of every piece code on every square, indexed by
+# (piece << 6) | sq, for cheap quiet-move scoring in evaluate_move
+MOVE_PST = [0] * (32 << 6)
+for _color in (WHITE, BLACK):
+    for _piece_type in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+        for _sq in range(64):
+            MOVE_PST[(_color | _piece_type) << 6 | _sq] = get_pst_value(
+                _piece_type, _sq, _color == WHITE)
+del _color, _piece_type, _sq
+
+
 def count_material(board: Board) -> tuple:
     """Count material for both sides (excluding kings)."""
     white_material = 0
@@ -201,13 +224,13 @@ def count_material(board: Board) -> tuple:
         if piece == EMPTY:
             continue
         
-        piece_type = get_piece_type(piece)
+        piece_type = piece & PIECE_MASK
         if piece_type == KING:
             continue
         
         value = PIECE_VALUES.get(piece_type, 0)
         
-        if get_piece_color(piece) == WHITE:
+        if piece & WHITE:
             white_material += value
         else:
             black_material += value
@@ -216,9 +239,12 @@ def count_material(board: Board) -> tuple:
 
 
 def is_endgame(board: Board) -> bool:
-    """Determine if the position is an endgame."""
-    white_material, black_material = count_material(board)
-    return white_material <= 1300 and black_material <= 1300
+    """
+    Determine if the position is an endgame.
+    
+    See Board.is_endgame(), which caches the result.
+    """
+    return board.is_endgame()
 
 
 def get_pawn_files(board: Board) -> tuple:
@@ -469,8 +495,8 @@ def evaluate_pieces(board: Board, white_pawns: list, black_pawns: list) -> int:
         if piece == EMPTY:
             continue
         
-        piece_type = get_piece_type(piece)
-        is_white = get_piece_color(piece) == WHITE
+        piece_type = piece & PIECE_MASK
+        is_white = bool(piece & WHITE)
         file = sq % 8
         rank = sq // 8
         
@@ -554,8 +580,7 @@ def count_mobility(board: Board, sq: int, piece_type: int, is_white: bool) -> in
     color = WHITE if is_white else BLACK
     
     if piece_type == KNIGHT:
-        offsets = [17, 15, 10, 6, -6, -10, -15, -17]
-        for offset in offsets:
+        for offset in KNIGHT_OFFSETS:
             to_sq = sq + offset
             if to_sq < 0 or to_sq >= 64:
                 continue
@@ -563,12 +588,11 @@ def count_mobility(board: Board, sq: int, piece_type: int, is_white: bool) -> in
             if abs(to_file - file) > 2:
                 continue
             target = board.squares[to_sq]
-            if target == EMPTY or get_piece_color(target) != color:
+            if target == EMPTY or not (target & color):
                 moves += 1
     
     elif piece_type == BISHOP:
-        directions = [7, 9, -7, -9]
-        for d in directions:
+        for d in BISHOP_DIRECTIONS:
             current = sq
             while True:
                 curr_file = current % 8
@@ -583,13 +607,12 @@ def count_mobility(board: Board, sq: int, piece_type: int, is_white: bool) -> in
                     moves += 1
                     current = next_sq
                 else:
-                    if get_piece_color(target) != color:
+                    if not (target & color):
                         moves += 1
                     break
     
     elif piece_type == ROOK:
-        directions = [8, -8, 1, -1]
-        for d in directions:
+        for d in ROOK_DIRECTIONS:
             current = sq
             while True:
                 curr_file = current % 8
@@ -604,13 +627,12 @@ def count_mobility(board: Board, sq: int, piece_type: int, is_white: bool) -> in
                     moves += 1
                     current = next_sq
                 else:
-                    if get_piece_color(target) != color:
+                    if not (target & color):
                         moves += 1
                     break
     
     elif piece_type == QUEEN:
-        directions = [8, -8, 1, -1, 7, 9, -7, -9]
-        for d in directions:
+        for d in QUEEN_DIRECTIONS:
             current = sq
             while True:
                 curr_file = current % 8
@@ -626,7 +648,7 @@ def count_mobility(board: Board, sq: int, piece_type: int, is_white: bool) -> in
                     moves += 1
                     current = next_sq
                 else:
-                    if get_piece_color(target) != color:
+                    if not (target & color):
                         moves += 1
                     break
     
@@ -636,24 +658,18 @@ def count_mobility(board: Board, sq: int, piece_type: int, is_white: bool) -> in
 def evaluate_mobility(board: Board) -> int:
     """Evaluate piece mobility for both sides."""
     score = 0
-    
-    mobility_bonus = {
-        KNIGHT: KNIGHT_MOBILITY_BONUS,
-        BISHOP: BISHOP_MOBILITY_BONUS,
-        ROOK: ROOK_MOBILITY_BONUS,
-        QUEEN: QUEEN_MOBILITY_BONUS,
-    }
+    mobility_bonus = MOBILITY_BONUS
     
     for sq in range(64):
         piece = board.squares[sq]
         if piece == EMPTY:
             continue
         
-        piece_type = get_piece_type(piece)
+        piece_type = piece & PIECE_MASK
         if piece_type not in mobility_bonus:
             continue
         
-        is_white = get_piece_color(piece) == WHITE
+        is_white = bool(piece & WHITE)
         moves = count_mobility(board, sq, piece_type, is_white)
         bonus = moves * mobility_bonus[piece_type]
         
@@ -675,16 +691,16 @@ def evaluate_center_control(board: Board) -> int:
     
     for sq in CENTER_SQUARES:
         piece = board.squares[sq]
-        if piece != EMPTY and get_piece_type(piece) == PAWN:
-            if get_piece_color(piece) == WHITE:
+        if piece & PIECE_MASK == PAWN:
+            if piece & WHITE:
                 score += CENTER_PAWN_BONUS
             else:
                 score -= CENTER_PAWN_BONUS
     
     for sq in EXTENDED_CENTER:
         piece = board.squares[sq]
-        if piece != EMPTY and get_piece_type(piece) == PAWN:
-            if get_piece_color(piece) == WHITE:
+        if piece & PIECE_MASK == PAWN:
+            if piece & WHITE:
                 score += EXTENDED_CENTER_PAWN_BONUS
             else:
                 score -= EXTENDED_CENTER_PAWN_BONUS
@@ -737,8 +753,8 @@ def get_piece_positions(board: Board) -> dict:
     for sq in range(64):
         piece = board.squares[sq]
         if piece != EMPTY:
-            pt = get_piece_type(piece)
-            color = get_piece_color(piece)
+            pt = piece & PIECE_MASK
+            color = piece & COLOR_MASK
             pieces[pt].append((sq, color))
     
     return pieces
@@ -1126,7 +1142,7 @@ def evaluate(board: Board) -> int:
             endgame_score = -endgame_score
         return endgame_score
     
-    endgame = is_endgame(board)
+    endgame = board.is_endgame()
     
     # Get pawn positions once for reuse
     white_pawns, black_pawns = get_pawn_files(board)
@@ -1140,11 +1156,9 @@ def evaluate(board: Board) -> int:
         if piece == EMPTY:
             continue
         
-        piece_type = get_piece_type(piece)
-        piece_color = get_piece_color(piece)
-        
+        piece_type = piece & PIECE_MASK
+        is_white_piece = bool(piece & WHITE)
         material = PIECE_VALUES.get(piece_type, 0)
-        is_white_piece = piece_color == WHITE
         position = get_pst_value(piece_type, sq, is_white_piece, endgame)
         
         if is_white_piece:
@@ -1188,36 +1202,33 @@ def evaluate_move(board: Board, move) -> int:
     
     This is used to order moves before searching, without actually
     making the move. Higher values = likely better moves.
-    """
-    score = 0
     
-    from_piece = board.squares[move.from_sq]
-    to_piece = board.squares[move.to_sq]
+    Captures, promotions and castling are ranked by their tactical value
+    alone; only quiet moves are told apart by the PST improvement.
+    """
+    from_sq = move & MOVE_SQUARE_MASK
+    to_sq = (move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK
+    from_piece = board.squares[from_sq]
+    to_piece = board.squares[to_sq]
+    promotion = (move >> MOVE_PROMOTION_SHIFT) & PIECE_MASK
     
     # Captures: MVV-LVA (Most Valuable Victim - Least Valuable Attacker)
     if to_piece != EMPTY:
-        victim_value = PIECE_VALUES.get(get_piece_type(to_piece), 0)
-        attacker_value = PIECE_VALUES.get(get_piece_type(from_piece), 0)
-        score += 10000 + victim_value - attacker_value // 100
+        score = MVV_LVA[((to_piece & PIECE_MASK) << 3) | (from_piece & PIECE_MASK)]
+        if promotion:
+            return score + 9000 + PIECE_VALUES[promotion]
+        return score
     
-    # En passant capture
-    if move.is_en_passant:
-        score += 10000 + PIECE_VALUES[PAWN]
+    if move & MOVE_EN_PASSANT:
+        return 10000 + PIECE_VALUES[PAWN]
     
-    # Promotions
-    if move.promotion:
-        score += 9000 + PIECE_VALUES.get(move.promotion, 0)
+    if promotion:
+        return 9000 + PIECE_VALUES[promotion]
     
     # Castling is generally good
-    if move.is_castling:
-        score += 500
-    
-    # PST improvement (rough estimate)
-    piece_type = get_piece_type(from_piece)
-    is_white_piece = get_piece_color(from_piece) == WHITE
+    if move & MOVE_CASTLING:
+        return 500
     
-    from_pst = get_pst_value(piece_type, move.from_sq, is_white_piece)
-    to_pst = get_pst_value(piece_type, move.to_sq, is_white_piece)
-    score += to_pst - from_pst
-    
-    return score
+    # Quiet move: PST improvement (rough estimate)
+    base = from_piece << 6
+    return MOVE_PST[base | to_sq] - MOVE_PST[base | from_sq]
@@ -8,17 +8,236 @@ all special moves (castling, en passant, pawn promotion).
 from typing import List, Tuple
 from board import (
     Board, Move, EMPTY, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING,
-    WHITE, BLACK, get_piece_type, get_piece_color, is_white, is_black,
-    WHITE_KING, BLACK_KING
+    WHITE, BLACK, COLOR_MASK, PIECE_MASK, 
+    WHITE_KING, BLACK_KING, MOVE_SQUARE_MASK,
+    MOVE_TO_SHIFT, MOVE_PROMOTION_SHIFT, MOVE_CASTLING, MOVE_EN_PASSANT,
+    FILE_OF
 )
 
 
+def _leaper_attacks(offsets: Tuple[int, ...], max_file_diff: int) -> Tuple[int, ...]:
+    """Attack bitboard of a single-step piece for every square."""
+    table = []
+    for sq in range(64):
+        attacks = 0
+        for offset in offsets:
+            to_sq = sq + offset
+            if 0 <= to_sq < 64 and abs(FILE_OF[to_sq] - FILE_OF[sq]) <= max_file_diff:
+                attacks |= 1 << to_sq
+        table.append(attacks)
+    return tuple(table)
+
+
+# Attack bitboards by square. PAWN_ATTACKS[color][sq] holds the squares a
+# pawn of that color on sq attacks, which are also the squares from which
+# an enemy pawn would attack sq.
+KNIGHT_ATTACKS = _leaper_attacks((17, 15, 10, 6, -6, -10, -15, -17), 2)
+KING_ATTACKS = _leaper_attacks((8, -8, -1, 1, 7, 9, -7, -9), 1)
+PAWN_ATTACKS = {WHITE: _leaper_attacks((7, 9), 1), BLACK: _leaper_attacks((-9, -7), 1)}
+
+
+def _rays(directions: Tuple[int, ...]) -> Tuple[Tuple[Tuple[int, ...], ...], ...]:
+    """
+    For every square, the squares along each direction up to the board
+    edge, nearest first.
+    """
+    table = []
+    for sq in range(64):
+        rays = []
+        for direction in directions:
+            ray = []
+            current_sq = sq
+            while True:
+                next_sq = current_sq + direction
+                # A step off the side of the board wraps to the far file
+                if next_sq < 0 or next_sq >= 64 or abs(FILE_OF[next_sq] - FILE_OF[current_sq]) > 1:
+                    break
+                ray.append(next_sq)
+                current_sq = next_sq
+            rays.append(tuple(ray))
+        table.append(tuple(rays))
+    return tuple(table)
+
+
+# Rays by square, in the order of MoveGenerator.ROOK_DIRECTIONS and
+# BISHOP_DIRECTIONS
+ROOK_RAYS = _rays((8, -8, -1, 1))
+BISHOP_RAYS = _rays((7, 9, -7, -9))
+
+BB_FULL = (1 << 64) - 1
+
+# File and rank masks for the bulk pawn shifts
+FILE_A = 0x0101010101010101
+FILE_H = 0x8080808080808080
+RANK_1 = 0xFF
+RANK_3 = 0xFF << 16
+RANK_6 = 0xFF << 40
+RANK_8 = 0xFF << 56
+
+# Magic bitboards for sliding attacks. For each square, the blockers that
+# can matter (the rays without their last square) are multiplied by the
+# square's magic number; the top bits of the 64-bit product index a table
+# that holds the attack set for that blocker pattern. The magic numbers
+# were found offline by random search (sparse random 64-bit candidates,
+# kept once no two blocker patterns with different attacks collide).
+ROOK_MAGICS = (
+    0x128012C0008000E0, 0x0240002000401001, 0x4100200041001008, 0x8280100008018004,
+    0x2080080002040080, 0x1300010004008208, 0x04000208A9101408, 0x020000204A018F04,
+    0x1080800040008020, 0x0000C01000402001, 0x0080808010002000, 0x0408800800801000,
+    0x0010800801040080, 0x4804800400804200, 0x0304800D00800200, 0x010200040081006A,
+    0x8280044020084000, 0x042000C010004021, 0x2010002004080020, 0x0040210010000900,
+    0x0008004004020041, 0x0004008080040200, 0x1C20040070610208, 0x1020A20000508104,
+    0x0100C00380008120, 0x4001200280400080, 0x0200100080200080, 0x0000401200082200,
+    0xC02C080080040080, 0x0840040080020080, 0x2102004040800100, 0x0042079A00004104,
+    0x0000400424800280, 0x4820100020400040, 0x5010002000801880, 0x9061080081801002,
+    0x208A050011000800, 0x000200080E003094, 0xA010018204003008, 0x2000288042001401,
+    0x400181C000228000, 0x0200402010004000, 0x8388928600420021, 0x400021001001000A,
+    0x2100080011010004, 0x1002020004008080, 0x0802000804020001, 0x88004410408A0001,
+    0x010508C030800100, 0x4000400080310100, 0x0030200010048080, 0x2000800800100080,
+    0x0100040008008080, 0x0022000204008080, 0x0108020170284400, 0x1001010084004200,
+    0x0004890141902202, 0x0100881100220042, 0x0100102001000841, 0x4408050020081001,
+    0x0002008884201002, 0x2002000490410802, 0x0020014800900204, 0x0100082081044402,
+)
+BISHOP_MAGICS = (
+    0x0010104088840042, 0x0110104081004062, 0x0091142082000100, 0x0108208821008100,
+    0x0101104000080000, 0x010104200404001C, 0x0C01040202C00010, 0x0001004800841080,
+    0xCA8B46100E280102, 0x001010D00085024C, 0x4180089881020120, 0x8010082050411000,
+    0x0800020210100000, 0x0002120905201200, 0xC000040404040510, 0x0110410101100200,
+    0x0042201408020C27, 0xA882000404440C20, 0x0002000102040100, 0x800200202202C200,
+    0x4002005012101401, 0x2441014880600200, 0x0214020104018400, 0x000180004414410A,
+    0x0105410C10020800, 0x0004200084013400, 0x200582045004001B, 0x1000404004010200,
+    0x0001001081004021, 0x2400430202008628, 0x000604C144230800, 0x04004840008A1804,
+    0x4010045000220210, 0x2012100400500120, 0x10001C0205900081, 0x0020880800360A00,
+    0x8500460020060080, 0x0420008209010110, 0x0010020250008C00, 0x8010A40100004104,
+    0x00008208400022C8, 0x0008410450402100, 0x0008920110004104, 0x43A8011044002024,
+    0x0029102021900602, 0x2270101000212040, 0x0020C41112004040, 0x3004840550C42200,
+    0x5002022202404480, 0x0402822309200840, 0x0032010423240048, 0x2000CA0384110008,
+    0x4001140410440000, 0x2092E50810011010, 0x0140040852005041, 0x00200200C1010104,
+    0x40120202020104E0, 0xA000010042300500, 0x400048004A009001, 0x4200800400411081,
+    0x0010040604105400, 0x0107004210024080, 0x0004423004210040, 0xC220023088010040,
+)
+
+
+def _magic_tables(rays: Tuple[Tuple[Tuple[int, ...], ...], ...],
+                  magics: Tuple[int, ...]):
+    """Build blocker masks, shifts and attack tables from rays and magics."""
+    masks = []
+    shifts = []
+    tables = []
+    for sq in range(64):
+        mask = 0
+        for ray in rays[sq]:
+            for ray_sq in ray[:-1]:
+                mask |= 1 << ray_sq
+        shift = 64 - bin(mask).count('1')
+        table = [0] * (1 << (64 - shift))
+        
+        # Enumerate every subset of the mask (carry-rippler)
+        blockers = 0
+        while True:
+            attacks = 0
+            for ray in rays[sq]:
+                for ray_sq in ray:
+                    attacks |= 1 << ray_sq
+                    if blockers >> ray_sq & 1:
+                        break
+            table[(blockers * magics[sq] & BB_FULL) >> shift] = attacks
+            blockers = (blockers - mask) & mask
+            if not blockers:
+                break
+        
+        masks.append(mask)
+        shifts.append(shift)
+        tables.append(table)
+    return tuple(masks), tuple(shifts), tuple(tables)
+
+
+ROOK_MASKS, ROOK_SHIFTS, ROOK_TABLES = _magic_tables(ROOK_RAYS, ROOK_MAGICS)
+BISHOP_MASKS, BISHOP_SHIFTS, BISHOP_TABLES = _magic_tables(BISHOP_RAYS, BISHOP_MAGICS)
+
+
+def rook_attacks(sq: int, occupancy: int) -> int:
+    """Squares a rook on sq attacks, given all occupied squares."""
+    return ROOK_TABLES[sq][((occupancy & ROOK_MASKS[sq]) * ROOK_MAGICS[sq] & BB_FULL)
+                           >> ROOK_SHIFTS[sq]]
+
+
+def bishop_attacks(sq: int, occupancy: int) -> int:
+    """Squares a bishop on sq attacks, given all occupied squares."""
+    return BISHOP_TABLES[sq][((occupancy & BISHOP_MASKS[sq]) * BISHOP_MAGICS[sq] & BB_FULL)
+                             >> BISHOP_SHIFTS[sq]]
+
+
+def _line_tables():
+    """
+    BETWEEN[a][b]: squares strictly between two squares on a common rank,
+    file or diagonal. LINE[a][b]: the whole board line through both.
+    Both are 0 for squares that are not aligned.
+    """
+    between = [[0] * 64 for _ in range(64)]
+    line = [[0] * 64 for _ in range(64)]
+    for sq in range(64):
+        rays = ROOK_RAYS[sq] + BISHOP_RAYS[sq]
+        # Index of the opposite direction of each ray in rays
+        for index, opposite in enumerate((1, 0, 3, 2, 6, 7, 4, 5)):
+            full_line = 1 << sq
+            for ray_sq in rays[index] + rays[opposite]:
+                full_line |= 1 << ray_sq
+            passed = 0
+            for ray_sq in rays[index]:
+                between[sq][ray_sq] = passed
+                line[sq][ray_sq] = full_line
+                passed |= 1 << ray_sq
+    return tuple(map(tuple, between)), tuple(map(tuple, line))
+
+
+BETWEEN, LINE = _line_tables()
+
+
+def _add_moves(moves: List[Move], from_sq: int, targets: int) -> None:
+    """Append a move from from_sq to every square set in targets."""
+    while targets:
+        lsb = targets & -targets
+        moves.append(from_sq | (lsb.bit_length() - 1) << MOVE_TO_SHIFT)
+        targets ^= lsb
+
+
+def _add_moves_to(moves: List[Move], sources: int, move_bits: int) -> None:
+    """
+    Append a move from every square set in sources; move_bits holds the
+    rest of the move (destination and flags).
+    """
+    while sources:
+        lsb = sources & -sources
+        moves.append(lsb.bit_length() - 1 | move_bits)
+        sources ^= lsb
+
+
+def _add_pawn_moves(moves: List[Move], targets: int, offset: int, promo_rank: int) -> None:
+    """
+    Append a pawn move to every square set in targets, each coming from
+    offset squares behind it; arrivals on promo_rank promote.
+    """
+    while targets:
+        lsb = targets & -targets
+        to_sq = lsb.bit_length() - 1
+        targets ^= lsb
+        move = to_sq - offset | to_sq << MOVE_TO_SHIFT
+        if lsb & promo_rank:
+            for promo in (QUEEN, ROOK, BISHOP, KNIGHT):
+                moves.append(move | promo << MOVE_PROMOTION_SHIFT)
+        else:
+            moves.append(move)
+
+
 class MoveGenerator:
     """
     Generates all legal moves for a given position.
     
     This class generates pseudo-legal moves first, then filters out
-    moves that would leave the king in check.
+    moves that would leave the king in check. Pieces are found through the
+    board's bitboards, and knight, king and pawn moves and attacks come
+    from the precomputed attack bitboards above.
     """
     
     # Direction offsets for sliding pieces
@@ -35,7 +254,10 @@ class MoveGenerator:
     
     def __init__(self):
         """Initialize the move generator."""
-        pass
+        # Scratch list the pseudo-legal moves are generated into. It is
+        # filtered into a fresh list of legal moves before any generate_*
+        # call returns, so one buffer can serve every call.
+        self._pseudo_moves: List[Move] = []
     
     def generate_legal_moves(self, board: Board) -> List[Move]:
         """
@@ -47,205 +269,265 @@ class MoveGenerator:
         Returns:
             List of legal Move objects
         """
-        pseudo_legal = self._generate_pseudo_legal_moves(board)
-        legal_moves = []
+        return self._filter_legal(board, self._generate_pseudo_legal_moves(board))
+    
+    def generate_captures(self, board: Board) -> List[Move]:
+        """
+        Generate the legal captures and promotions for the current position.
+        
+        Used by quiescence search. Moves come out in the same relative order
+        as in generate_legal_moves, but quiet moves and castling are never
+        generated.
+        """
+        return self._filter_legal(board, self._generate_pseudo_legal_captures(board))
+    
+    def _filter_legal(self, board: Board, pseudo_legal: List[Move]) -> List[Move]:
+        """
+        Keep the pseudo-legal moves that do not leave the own king in check.
+        
+        Checkers and pinned pieces are worked out once for the position,
+        so most moves are decided with a few bit tests instead of a
+        make/unmake and an attack scan each:
+        - king moves must not land on an attacked square (castling is
+          already checked when it is generated);
+        - in check, other moves must capture the checker or block its
+          ray, and in double check only the king may move;
+        - a pinned piece must stay on the line through it and the king.
+        En passant can expose the king along the rank of both pawns, so it
+        still goes through _is_legal, as does everything in positions
+        without a king.
+        """
+        color = WHITE if board.white_to_move else BLACK
+        king_sq = board.king_squares[color]
+        if king_sq < 0:
+            return [move for move in pseudo_legal if self._is_legal(board, move)]
+        
+        enemy = color ^ COLOR_MASK
+        bitboards = board.bitboards
+        occupancy = bitboards[WHITE] | bitboards[BLACK]
+        
+        checkers = self._attackers(board, king_sq, enemy, occupancy)
+        if not checkers:
+            evasions = BB_FULL
+        elif checkers & (checkers - 1):
+            evasions = 0
+        else:
+            evasions = checkers | BETWEEN[king_sq][checkers.bit_length() - 1]
+        pinned = self._pinned(board, king_sq, color, occupancy)
+        
+        # The king must not count as a blocker for the squares it moves to
+        king_occupancy = occupancy ^ (1 << king_sq)
+        line = LINE[king_sq]
+        attackers = self._attackers
         
+        legal_moves = []
         for move in pseudo_legal:
-            if self._is_legal(board, move):
+            from_sq = move & MOVE_SQUARE_MASK
+            to_sq = (move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK
+            if from_sq == king_sq:
+                if move & MOVE_CASTLING or not attackers(board, to_sq, enemy, king_occupancy):
+                    legal_moves.append(move)
+            elif move & MOVE_EN_PASSANT:
+                if self._is_legal(board, move):
+                    legal_moves.append(move)
+            elif evasions >> to_sq & 1 and (not pinned >> from_sq & 1 or line[from_sq] >> to_sq & 1):
                 legal_moves.append(move)
         
         return legal_moves
     
+    def _attackers(self, board: Board, sq: int, attacker_color: int, occupancy: int) -> int:
+        """Bitboard of attacker_color's pieces attacking sq, given the occupancy."""
+        bitboards = board.bitboards
+        queens = bitboards[attacker_color | QUEEN]
+        return ((PAWN_ATTACKS[attacker_color ^ COLOR_MASK][sq] & bitboards[attacker_color | PAWN]) |
+                (KNIGHT_ATTACKS[sq] & bitboards[attacker_color | KNIGHT]) |
+                (KING_ATTACKS[sq] & bitboards[attacker_color | KING]) |
+                (rook_attacks(sq, occupancy) & (bitboards[attacker_color | ROOK] | queens)) |
+                (bishop_attacks(sq, occupancy) & (bitboards[attacker_color | BISHOP] | queens)))
+    
+    def _pinned(self, board: Board, king_sq: int, color: int, occupancy: int) -> int:
+        """Bitboard of color's pieces pinned to its king on king_sq."""
+        bitboards = board.bitboards
+        enemy = color ^ COLOR_MASK
+        queens = bitboards[enemy | QUEEN]
+        # Enemy sliders that would hit the king on an empty board
+        snipers = ((rook_attacks(king_sq, 0) & (bitboards[enemy | ROOK] | queens)) |
+                   (bishop_attacks(king_sq, 0) & (bitboards[enemy | BISHOP] | queens)))
+        between = BETWEEN[king_sq]
+        own = bitboards[color]
+        
+        pinned = 0
+        while snipers:
+            lsb = snipers & -snipers
+            snipers ^= lsb
+            blockers = between[lsb.bit_length() - 1] & occupancy
+            # Exactly one piece in between, and it is ours
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                pinned |= blockers
+        return pinned
+    
     def _generate_pseudo_legal_moves(self, board: Board) -> List[Move]:
         """Generate all pseudo-legal moves (may leave king in check)."""
-        moves = []
+        moves = self._pseudo_moves
+        moves.clear()
+        squares = board.squares
         color = WHITE if board.white_to_move else BLACK
         
-        for sq in range(64):
-            piece = board.squares[sq]
-            if piece == EMPTY:
-                continue
-            if get_piece_color(piece) != color:
-                continue
+        # The pieces from a1 upwards, then all pawns at once
+        own = board.bitboards[color] ^ board.bitboards[color | PAWN]
+        while own:
+            lsb = own & -own
+            sq = lsb.bit_length() - 1
+            own ^= lsb
             
-            piece_type = get_piece_type(piece)
+            piece_type = squares[sq] & PIECE_MASK
             
-            if piece_type == PAWN:
-                moves.extend(self._generate_pawn_moves(board, sq))
-            elif piece_type == KNIGHT:
-                moves.extend(self._generate_knight_moves(board, sq))
+            if piece_type == KNIGHT:
+                self._generate_knight_moves(board, sq, moves)
             elif piece_type == BISHOP:
-                moves.extend(self._generate_bishop_moves(board, sq))
+                self._generate_bishop_moves(board, sq, moves)
             elif piece_type == ROOK:
-                moves.extend(self._generate_rook_moves(board, sq))
+                self._generate_rook_moves(board, sq, moves)
             elif piece_type == QUEEN:
-                moves.extend(self._generate_queen_moves(board, sq))
+                self._generate_queen_moves(board, sq, moves)
             elif piece_type == KING:
-                moves.extend(self._generate_king_moves(board, sq))
+                self._generate_king_moves(board, sq, moves)
         
+        self._generate_pawn_moves(board, color, moves)
         return moves
     
-    def _generate_pawn_moves(self, board: Board, sq: int) -> List[Move]:
-        """Generate pawn moves from the given square."""
-        moves = []
-        color = get_piece_color(board.squares[sq])
-        is_white_pawn = color == WHITE
-        
-        # Direction of pawn movement
-        direction = 8 if is_white_pawn else -8
-        start_rank = 1 if is_white_pawn else 6
-        promo_rank = 7 if is_white_pawn else 0
-        
-        file = sq % 8
-        rank = sq // 8
-        
-        # Single push
-        to_sq = sq + direction
-        if 0 <= to_sq < 64 and board.squares[to_sq] == EMPTY:
-            if to_sq // 8 == promo_rank:
-                # Promotion
-                for promo in [QUEEN, ROOK, BISHOP, KNIGHT]:
-                    moves.append(Move(sq, to_sq, promotion=promo))
-            else:
-                moves.append(Move(sq, to_sq))
-            
-            # Double push from starting rank
-            if rank == start_rank:
-                to_sq2 = sq + 2 * direction
-                if board.squares[to_sq2] == EMPTY:
-                    moves.append(Move(sq, to_sq2))
+    def _generate_pseudo_legal_captures(self, board: Board) -> List[Move]:
+        """Generate pseudo-legal captures, en passant and promotions."""
+        moves = self._pseudo_moves
+        moves.clear()
+        squares = board.squares
+        bitboards = board.bitboards
+        color = WHITE if board.white_to_move else BLACK
+        occupancy = bitboards[WHITE] | bitboards[BLACK]
         
-        # Captures
-        capture_offsets = [direction - 1, direction + 1]  # Left and right diagonals
-        for offset in capture_offsets:
-            to_sq = sq + offset
-            to_file = to_sq % 8
-            
-            # Check if move wraps around the board
-            if abs(to_file - file) != 1:
-                continue
-            if to_sq < 0 or to_sq >= 64:
-                continue
-            
-            target = board.squares[to_sq]
+        own = bitboards[color] ^ bitboards[color | PAWN]
+        while own:
+            lsb = own & -own
+            sq = lsb.bit_length() - 1
+            own ^= lsb
             
-            # Regular capture
-            if target != EMPTY and get_piece_color(target) != color:
-                if to_sq // 8 == promo_rank:
-                    for promo in [QUEEN, ROOK, BISHOP, KNIGHT]:
-                        moves.append(Move(sq, to_sq, promotion=promo))
-                else:
-                    moves.append(Move(sq, to_sq))
+            piece_type = squares[sq] & PIECE_MASK
             
-            # En passant capture
-            if to_sq == board.en_passant_square:
-                moves.append(Move(sq, to_sq, is_en_passant=True))
+            if piece_type == KNIGHT:
+                self._generate_step_captures(board, sq, KNIGHT_ATTACKS, moves)
+            elif piece_type == KING:
+                self._generate_step_captures(board, sq, KING_ATTACKS, moves)
+            elif piece_type == BISHOP:
+                self._generate_sliding_captures(board, sq, bishop_attacks(sq, occupancy), moves)
+            elif piece_type == ROOK:
+                self._generate_sliding_captures(board, sq, rook_attacks(sq, occupancy), moves)
+            elif piece_type == QUEEN:
+                self._generate_sliding_captures(
+                    board, sq, rook_attacks(sq, occupancy) | bishop_attacks(sq, occupancy), moves)
         
+        self._generate_pawn_captures(board, color, moves)
         return moves
     
-    def _generate_knight_moves(self, board: Board, sq: int) -> List[Move]:
-        """Generate knight moves from the given square."""
-        moves = []
-        color = get_piece_color(board.squares[sq])
-        file = sq % 8
-        rank = sq // 8
-        
-        for offset in self.KNIGHT_OFFSETS:
-            to_sq = sq + offset
-            if to_sq < 0 or to_sq >= 64:
-                continue
-            
-            to_file = to_sq % 8
-            to_rank = to_sq // 8
-            
-            # Check for wraparound (knight can't jump more than 2 files)
-            if abs(to_file - file) > 2 or abs(to_rank - rank) > 2:
-                continue
-            
-            target = board.squares[to_sq]
-            if target == EMPTY or get_piece_color(target) != color:
-                moves.append(Move(sq, to_sq))
-        
-        return moves
+    def _generate_pawn_captures(self, board: Board, color: int, moves: List[Move]) -> None:
+        """Generate pawn captures, en passant and promotions (incl. pushes)."""
+        bitboards = board.bitboards
+        pawns = bitboards[color | PAWN]
+        empty = ~(bitboards[WHITE] | bitboards[BLACK]) & BB_FULL
+        
+        # Promotion by a push
+        if color == WHITE:
+            _add_pawn_moves(moves, pawns << 8 & empty & RANK_8, 8, RANK_8)
+        else:
+            _add_pawn_moves(moves, pawns >> 8 & empty & RANK_1, -8, RANK_1)
+        
+        self._add_pawn_captures(board, color, pawns, moves)
     
-    def _generate_sliding_moves(self, board: Board, sq: int, 
-                                 directions: List[int]) -> List[Move]:
-        """Generate moves for sliding pieces (bishop, rook, queen)."""
-        moves = []
-        color = get_piece_color(board.squares[sq])
-        file = sq % 8
-        
-        for direction in directions:
-            current_sq = sq
-            while True:
-                current_file = current_sq % 8
-                next_sq = current_sq + direction
-                
-                # Check bounds
-                if next_sq < 0 or next_sq >= 64:
-                    break
-                
-                next_file = next_sq % 8
-                
-                # Check for wraparound
-                file_diff = abs(next_file - current_file)
-                if direction in [-1, 1]:  # Horizontal
-                    if file_diff != 1:
-                        break
-                elif direction in [7, -9]:  # Diagonal going left
-                    if next_file != current_file - 1:
-                        break
-                elif direction in [9, -7]:  # Diagonal going right
-                    if next_file != current_file + 1:
-                        break
-                
-                target = board.squares[next_sq]
-                
-                if target == EMPTY:
-                    moves.append(Move(sq, next_sq))
-                elif get_piece_color(target) != color:
-                    moves.append(Move(sq, next_sq))
-                    break  # Can capture but not continue past
-                else:
-                    break  # Blocked by own piece
-                
-                current_sq = next_sq
+    def _add_pawn_captures(self, board: Board, color: int, pawns: int,
+                           moves: List[Move]) -> None:
+        """Append the captures, capture-promotions and en passant of all pawns."""
+        enemies = board.bitboards[color ^ COLOR_MASK]
+        if color == WHITE:
+            _add_pawn_moves(moves, (pawns & ~FILE_A) << 7 & enemies, 7, RANK_8)
+            _add_pawn_moves(moves, (pawns & ~FILE_H) << 9 & enemies, 9, RANK_8)
+        else:
+            _add_pawn_moves(moves, (pawns & ~FILE_A) >> 9 & enemies, -9, RANK_1)
+            _add_pawn_moves(moves, (pawns & ~FILE_H) >> 7 & enemies, -7, RANK_1)
+        
+        # The pawns that could capture en passant are the ones an enemy
+        # pawn on the target square would attack
+        ep_square = board.en_passant_square
+        if ep_square >= 0:
+            _add_moves_to(moves, PAWN_ATTACKS[color ^ COLOR_MASK][ep_square] & pawns,
+                          ep_square << MOVE_TO_SHIFT | MOVE_EN_PASSANT)
+    
+    def _generate_step_captures(self, board: Board, sq: int,
+                                attack_table: Tuple[int, ...], moves: List[Move]) -> None:
+        """Generate captures for knights and kings (single-step pieces)."""
+        color = board.squares[sq] & COLOR_MASK
+        _add_moves(moves, sq, attack_table[sq] & board.bitboards[color ^ COLOR_MASK])
+    
+    def _generate_sliding_captures(self, board: Board, sq: int, attacks: int,
+                                   moves: List[Move]) -> None:
+        """Generate captures for a sliding piece given its attack bitboard."""
+        color = board.squares[sq] & COLOR_MASK
+        _add_moves(moves, sq, attacks & board.bitboards[color ^ COLOR_MASK])
+    
+    def _generate_pawn_moves(self, board: Board, color: int, moves: List[Move]) -> None:
+        """Generate the moves of all the side's pawns with bitboard shifts."""
+        bitboards = board.bitboards
+        pawns = bitboards[color | PAWN]
+        empty = ~(bitboards[WHITE] | bitboards[BLACK]) & BB_FULL
+        
+        # Single pushes (promotions included) and double pushes from the
+        # starting rank through an empty square
+        if color == WHITE:
+            single = pawns << 8 & empty
+            _add_pawn_moves(moves, single, 8, RANK_8)
+            _add_pawn_moves(moves, (single & RANK_3) << 8 & empty, 16, 0)
+        else:
+            single = pawns >> 8 & empty
+            _add_pawn_moves(moves, single, -8, RANK_1)
+            _add_pawn_moves(moves, (single & RANK_6) >> 8 & empty, -16, 0)
         
-        return moves
+        # Captures
+        self._add_pawn_captures(board, color, pawns, moves)
+    
+    def _generate_knight_moves(self, board: Board, sq: int, moves: List[Move]) -> None:
+        """Generate knight moves from the given square."""
+        color = board.squares[sq] & COLOR_MASK
+        _add_moves(moves, sq, KNIGHT_ATTACKS[sq] & ~board.bitboards[color])
     
-    def _generate_bishop_moves(self, board: Board, sq: int) -> List[Move]:
+    def _generate_sliding_moves(self, board: Board, sq: int, attacks: int,
+                                moves: List[Move]) -> None:
+        """Generate moves for a sliding piece given its attack bitboard."""
+        color = board.squares[sq] & COLOR_MASK
+        _add_moves(moves, sq, attacks & ~board.bitboards[color])
+    
+    def _generate_bishop_moves(self, board: Board, sq: int, moves: List[Move]) -> None:
         """Generate bishop moves from the given square."""
-        return self._generate_sliding_moves(board, sq, self.BISHOP_DIRECTIONS)
+        bitboards = board.bitboards
+        self._generate_sliding_moves(
+            board, sq, bishop_attacks(sq, bitboards[WHITE] | bitboards[BLACK]), moves)
     
-    def _generate_rook_moves(self, board: Board, sq: int) -> List[Move]:
+    def _generate_rook_moves(self, board: Board, sq: int, moves: List[Move]) -> None:
         """Generate rook moves from the given square."""
-        return self._generate_sliding_moves(board, sq, self.ROOK_DIRECTIONS)
+        bitboards = board.bitboards
+        self._generate_sliding_moves(
+            board, sq, rook_attacks(sq, bitboards[WHITE] | bitboards[BLACK]), moves)
     
-    def _generate_queen_moves(self, board: Board, sq: int) -> List[Move]:
+    def _generate_queen_moves(self, board: Board, sq: int, moves: List[Move]) -> None:
         """Generate queen moves from the given square."""
-        return self._generate_sliding_moves(board, sq, self.QUEEN_DIRECTIONS)
+        bitboards = board.bitboards
+        occupancy = bitboards[WHITE] | bitboards[BLACK]
+        self._generate_sliding_moves(
+            board, sq, rook_attacks(sq, occupancy) | bishop_attacks(sq, occupancy), moves)
     
-    def _generate_king_moves(self, board: Board, sq: int) -> List[Move]:
+    def _generate_king_moves(self, board: Board, sq: int, moves: List[Move]) -> None:
         """Generate king moves from the given square, including castling."""
-        moves = []
-        color = get_piece_color(board.squares[sq])
-        file = sq % 8
+        color = board.squares[sq] & COLOR_MASK
         
         # Normal king moves
-        for direction in self.KING_DIRECTIONS:
-            to_sq = sq + direction
-            if to_sq < 0 or to_sq >= 64:
-                continue
-            
-            to_file = to_sq % 8
-            
-            # Check for wraparound
-            if abs(to_file - file) > 1:
-                continue
-            
-            target = board.squares[to_sq]
-            if target == EMPTY or get_piece_color(target) != color:
-                moves.append(Move(sq, to_sq))
+        _add_moves(moves, sq, KING_ATTACKS[sq] & ~board.bitboards[color])
         
         # Castling - check if king is in check and squares are not attacked by enemy
         is_white_king = color == WHITE
@@ -259,7 +541,7 @@ class MoveGenerator:
                     board.squares[6] == EMPTY and
                     not self.is_square_attacked(board, 5, False) and
                     not self.is_square_attacked(board, 6, False)):
-                    moves.append(Move(sq, 6, is_castling=True))
+                    moves.append(sq | 6 << MOVE_TO_SHIFT | MOVE_CASTLING)
                 
                 # Queenside castling (O-O-O) - white
                 if (board.castling_rights & Board.CASTLE_WQ and
@@ -268,7 +550,7 @@ class MoveGenerator:
                     board.squares[3] == EMPTY and
                     not self.is_square_attacked(board, 2, False) and
                     not self.is_square_attacked(board, 3, False)):
-                    moves.append(Move(sq, 2, is_castling=True))
+                    moves.append(sq | 2 << MOVE_TO_SHIFT | MOVE_CASTLING)
             else:
                 # Kingside castling (O-O) - black
                 if (board.castling_rights & Board.CASTLE_BK and
@@ -276,7 +558,7 @@ class MoveGenerator:
                     board.squares[62] == EMPTY and
                     not self.is_square_attacked(board, 61, True) and
                     not self.is_square_attacked(board, 62, True)):
-                    moves.append(Move(sq, 62, is_castling=True))
+                    moves.append(sq | 62 << MOVE_TO_SHIFT | MOVE_CASTLING)
                 
                 # Queenside castling (O-O-O) - black
                 if (board.castling_rights & Board.CASTLE_BQ and
@@ -285,9 +567,7 @@ class MoveGenerator:
                     board.squares[59] == EMPTY and
                     not self.is_square_attacked(board, 58, True) and
                     not self.is_square_attacked(board, 59, True)):
-                    moves.append(Move(sq, 58, is_castling=True))
-        
-        return moves
+                    moves.append(sq | 58 << MOVE_TO_SHIFT | MOVE_CASTLING)
     
     def is_square_attacked(self, board: Board, sq: int, by_white: bool) -> bool:
         """
@@ -302,95 +582,29 @@ class MoveGenerator:
             True if the square is under attack
         """
         attacker_color = WHITE if by_white else BLACK
-        file = sq % 8
-        rank = sq // 8
-        
-        # Check pawn attacks
-        pawn_direction = -8 if by_white else 8
-        pawn_attackers = [sq + pawn_direction - 1, sq + pawn_direction + 1]
-        for attacker_sq in pawn_attackers:
-            if attacker_sq < 0 or attacker_sq >= 64:
-                continue
-            att_file = attacker_sq % 8
-            if abs(att_file - file) != 1:
-                continue
-            piece = board.squares[attacker_sq]
-            if piece != EMPTY and get_piece_type(piece) == PAWN and get_piece_color(piece) == attacker_color:
-                return True
-        
-        # Check knight attacks
-        for offset in self.KNIGHT_OFFSETS:
-            attacker_sq = sq + offset
-            if attacker_sq < 0 or attacker_sq >= 64:
-                continue
-            att_file = attacker_sq % 8
-            att_rank = attacker_sq // 8
-            if abs(att_file - file) > 2 or abs(att_rank - rank) > 2:
-                continue
-            piece = board.squares[attacker_sq]
-            if piece != EMPTY and get_piece_type(piece) == KNIGHT and get_piece_color(piece) == attacker_color:
-                return True
+        bitboards = board.bitboards
         
-        # Check king attacks
-        for direction in self.KING_DIRECTIONS:
-            attacker_sq = sq + direction
-            if attacker_sq < 0 or attacker_sq >= 64:
-                continue
-            att_file = attacker_sq % 8
-            if abs(att_file - file) > 1:
-                continue
-            piece = board.squares[attacker_sq]
-            if piece != EMPTY and get_piece_type(piece) == KING and get_piece_color(piece) == attacker_color:
-                return True
+        # Pawn, knight and king attacks: intersect the attack pattern seen
+        # from sq with the attacker's pieces of that type
+        if (PAWN_ATTACKS[attacker_color ^ COLOR_MASK][sq] & bitboards[attacker_color | PAWN] or
+                KNIGHT_ATTACKS[sq] & bitboards[attacker_color | KNIGHT] or
+                KING_ATTACKS[sq] & bitboards[attacker_color | KING]):
+            return True
         
-        # Check sliding piece attacks (bishop, rook, queen)
-        for direction in self.ROOK_DIRECTIONS:
-            if self._check_sliding_attack(board, sq, direction, attacker_color, [ROOK, QUEEN]):
+        # Check sliding piece attacks (bishop, rook, queen), skipping the
+        # ray walks when the attacker has no such pieces
+        queens = bitboards[attacker_color | QUEEN]
+        rooks = bitboards[attacker_color | ROOK] | queens
+        bishops = bitboards[attacker_color | BISHOP] | queens
+        if rooks or bishops:
+            occupancy = bitboards[WHITE] | bitboards[BLACK]
+            if rooks and rook_attacks(sq, occupancy) & rooks:
                 return True
-        
-        for direction in self.BISHOP_DIRECTIONS:
-            if self._check_sliding_attack(board, sq, direction, attacker_color, [BISHOP, QUEEN]):
+            if bishops and bishop_attacks(sq, occupancy) & bishops:
                 return True
         
         return False
     
-    def _check_sliding_attack(self, board: Board, sq: int, direction: int,
-                               attacker_color: int, piece_types: List[int]) -> bool:
-        """Check if there's a sliding piece attacking along a direction."""
-        current_sq = sq
-        
-        while True:
-            current_file = current_sq % 8
-            next_sq = current_sq + direction
-            
-            if next_sq < 0 or next_sq >= 64:
-                break
-            
-            next_file = next_sq % 8
-            
-            # Check for wraparound
-            if direction in [-1, 1]:
-                if abs(next_file - current_file) != 1:
-                    break
-            elif direction in [7, -9]:
-                if next_file != current_file - 1:
-                    break
-            elif direction in [9, -7]:
-                if next_file != current_file + 1:
-                    break
-            
-            piece = board.squares[next_sq]
-            
-            if piece != EMPTY:
-                if get_piece_color(piece) == attacker_color:
-                    if get_piece_type(piece) in piece_types:
-                        return True
-                break
-            
-            current_sq = next_sq
-        
-        return False
-    
     def _is_legal(self, board: Board, move: Move) -> bool:
         """
         Check if a move is legal (doesn't leave own king in check).
@@ -15,12 +15,17 @@ This module implements the chess search algorithm using:
 """
 
 from typing import Optional, Tuple, List, Dict
-from dataclasses import dataclass
+from array import array
+from multiprocessing import shared_memory
+import multiprocessing
 import random
+import threading
 
 from board import (
-    Board, Move, EMPTY, get_piece_type, get_piece_color, WHITE, BLACK,
-    PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+    Board, Move, EMPTY, WHITE, BLACK,
+    PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, COLOR_MASK, PIECE_MASK,
+    WHITE_ROOK, BLACK_ROOK, NO_MOVE, MOVE_SQUARE_MASK, MOVE_TO_SHIFT,
+    MOVE_PROMOTION_SHIFT, MOVE_CASTLING, MOVE_EN_PASSANT, move_to_uci
 )
 from move_generator import MoveGenerator
 from evaluation import evaluate, evaluate_move, PIECE_VALUES
@@ -35,6 +40,15 @@ TT_EXACT = 0    # Exact score
 TT_ALPHA = 1    # Upper bound (failed low)
 TT_BETA = 2     # Lower bound (failed high)
 
+# Transposition table data word layout (low to high bits)
+TT_DATA_MOVE_MASK = (1 << 17) - 1   # bits 0-16: packed best move
+TT_DATA_FLAG_SHIFT = 17             # bits 17-18: TT_EXACT/ALPHA/BETA
+TT_DATA_GEN_SHIFT = 19              # bits 19-26: generation
+TT_DATA_DEPTH_SHIFT = 27            # bits 27-42: depth + TT_DEPTH_BIAS
+TT_DATA_SCORE_SHIFT = 43            # bits 43-63: score + TT_SCORE_BIAS
+TT_DEPTH_BIAS = 1 << 15
+TT_SCORE_BIAS = 1 << 20
+
 # Null Move Pruning
 NULL_MOVE_REDUCTION = 2
 
@@ -95,23 +109,45 @@ class ZobristHash:
     """Zobrist hashing for chess positions."""
     
     def __init__(self, seed: int = 12345):
-        random.seed(seed)
-        
-        self.piece_keys: List[List[int]] = []
-        for piece in range(32):
-            squares = [random.getrandbits(64) for _ in range(64)]
-            self.piece_keys.append(squares)
-        
-        self.side_key: int = random.getrandbits(64)
-        self.castling_keys: List[int] = [random.getrandbits(64) for _ in range(16)]
-        self.ep_keys: List[int] = [random.getrandbits(64) for _ in range(9)]
+        # Draw every key from one private generator call: 32*64 piece keys,
+        # then the side key, 16 castling keys and 9 en passant keys.
+        num_keys = 32 * 64 + 1 + 16 + 9
+        bits = random.Random(seed).getrandbits(64 * num_keys)
+        keys = array('Q')
+        keys.frombytes(bits.to_bytes(8 * num_keys, 'little'))
+        keys = keys.tolist()
+        
+        # Piece-square keys in one flat list indexed by (piece << 6) | sq
+        self.piece_keys_flat: List[int] = keys[:2048]
+        
+        self.side_key: int = keys[2048]
+        self.castling_keys: List[int] = keys[2049:2065]
+        self.ep_keys: List[int] = keys[2065:2074]
+        
+        # Key change between any two castling-rights masks, indexed by
+        # old * 16 + new, and between any two en passant squares, indexed
+        # by (old + 1) * 65 + (new + 1) with -1 meaning none
+        self.castling_xor: List[int] = [
+            self.castling_keys[old] ^ self.castling_keys[new]
+            for old in range(16) for new in range(16)
+        ]
+        ep_file_keys = [self.ep_keys[8]] + [self.ep_keys[sq % 8] for sq in range(64)]
+        self.ep_xor: List[int] = [old ^ new for old in ep_file_keys for new in ep_file_keys]
+        
+        # Combined key change of the rook hop for a castling move, indexed
+        # by the king's destination square (zero elsewhere)
+        self.castle_rook_keys: List[int] = [0] * 64
+        for king_to, rook_from, rook_to, rook in ((6, 7, 5, WHITE_ROOK), (2, 0, 3, WHITE_ROOK),
+                                                  (62, 63, 61, BLACK_ROOK), (58, 56, 59, BLACK_ROOK)):
+            self.castle_rook_keys[king_to] = (self.piece_keys_flat[rook << 6 | rook_from] ^
+                                              self.piece_keys_flat[rook << 6 | rook_to])
     
     def hash_position(self, board: Board) -> int:
+        keys = self.piece_keys_flat
         h = 0
-        for sq in range(64):
-            piece = board.squares[sq]
-            if piece != EMPTY:
-                h ^= self.piece_keys[piece][sq]
+        for sq, piece in enumerate(board.squares):
+            if piece:
+                h ^= keys[piece << 6 | sq]
         
         if not board.white_to_move:
             h ^= self.side_key
@@ -127,89 +163,186 @@ class ZobristHash:
     
     def update_hash(self, current_hash: int, board: Board, move: Move, 
                     old_castling: int, old_ep: int, captured_piece: int) -> int:
-        h = current_hash
-        piece = board.squares[move.to_sq]
-        original_piece = piece
+        keys = self.piece_keys_flat
+        from_sq = move & MOVE_SQUARE_MASK
+        to_sq = (move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK
+        piece = board.squares[to_sq]
         
-        if move.promotion:
-            original_piece = get_piece_color(piece) | PAWN
+        if move >> MOVE_PROMOTION_SHIFT & PIECE_MASK:
+            original_piece = (piece & COLOR_MASK) | PAWN
+        else:
+            original_piece = piece
         
-        h ^= self.piece_keys[original_piece][move.from_sq]
-        h ^= self.piece_keys[piece][move.to_sq]
+        h = current_hash ^ keys[original_piece << 6 | from_sq] ^ keys[piece << 6 | to_sq]
         
         if captured_piece != EMPTY:
-            if move.is_en_passant:
-                cap_sq = move.to_sq - 8 if get_piece_color(piece) == WHITE else move.to_sq + 8
-                h ^= self.piece_keys[captured_piece][cap_sq]
+            if move & MOVE_EN_PASSANT:
+                cap_sq = to_sq - 8 if piece & WHITE else to_sq + 8
+                h ^= keys[captured_piece << 6 | cap_sq]
             else:
-                h ^= self.piece_keys[captured_piece][move.to_sq]
-        
-        if move.is_castling:
-            from board import WHITE_ROOK, BLACK_ROOK
-            rook_moves = {
-                6: (7, 5, WHITE_ROOK), 2: (0, 3, WHITE_ROOK),
-                62: (63, 61, BLACK_ROOK), 58: (56, 59, BLACK_ROOK)
-            }
-            if move.to_sq in rook_moves:
-                from_r, to_r, rook = rook_moves[move.to_sq]
-                h ^= self.piece_keys[rook][from_r]
-                h ^= self.piece_keys[rook][to_r]
-        
-        h ^= self.castling_keys[old_castling]
-        h ^= self.castling_keys[board.castling_rights]
+                h ^= keys[captured_piece << 6 | to_sq]
         
-        old_ep_idx = old_ep % 8 if old_ep >= 0 else 8
-        new_ep_idx = board.en_passant_square % 8 if board.en_passant_square >= 0 else 8
-        h ^= self.ep_keys[old_ep_idx]
-        h ^= self.ep_keys[new_ep_idx]
+        if move & MOVE_CASTLING:
+            h ^= self.castle_rook_keys[to_sq]
         
-        h ^= self.side_key
-        return h
+        return (h ^ self.castling_xor[old_castling << 4 | board.castling_rights]
+                ^ self.ep_xor[(old_ep + 1) * 65 + board.en_passant_square + 1]
+                ^ self.side_key)
 
 
 # ============================================================================
 # TRANSPOSITION TABLE
 # ============================================================================
 
-@dataclass
-class TTEntry:
-    hash_key: int
-    depth: int
-    score: int
-    flag: int
-    best_move: Optional[Move]
-
-
 class TranspositionTable:
-    def __init__(self, size_mb: int = 64):
-        num_entries = (size_mb * 1024 * 1024) // 50
-        self.size = 1
+    """
+    Fixed-size hash table stored in one flat buffer of 64-bit words.
+    
+    Every entry is two adjacent words: the position key XORed with the data
+    word, and the data word itself, which packs the best move, bound flag,
+    generation, depth and score (see the TT_DATA_* constants). A probe only
+    accepts an entry when the two words XOR back to the probed key, so an
+    entry torn by a concurrent writer in another process reads as a miss
+    instead of returning mixed data. A data word of 0 marks an empty entry.
+    
+    Entries are grouped into buckets of BUCKET_SIZE, i.e. 64 contiguous
+    bytes. A store that misses in its bucket takes an empty entry or
+    replaces the one with the lowest depth - 4 * age, where age counts how
+    many searches ago the entry was written, so stale deep entries
+    eventually make room for fresh ones.
+    
+    With shared=True the buffer lives in multiprocessing shared memory so
+    that Lazy SMP helper processes can attach to it by name.
+    """
+    
+    BUCKET_SIZE = 4
+    
+    # Bytes used per entry: key word (8) + data word (8)
+    SLOT_BYTES = 16
+    
+    def __init__(self, size_mb: int = 64, shared: bool = False):
+        num_entries = (size_mb * 1024 * 1024) // self.SLOT_BYTES
+        self.size = self.BUCKET_SIZE
         while self.size * 2 <= num_entries:
             self.size *= 2
-        self.mask = self.size - 1
-        self.table: Dict[int, TTEntry] = {}
+        # Buckets are indexed with a mask rather than a multiply-shift
+        # range reduction: Zobrist keys are uniformly random, and a 128-bit
+        # product would allocate a big int on every probe.
+        self.mask = self.size // self.BUCKET_SIZE - 1
+        self.generation = 0
+        self.shared = shared
+        self._shm = None
+        self._owner = True
+        self._allocate()
+    
+    @classmethod
+    def attach(cls, shm_name: str, size: int,
+               generation: int) -> 'TranspositionTable':
+        """Open a shared table created by another process."""
+        tt = cls.__new__(cls)
+        tt.size = size
+        tt.mask = size // cls.BUCKET_SIZE - 1
+        tt.generation = generation
+        tt.shared = True
+        tt._owner = False
+        tt._shm = shared_memory.SharedMemory(name=shm_name)
+        tt.table = tt._shm.buf.cast('Q')
+        tt.hits = 0
+        tt.writes = 0
+        return tt
+    
+    @property
+    def shm_name(self) -> Optional[str]:
+        return self._shm.name if self._shm is not None else None
+    
+    def _allocate(self) -> None:
+        self.close()
+        if self.shared:
+            # Fresh shared memory is zero-filled, i.e. all entries empty
+            self._shm = shared_memory.SharedMemory(create=True, size=self.size * self.SLOT_BYTES)
+            self._owner = True
+            self.table = self._shm.buf.cast('Q')
+        else:
+            self.table = array('Q', [0]) * (self.size * 2)
         self.hits = 0
         self.writes = 0
     
-    def probe(self, hash_key: int) -> Optional[TTEntry]:
-        entry = self.table.get(hash_key & self.mask)
-        if entry and entry.hash_key == hash_key:
-            self.hits += 1
-            return entry
+    def close(self) -> None:
+        """Release the shared memory block, if any."""
+        if self._shm is None:
+            return
+        self.table.release()
+        self.table = array('Q')
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+    
+    def new_search(self) -> None:
+        """Advance the generation counter; call once per root search."""
+        # Attached tables keep the generation of the process that owns them
+        if not self._owner:
+            return
+        self.generation = (self.generation + 1) & 0xFF
+    
+    def probe(self, hash_key: int) -> Optional[Tuple[int, int, int, Move]]:
+        """
+        Return (depth, score, flag, best_move) for hash_key, or None.
+        best_move is NO_MOVE when the entry has none.
+        """
+        table = self.table
+        base = (hash_key & self.mask) << 3
+        for index in range(base, base + 8, 2):
+            data = table[index + 1]
+            if table[index] ^ data == hash_key and data:
+                self.hits += 1
+                return (((data >> TT_DATA_DEPTH_SHIFT) & 0xFFFF) - TT_DEPTH_BIAS,
+                        (data >> TT_DATA_SCORE_SHIFT) - TT_SCORE_BIAS,
+                        (data >> TT_DATA_FLAG_SHIFT) & 3,
+                        data & TT_DATA_MOVE_MASK)
         return None
     
     def store(self, hash_key: int, depth: int, score: int, flag: int, 
-              best_move: Optional[Move]) -> None:
-        index = hash_key & self.mask
-        existing = self.table.get(index)
-        if existing is None or depth >= existing.depth or hash_key == existing.hash_key:
-            self.table[index] = TTEntry(hash_key, depth, score, flag, best_move)
-            self.writes += 1
+              best_move: Move) -> None:
+        table = self.table
+        generation = self.generation
+        base = (hash_key & self.mask) << 3
+        
+        # Reuse the entry holding this key; otherwise replace the least
+        # valuable one: empty entries first, then shallow and old entries
+        target = base
+        worst = None
+        for index in range(base, base + 8, 2):
+            data = table[index + 1]
+            if data == 0 or table[index] ^ data == hash_key:
+                target = index
+                break
+            age = (generation - (data >> TT_DATA_GEN_SHIFT)) & 0xFF
+            value = ((data >> TT_DATA_DEPTH_SHIFT) & 0xFFFF) - TT_DEPTH_BIAS - 4 * age
+            if worst is None or value < worst:
+                worst = value
+                target = index
+        
+        data = (best_move
+                | flag << TT_DATA_FLAG_SHIFT
+                | generation << TT_DATA_GEN_SHIFT
+                | (depth + TT_DEPTH_BIAS) << TT_DATA_DEPTH_SHIFT
+                | (score + TT_SCORE_BIAS) << TT_DATA_SCORE_SHIFT)
+        table[target] = hash_key ^ data
+        table[target + 1] = data
+        self.writes += 1
+    
+    def hashfull(self) -> int:
+        """Permille of sampled entries filled during the current search."""
+        sample = min(1000, self.size)
+        table = self.table
+        generation = self.generation
+        used = sum(1 for i in range(1, sample * 2, 2)
+                   if table[i] and (table[i] >> TT_DATA_GEN_SHIFT) & 0xFF == generation)
+        return used * 1000 // sample
     
     def clear(self) -> None:
-        self.table.clear()
-        self.hits = 0
-        self.writes = 0
+        self._allocate()
 
 
 # ============================================================================
@@ -225,8 +358,9 @@ class SEE:
     """
     
     # Directions for sliding pieces
-    ROOK_DIRS = [8, -8, 1, -1]
-    BISHOP_DIRS = [9, 7, -9, -7]
+    ROOK_DIRS = (8, -8, 1, -1)
+    BISHOP_DIRS = (9, 7, -9, -7)
+    KNIGHT_OFFSETS = (17, 15, 10, 6, -6, -10, -15, -17)
     
     @staticmethod
     def get_least_valuable_attacker(board: Board, sq: int, by_white: bool) -> Tuple[int, int]:
@@ -238,25 +372,23 @@ class SEE:
         
         # Check pawns first (least valuable)
         pawn_dir = -8 if by_white else 8
-        pawn_attacks = []
         file = sq % 8
-        for offset in [pawn_dir - 1, pawn_dir + 1]:
+        for offset in (pawn_dir - 1, pawn_dir + 1):
             att_sq = sq + offset
             if 0 <= att_sq < 64:
                 att_file = att_sq % 8
                 if abs(att_file - file) == 1:
                     piece = board.squares[att_sq]
-                    if get_piece_type(piece) == PAWN and get_piece_color(piece) == color:
+                    if piece == color | PAWN:
                         return (att_sq, SEE_VALUES[PAWN])
         
         # Check knights
-        knight_offsets = [17, 15, 10, 6, -6, -10, -15, -17]
-        for offset in knight_offsets:
+        for offset in SEE.KNIGHT_OFFSETS:
             att_sq = sq + offset
             if 0 <= att_sq < 64:
                 if abs((att_sq % 8) - file) <= 2:
                     piece = board.squares[att_sq]
-                    if get_piece_type(piece) == KNIGHT and get_piece_color(piece) == color:
+                    if piece == color | KNIGHT:
                         return (att_sq, SEE_VALUES[KNIGHT])
         
         # Check bishops and diagonal queens
@@ -271,8 +403,8 @@ class SEE:
                     break
                 piece = board.squares[att_sq]
                 if piece != EMPTY:
-                    pt = get_piece_type(piece)
-                    if get_piece_color(piece) == color and pt in (BISHOP, QUEEN):
+                    pt = piece & PIECE_MASK
+                    if piece & COLOR_MASK == color and (pt == BISHOP or pt == QUEEN):
                         return (att_sq, SEE_VALUES[pt])
                     break
         
@@ -287,8 +419,8 @@ class SEE:
                         break
                 piece = board.squares[att_sq]
                 if piece != EMPTY:
-                    pt = get_piece_type(piece)
-                    if get_piece_color(piece) == color and pt in (ROOK, QUEEN):
+                    pt = piece & PIECE_MASK
+                    if piece & COLOR_MASK == color and (pt == ROOK or pt == QUEEN):
                         return (att_sq, SEE_VALUES[pt])
                     break
         
@@ -298,7 +430,7 @@ class SEE:
             if 0 <= att_sq < 64:
                 if abs((att_sq % 8) - file) <= 1:
                     piece = board.squares[att_sq]
-                    if get_piece_type(piece) == KING and get_piece_color(piece) == color:
+                    if piece == color | KING:
                         return (att_sq, SEE_VALUES[KING])
         
         return (-1, 0)
@@ -311,17 +443,17 @@ class SEE:
         Returns the expected material gain/loss from the capture sequence.
         Positive = good for the moving side.
         """
-        from_sq = move.from_sq
-        to_sq = move.to_sq
+        from_sq = move & MOVE_SQUARE_MASK
+        to_sq = (move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK
         
         attacker = board.squares[from_sq]
         victim = board.squares[to_sq]
         
-        if victim == EMPTY and not move.is_en_passant:
+        if victim == EMPTY and not move & MOVE_EN_PASSANT:
             return 0  # Not a capture
         
-        attacker_value = SEE_VALUES.get(get_piece_type(attacker), 0)
-        victim_value = SEE_VALUES.get(get_piece_type(victim), 0) if victim != EMPTY else SEE_VALUES[PAWN]
+        attacker_value = SEE_VALUES.get(attacker & PIECE_MASK, 0)
+        victim_value = SEE_VALUES.get(victim & PIECE_MASK, 0) if victim != EMPTY else SEE_VALUES[PAWN]
         
         # Simple SEE approximation
         # Full SEE would simulate the entire capture sequence
@@ -333,7 +465,7 @@ class SEE:
             return gain
         
         # Check if the square is defended
-        is_white = get_piece_color(attacker) == WHITE
+        is_white = attacker & COLOR_MASK == WHITE
         defender_sq, defender_value = SEE.get_least_valuable_attacker(board, to_sq, not is_white)
         
         if defender_sq < 0:
@@ -364,22 +496,24 @@ class SearchEngine:
     - Killer/History heuristics
     """
     
-    def __init__(self, tt_size_mb: int = 64):
+    def __init__(self, tt_size_mb: int = 64, threads: int = 1,
+                 tt: Optional[TranspositionTable] = None):
         self.move_generator = MoveGenerator()
         self.nodes_searched = 0
         self.best_move: Optional[Move] = None
         self.max_depth = 4
         self.stop_search = False
         
-        # Transposition table
-        self.tt = TranspositionTable(tt_size_mb)
+        # Transposition table; shared with helper processes when threads > 1
+        self.threads = max(1, threads)
+        self.tt = tt if tt is not None else TranspositionTable(tt_size_mb, shared=self.threads > 1)
         self.zobrist = ZobristHash()
         
         # Killer moves (2 per ply)
-        self.killer_moves: List[List[Optional[Move]]] = [[None, None] for _ in range(MAX_DEPTH)]
+        self.killer_moves: List[List[Move]] = [[NO_MOVE, NO_MOVE] for _ in range(MAX_DEPTH)]
         
-        # History heuristic
-        self.history: List[List[int]] = [[0] * 64 for _ in range(32)]
+        # History heuristic, indexed by piece << 6 | to_square
+        self.history: List[int] = [0] * (32 * 64)
         
         # Countermove table: (piece, to_square) -> best response move
         self.countermove: Dict[Tuple[int, int], Move] = {}
@@ -441,12 +575,66 @@ class SearchEngine:
         self.info_callback = info_callback
         self.search_start_time = time.time()
         
-        self.killer_moves = [[None, None] for _ in range(MAX_DEPTH)]
+        self.killer_moves = [[NO_MOVE, NO_MOVE] for _ in range(MAX_DEPTH)]
+        self.tt.new_search()
         
         position_hash = self.zobrist.hash_position(board)
         
+        # Repetition detection compares Zobrist keys in position_history;
+        # make sure the root position is on it for the duration of the search
+        root_pushed = not board.position_history or board.position_history[-1] != position_hash
+        if root_pushed:
+            board.position_history.append(position_hash)
+        helpers = self._start_helpers(board, depth) if self.threads > 1 else None
+        try:
+            return self._iterative_deepening(board, depth, position_hash)
+        finally:
+            if helpers is not None:
+                self._stop_helpers(helpers)
+            if root_pushed:
+                board.position_history.pop()
+    
+    def _start_helpers(self, board: Board, depth: int):
+        """
+        Start Lazy SMP helper processes on the current position.
+        
+        Helpers run the same iterative deepening on their own copy of the
+        board and only talk to the main search through the shared
+        transposition table. Odd-numbered helpers search one ply deeper so
+        that the threads spread out over different parts of the tree.
+        """
+        ctx = multiprocessing.get_context()
+        stop_event = ctx.Event()
+        options = {name: value for name, value in vars(self).items()
+                   if name.startswith('use_')}
+        processes = []
+        for worker_id in range(1, self.threads):
+            process = ctx.Process(
+                target=_smp_worker,
+                args=(self.tt.shm_name, self.tt.size, self.tt.generation,
+                      board.to_fen(), list(board.position_history),
+                      depth + (worker_id & 1), options, stop_event),
+                daemon=True)
+            process.start()
+            processes.append(process)
+        return stop_event, processes
+    
+    @staticmethod
+    def _stop_helpers(helpers) -> None:
+        stop_event, processes = helpers
+        stop_event.set()
+        for process in processes:
+            process.join(1.0)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+    
+    def _iterative_deepening(self, board: Board, depth: int,
+                             position_hash: int) -> Tuple[Optional[Move], int]:
+        """Run the iterative deepening loop from the root position."""
         best_move = None
         best_score = -INFINITY
+        history = self.history
         
         # Initial search at depth 1 to get a starting score
         score = self._alphabeta(board, 1, -INFINITY, INFINITY, 0, True, position_hash, True)
@@ -461,6 +649,10 @@ class SearchEngine:
             if self.stop_search:
                 break
             
+            # Age the history scores so that the ordering follows what
+            # the latest iterations found rather than the whole game
+            history[:] = [h >> 1 for h in history]
+            
             # Set up aspiration window around previous score
             alpha = best_score - ASPIRATION_WINDOW
             beta = best_score + ASPIRATION_WINDOW
@@ -512,10 +704,10 @@ class SearchEngine:
             seen_hashes.add(current_hash)
             
             entry = self.tt.probe(current_hash)
-            if entry is None or entry.best_move is None:
+            if entry is None or not entry[3]:
                 break
             
-            move = entry.best_move
+            move = entry[3]
             self.pv.append(move)
             
             # Make the move and store undo info
@@ -546,16 +738,12 @@ class SearchEngine:
         time_ms = int(elapsed * 1000)
         
         # Calculate hash usage (permille)
-        if self.tt.size > 0:
-            hashfull = int((self.tt.writes / self.tt.size) * 1000)
-            hashfull = min(hashfull, 1000)
-        else:
-            hashfull = 0
+        hashfull = self.tt.hashfull()
         
         # Get PV string
-        pv_str = " ".join(move.to_uci() for move in self.pv) if self.pv else ""
+        pv_str = " ".join(move_to_uci(move) for move in self.pv) if self.pv else ""
         if not pv_str and self.best_move:
-            pv_str = self.best_move.to_uci()
+            pv_str = move_to_uci(self.best_move)
         
         # Calculate NPS
         nps = int(self.nodes_searched / elapsed) if elapsed > 0 else 0
@@ -579,6 +767,8 @@ class SearchEngine:
         
         self.nodes_searched += 1
         original_alpha = alpha
+        # Zero-window nodes can never see alpha < score < beta
+        is_pv_node = beta - alpha > 1
         
         # Draw detection with contempt
         if not is_root:
@@ -594,24 +784,26 @@ class SearchEngine:
                 return -CONTEMPT * 2
         
         # Probe TT
-        tt_move = None
+        tt_move = NO_MOVE
         tt_entry = None
         
         if self.use_tt:
             tt_entry = self.tt.probe(position_hash)
             
             if tt_entry is not None and not is_root:
-                if tt_entry.depth >= depth:
-                    if tt_entry.flag == TT_EXACT:
-                        self.tt_cutoffs += 1
-                        return tt_entry.score
-                    elif tt_entry.flag == TT_ALPHA and tt_entry.score <= alpha:
-                        self.tt_cutoffs += 1
-                        return alpha
-                    elif tt_entry.flag == TT_BETA and tt_entry.score >= beta:
-                        self.tt_cutoffs += 1
-                        return beta
-                tt_move = tt_entry.best_move
+                tt_depth, tt_score, tt_flag, tt_move = tt_entry
+                # One test for all three bound types; the flag then picks
+                # the score to return (exact score, alpha or beta)
+                if tt_depth >= depth and (
+                        tt_flag == TT_EXACT or
+                        (tt_score <= alpha if tt_flag == TT_ALPHA else tt_score >= beta)):
+                    self.tt_cutoffs += 1
+                    return (tt_score, alpha, beta)[tt_flag]
+        
+        # Quiescence at leaf; a check extension could not lift this node
+        # above depth 0, so skip the check test as well
+        if depth <= -CHECK_EXTENSION:
+            return self._quiescence(board, alpha, beta)
         
         # Check detection
         in_check = self.move_generator.is_in_check(board)
@@ -622,6 +814,10 @@ class SearchEngine:
             extended_depth += CHECK_EXTENSION
             self.check_extensions += 1
         
+        # Quiescence at leaf, before paying for full legal move generation
+        if extended_depth <= 0:
+            return self._quiescence(board, alpha, beta)
+        
         # Generate moves
         moves = self.move_generator.generate_legal_moves(board)
         
@@ -631,10 +827,6 @@ class SearchEngine:
                 return -MATE_SCORE + ply
             return 0
         
-        # Quiescence at leaf
-        if extended_depth <= 0:
-            return self._quiescence(board, alpha, beta)
-        
         # Static evaluation for pruning decisions
         static_eval = None
         
@@ -644,7 +836,7 @@ class SearchEngine:
         # If we don't have a TT move and depth is high enough, do a
         # reduced depth search to find a good move to search first
         if (self.use_iid and 
-            tt_move is None and 
+            not tt_move and 
             extended_depth >= IID_DEPTH_LIMIT and 
             not in_check):
             
@@ -657,14 +849,18 @@ class SearchEngine:
             if self.use_tt:
                 tt_entry = self.tt.probe(position_hash)
                 if tt_entry is not None:
-                    tt_move = tt_entry.best_move
+                    tt_move = tt_entry[3]
         
         # Null Move Pruning
         if (self.use_null_move and allow_null and not is_root and not in_check and 
             extended_depth >= 3 and self._has_big_pieces(board)):
             
+            # Passing also forfeits any en passant capture
+            null_ep = board.en_passant_square
             board.white_to_move = not board.white_to_move
-            null_hash = position_hash ^ self.zobrist.side_key
+            board.en_passant_square = -1
+            null_hash = (position_hash ^ self.zobrist.side_key
+                         ^ self.zobrist.ep_xor[(null_ep + 1) * 65])
             
             null_score = -self._alphabeta(
                 board, extended_depth - 1 - NULL_MOVE_REDUCTION, 
@@ -672,6 +868,7 @@ class SearchEngine:
             )
             
             board.white_to_move = not board.white_to_move
+            board.en_passant_square = null_ep
             
             if null_score >= beta:
                 self.null_move_cutoffs += 1
@@ -741,53 +938,63 @@ class SearchEngine:
         moves = self._order_moves(board, moves, tt_move, ply)
         
         best_score = -INFINITY
-        best_move_at_node = None
+        best_move_at_node = NO_MOVE
         moves_searched = 0
         quiet_moves_searched = 0
         
+        # Bind names used on every iteration of the move loop to locals
+        squares = board.squares
+        make_move = board.make_move
+        unmake_move = board.unmake_move
+        is_in_check = self.move_generator.is_in_check
+        update_hash = self.zobrist.update_hash
+        alphabeta = self._alphabeta
+        history = self.history
+        push_position = board.position_history.append
+        pop_position = board.position_history.pop
+        
+        # The node-level parts of the LMP, futility and LMR conditions do not
+        # change from move to move; settle them once before the loop
+        lmp_limit = None
+        if self.use_lmp and extended_depth <= 4 and not in_check and not is_root:
+            lmp_limit = LMP_MOVE_COUNTS[min(extended_depth, 4)]
+        futility_value = None
+        if static_eval is not None and extended_depth <= 3 and not in_check:
+            futility_value = static_eval + FUTILITY_MARGIN[extended_depth]
+        lmr_at_node = self.use_lmr and extended_depth >= LMR_REDUCTION_LIMIT and not in_check
+        killer1, killer2 = self.killer_moves[ply] if ply < MAX_DEPTH else (NO_MOVE, NO_MOVE)
+        
         for move in moves:
             if self.stop_search:
                 break
             
-            is_capture = board.squares[move.to_sq] != EMPTY or move.is_en_passant
-            is_quiet = not is_capture and not move.promotion
-            
-            # ================================================================
-            # LATE MOVE PRUNING (LMP)
-            # ================================================================
-            # Skip late quiet moves at low depths
-            if (self.use_lmp and
-                is_quiet and
-                extended_depth <= 4 and
-                not in_check and
-                not is_root and
-                moves_searched > 0):
-                
-                lmp_limit = LMP_MOVE_COUNTS[min(extended_depth, 4)]
-                if quiet_moves_searched >= lmp_limit:
-                    self.lmp_prunes += 1
-                    moves_searched += 1
-                    quiet_moves_searched += 1
-                    continue
-            
-            # ================================================================
-            # FUTILITY PRUNING
-            # ================================================================
-            # Skip quiet moves that have no chance of raising alpha
-            if (static_eval is not None and 
-                moves_searched > 0 and
-                extended_depth <= 3 and
-                not in_check and
-                is_quiet):
-                
-                futility_value = static_eval + FUTILITY_MARGIN[extended_depth]
-                if futility_value <= alpha:
-                    self.futility_prunes += 1
-                    moves_searched += 1
-                    quiet_moves_searched += 1
-                    continue
+            to_sq = (move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK
+            promotion = move >> MOVE_PROMOTION_SHIFT & PIECE_MASK
+            is_capture = squares[to_sq] != EMPTY or move & MOVE_EN_PASSANT
+            is_quiet = not is_capture and not promotion
             
             if is_quiet:
+                if moves_searched > 0:
+                    # ========================================================
+                    # LATE MOVE PRUNING (LMP)
+                    # ========================================================
+                    # Skip late quiet moves at low depths
+                    if lmp_limit is not None and quiet_moves_searched >= lmp_limit:
+                        self.lmp_prunes += 1
+                        moves_searched += 1
+                        quiet_moves_searched += 1
+                        continue
+                    
+                    # ========================================================
+                    # FUTILITY PRUNING
+                    # ========================================================
+                    # Skip quiet moves that have no chance of raising alpha
+                    if futility_value is not None and futility_value <= alpha:
+                        self.futility_prunes += 1
+                        moves_searched += 1
+                        quiet_moves_searched += 1
+                        continue
+                
                 quiet_moves_searched += 1
             
             # Save state
@@ -795,38 +1002,36 @@ class SearchEngine:
             old_ep = board.en_passant_square
             
             # Make move
-            undo = board.make_move(move)
+            undo = make_move(move)
             
             # Track last move for countermove heuristic
             old_last_move = self.last_move
             moved_piece = undo.moved_piece
-            self.last_move = (moved_piece, move.to_sq)
-            
-            # Check if this move gives check (for LMR decision)
-            gives_check = self.move_generator.is_in_check(board)
+            self.last_move = (moved_piece, to_sq)
             
             # Update hash
-            new_hash = self.zobrist.update_hash(
+            new_hash = update_hash(
                 position_hash, board, move, old_castling, old_ep, undo.captured_piece
             )
+            push_position(new_hash)
             
             # ================================================================
             # LATE MOVE REDUCTIONS
             # ================================================================
             do_full_search = True
             
-            if (self.use_lmr and
+            # Whether the move gives check is only worked out once the
+            # cheaper conditions allow a reduction
+            if (lmr_at_node and
                 moves_searched >= LMR_FULL_DEPTH_MOVES and 
-                extended_depth >= LMR_REDUCTION_LIMIT and
-                not in_check and
-                not gives_check and
-                not move.promotion and
+                not promotion and
                 undo.captured_piece == EMPTY and
-                not self._is_killer(move, ply)):
+                move != killer1 and move != killer2 and
+                not is_in_check(board)):
                 
                 reduction = 1 + (moves_searched >= 6)
                 
-                score = -self._alphabeta(
+                score = -alphabeta(
                     board, extended_depth - 1 - reduction, -alpha - 1, -alpha,
                     ply + 1, False, new_hash, True
                 )
@@ -837,24 +1042,25 @@ class SearchEngine:
             # Full search
             if do_full_search:
                 if moves_searched == 0:
-                    score = -self._alphabeta(
+                    score = -alphabeta(
                         board, extended_depth - 1, -beta, -alpha,
                         ply + 1, False, new_hash, True
                     )
                 else:
                     # PVS
-                    score = -self._alphabeta(
+                    score = -alphabeta(
                         board, extended_depth - 1, -alpha - 1, -alpha,
                         ply + 1, False, new_hash, True
                     )
                     
-                    if score > alpha and score < beta:
-                        score = -self._alphabeta(
+                    if is_pv_node and alpha < score < beta:
+                        score = -alphabeta(
                             board, extended_depth - 1, -beta, -alpha,
                             ply + 1, False, new_hash, True
                         )
             
-            board.unmake_move(move, undo)
+            pop_position()
+            unmake_move(move, undo)
             self.last_move = old_last_move  # Restore for countermove heuristic
             moves_searched += 1
             
@@ -866,12 +1072,13 @@ class SearchEngine:
             
             if score > alpha:
                 alpha = score
-                if undo.captured_piece == EMPTY and not move.promotion:
-                    piece = board.squares[move.from_sq]
-                    self.history[piece][move.to_sq] += extended_depth * extended_depth
+                # is_quiet was taken before make_move: undo is reused and
+                # must not be read after unmake_move
+                if is_quiet:
+                    history[moved_piece << 6 | to_sq] += extended_depth * extended_depth
             
             if alpha >= beta:
-                if undo.captured_piece == EMPTY and not move.promotion:
+                if is_quiet:
                     self._update_killers(move, ply)
                     # Countermove heuristic - remember this as a good response
                     if self.use_countermove and self.last_move is not None:
@@ -905,16 +1112,17 @@ class SearchEngine:
         if depth >= 4:
             return stand_pat
         
-        moves = self.move_generator.generate_legal_moves(board)
-        captures = [m for m in moves 
-                   if board.squares[m.to_sq] != EMPTY or m.is_en_passant or m.promotion]
+        captures = self.move_generator.generate_captures(board)
         
         # Order by SEE
-        scored = []
-        for m in captures:
-            see_score = SEE.evaluate(board, m)
-            scored.append((see_score, m))
-        scored.sort(key=lambda x: x[0], reverse=True)
+        see_evaluate = SEE.evaluate
+        see_scores = [see_evaluate(board, m) for m in captures]
+        order = sorted(range(len(captures)), key=see_scores.__getitem__, reverse=True)
+        scored = [(see_scores[i], captures[i]) for i in order]
+        
+        make_move = board.make_move
+        unmake_move = board.unmake_move
+        quiescence = self._quiescence
         
         for see_score, move in scored:
             if self.stop_search:
@@ -924,9 +1132,9 @@ class SearchEngine:
             if see_score < 0 and depth >= 2:
                 continue
             
-            undo = board.make_move(move)
-            score = -self._quiescence(board, -beta, -alpha, depth + 1)
-            board.unmake_move(move, undo)
+            undo = make_move(move)
+            score = -quiescence(board, -beta, -alpha, depth + 1)
+            unmake_move(move, undo)
             
             if score >= beta:
                 return beta
@@ -936,62 +1144,54 @@ class SearchEngine:
         return alpha
     
     def _order_moves(self, board: Board, moves: List[Move], 
-                     tt_move: Optional[Move], ply: int) -> List[Move]:
+                     tt_move: Move, ply: int) -> List[Move]:
         """Order moves with SEE for captures."""
-        scored = []
-        
+        squares = board.squares
+        history = self.history
+        see_evaluate = SEE.evaluate
+        
+        # The countermove only depends on the previous move, not on the
+        # move being scored
+        countermove = NO_MOVE
+        if self.use_countermove and self.last_move is not None:
+            countermove = self.countermove.get(self.last_move, NO_MOVE)
+        # No generated move is ever NO_MOVE, so empty killer slots never match
+        killer1, killer2 = self.killer_moves[ply] if ply < MAX_DEPTH else (NO_MOVE, NO_MOVE)
+        
+        scores = []
         for move in moves:
-            if tt_move and move == tt_move:
+            to_sq = (move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK
+            if move == tt_move:
                 score = 3000000
-            elif board.squares[move.to_sq] != EMPTY or move.is_en_passant:
+            elif squares[to_sq] != EMPTY or move & MOVE_EN_PASSANT:
                 # Capture - use SEE
-                see = SEE.evaluate(board, move)
-                score = 2000000 + see
-            elif move.promotion:
-                score = 1900000 + PIECE_VALUES.get(move.promotion, 0)
-            elif self._is_killer(move, ply):
+                score = 2000000 + see_evaluate(board, move)
+            elif move >> MOVE_PROMOTION_SHIFT & PIECE_MASK:
+                score = 1900000 + PIECE_VALUES.get(move >> MOVE_PROMOTION_SHIFT & PIECE_MASK, 0)
+            elif move == killer1 or move == killer2:
                 score = 1000000
-            elif self.use_countermove and self.last_move is not None:
-                # Countermove bonus
-                cm = self.countermove.get(self.last_move)
-                if cm and move == cm:
-                    score = 900000
-                else:
-                    piece = board.squares[move.from_sq]
-                    score = self.history[piece][move.to_sq]
+            elif move == countermove:
+                score = 900000
             else:
-                piece = board.squares[move.from_sq]
-                score = self.history[piece][move.to_sq]
-            
-            scored.append((score, move))
+                score = history[squares[move & MOVE_SQUARE_MASK] << 6 | to_sq]
+            scores.append(score)
         
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [m for _, m in scored]
-    
-    def _is_killer(self, move: Move, ply: int) -> bool:
-        if ply >= MAX_DEPTH:
-            return False
-        k = self.killer_moves[ply]
-        return (k[0] and move == k[0]) or (k[1] and move == k[1])
+        # Sort move indices by score; the key is a C-level bound method and
+        # the sort is stable, so equal scores keep generation order
+        order = sorted(range(len(moves)), key=scores.__getitem__, reverse=True)
+        return [moves[i] for i in order]
     
     def _update_killers(self, move: Move, ply: int) -> None:
         if ply >= MAX_DEPTH:
             return
         k = self.killer_moves[ply]
-        if k[0] and move == k[0]:
+        if move == k[0]:
             return
         k[1] = k[0]
         k[0] = move
     
     def _has_big_pieces(self, board: Board) -> bool:
-        color = WHITE if board.white_to_move else BLACK
-        for sq in range(64):
-            piece = board.squares[sq]
-            if piece != EMPTY and get_piece_color(piece) == color:
-                pt = get_piece_type(piece)
-                if pt in (KNIGHT, BISHOP, ROOK, QUEEN):
-                    return True
-        return False
+        return board.big_pieces[WHITE if board.white_to_move else BLACK] > 0
     
     def stop(self):
         self.stop_search = True
@@ -999,11 +1199,15 @@ class SearchEngine:
     def clear_tt(self):
         self.tt.clear()
     
+    def close(self):
+        """Release the shared transposition table, if any."""
+        self.tt.close()
+    
     def get_info(self) -> dict:
         import time
         elapsed = time.time() - self.search_start_time if self.search_start_time > 0 else 0
         nps = int(self.nodes_searched / elapsed) if elapsed > 0 else 0
-        hashfull = int((self.tt.writes / self.tt.size) * 1000) if self.tt.size > 0 else 0
+        hashfull = self.tt.hashfull()
         
         return {
             'nodes': self.nodes_searched,
@@ -1018,5 +1222,26 @@ class SearchEngine:
             'futility_prunes': self.futility_prunes,
             'check_extensions': self.check_extensions,
             'iid_searches': self.iid_searches,
-            'pv': " ".join(m.to_uci() for m in self.pv) if self.pv else "",
+            'pv': " ".join(move_to_uci(m) for m in self.pv) if self.pv else "",
         }
+
+
+def _smp_worker(shm_name: str, tt_size: int, generation: int, fen: str,
+                position_history: List[int], depth: int, options: dict,
+                stop_event) -> None:
+    """Entry point of a Lazy SMP helper process."""
+    tt = TranspositionTable.attach(shm_name, tt_size, generation)
+    board = Board(fen)
+    board.position_history = position_history
+    engine = SearchEngine(tt=tt)
+    for name, value in options.items():
+        setattr(engine, name, value)
+    
+    # The helper never reports results; it stops when the main search is done
+    watcher = threading.Thread(target=lambda: (stop_event.wait(), engine.stop()),
+                               daemon=True)
+    watcher.start()
+    try:
+        engine.search(board, depth)
+    finally:
+        tt.close()
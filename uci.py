@@ -5,9 +5,13 @@ This module implements the Universal Chess Interface (UCI) protocol,
 allowing the engine to communicate with chess GUIs.
 """
 
+import os
 import sys
 from typing import Optional, List, Dict, Any
-from board import Board, Move, parse_square, QUEEN, ROOK, BISHOP, KNIGHT
+from board import (
+    Board, Move, parse_square, QUEEN, ROOK, BISHOP, KNIGHT,
+    move_from_sq, move_to_sq, move_promotion, move_to_uci
+)
 from move_generator import MoveGenerator
 from search import SearchEngine
 
@@ -112,6 +116,7 @@ class UCIProtocol:
         self.options = {
             "Hash": UCIOption("Hash", "spin", self.DEFAULT_HASH_SIZE, 1, 1024),
             "Depth": UCIOption("Depth", "spin", self.DEFAULT_DEPTH, 1, 30),
+            "Threads": UCIOption("Threads", "spin", 1, 1, os.cpu_count() or 1),
             "Ponder": UCIOption("Ponder", "check", True),
             "UseTranspositionTable": UCIOption("UseTranspositionTable", "check", self.DEFAULT_USE_TT),
             "UseNullMove": UCIOption("UseNullMove", "check", self.DEFAULT_USE_NMP),
@@ -129,7 +134,10 @@ class UCIProtocol:
     def _create_search_engine(self):
         """Create search engine with current options."""
         hash_size = self.options["Hash"].value
-        self.search_engine = SearchEngine(tt_size_mb=hash_size)
+        threads = self.options["Threads"].value
+        if getattr(self, "search_engine", None) is not None:
+            self.search_engine.close()
+        self.search_engine = SearchEngine(tt_size_mb=hash_size, threads=threads)
         
         # Apply options to search engine
         self.search_engine.use_tt = self.options["UseTranspositionTable"].value
@@ -154,6 +162,7 @@ class UCIProtocol:
                 break
             except KeyboardInterrupt:
                 break
+        self.search_engine.close()
     
     def _process_command(self, line: str):
         """Process a single UCI command."""
@@ -253,8 +262,8 @@ class UCIProtocol:
     
     def _apply_option(self, name: str):
         """Apply an option change to the engine."""
-        if name == "Hash":
-            # Need to recreate search engine with new hash size
+        if name in ("Hash", "Threads"):
+            # Need to recreate search engine with new hash size / TT sharing
             self._create_search_engine()
         elif name == "UseTranspositionTable":
             self.search_engine.use_tt = self.options[name].value
@@ -311,11 +320,16 @@ class UCIProtocol:
             if i < len(args) and args[i] == "moves":
                 moves_index = i + 1
         
+        # Record Zobrist keys of the game so far for repetition detection
+        zobrist = self.search_engine.zobrist
+        self.board.position_history = [zobrist.hash_position(self.board)]
+        
         if moves_index >= 0:
             for move_str in args[moves_index:]:
                 move = self._parse_move(move_str)
                 if move:
                     self.board.make_move(move)
+                    self.board.position_history.append(zobrist.hash_position(self.board))
     
     def _parse_move(self, move_str: str) -> Optional[Move]:
         """Parse a move string in UCI format."""
@@ -337,16 +351,16 @@ class UCIProtocol:
         legal_moves = self.move_generator.generate_legal_moves(self.board)
         
         for move in legal_moves:
-            if move.from_sq == from_sq and move.to_sq == to_sq:
+            if move_from_sq(move) == from_sq and move_to_sq(move) == to_sq:
                 if promotion:
-                    if move.promotion == promotion:
+                    if move_promotion(move) == promotion:
                         return move
                 else:
-                    if move.promotion == 0:
+                    if move_promotion(move) == 0:
                         return move
         
         for move in legal_moves:
-            if move.from_sq == from_sq and move.to_sq == to_sq:
+            if move_from_sq(move) == from_sq and move_to_sq(move) == to_sq:
                 return move
         
         return None
@@ -412,17 +426,17 @@ class UCIProtocol:
             if len(pv) >= 2:
                 # PV[0] is our move, PV[1] is expected opponent reply
                 self.ponder_move = pv[1]
-                ponder_move_str = f" ponder {pv[1].to_uci()}"
+                ponder_move_str = f" ponder {move_to_uci(pv[1])}"
                 self.ponder_total += 1
             else:
                 self.ponder_move = None
         
         if best_move:
-            self._send(f"bestmove {best_move.to_uci()}{ponder_move_str}")
+            self._send(f"bestmove {move_to_uci(best_move)}{ponder_move_str}")
         else:
             legal_moves = self.move_generator.generate_legal_moves(self.board)
             if legal_moves:
-                self._send(f"bestmove {legal_moves[0].to_uci()}")
+                self._send(f"bestmove {move_to_uci(legal_moves[0])}")
             else:
                 self._send("bestmove 0000")
     
@@ -467,7 +481,7 @@ class UCIProtocol:
         legal_moves = self.move_generator.generate_legal_moves(self.board)
         self._send(f"Legal moves: {len(legal_moves)}")
         
-        move_list = " ".join(m.to_uci() for m in legal_moves[:20])
+        move_list = " ".join(move_to_uci(m) for m in legal_moves[:20])
         if len(legal_moves) > 20:
             move_list += " ..."
         self._send(f"Moves: {move_list}")